@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+"""Arch_Lab autosave scheduler.
+
+This module provides background checkpointing of engine state for the
+Arch_Lab program. You probably should not be importing it directly.
+"""
+
+import sys
+import threading
+
+
+class Autosaver():
+    """Saves engine on a background thread once enough changes pile up.
+
+    Engine should call notify for every change, holding it's lock. Save is
+    done after given number of changes or every given number of seconds if
+    there were any changes, whichever comes first. Changes done while a save
+    is being written are saved together by the next one.
+
+    Attributes:
+      engine - engine.ListEngine descendant instance to save.
+      mutations - number of changes that trigger a save, 0 to disable.
+      interval - seconds between saves of changed engine, 0 to disable.
+      pending - number of changes done since last save.
+      thread - background thread doing the saves.
+    """
+    def __init__(self, engine, mutations=0, interval=0):
+        """Initialize self and start background thread.
+
+        engine: engine.ListEngine descendant instance - engine to save.
+        mutations: int - number of changes that trigger a save.
+        interval: float - seconds between saves.
+        """
+        self.engine = engine
+        self.mutations = mutations
+        self.interval = interval
+        self.pending = 0
+        self.stopped = False
+        self.wakeup = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="autosave",
+                                       daemon=True)
+        self.thread.start()
+
+    def notify(self):
+        """Register one change. Caller should hold engine lock."""
+        self.pending += 1
+        if self.mutations and self.pending >= self.mutations:
+            self.wakeup.set()
+
+    def run(self):
+        """Save engine whenever woken up or interval passes, until stopped."""
+        while True:
+            self.wakeup.wait(self.interval or None)
+            self.wakeup.clear()
+            if self.stopped:
+                return
+            if self.pending:
+                self.checkpoint()
+
+    def checkpoint(self):
+        """Save engine and wait until it is written.
+
+        Failed save is reported to stderr and retried later.
+        """
+        with self.engine.lock:
+            pending, self.pending = self.pending, 0
+            self.engine.save_tasks()
+        try:
+            self.engine.flush()
+        except Exception as e:
+            with self.engine.lock:
+                self.pending += pending
+            print("WARNING: autosave failed: {}".format(e), file=sys.stderr)
+
+    def stop(self):
+        """Stop background thread and wait for it to finish."""
+        self.stopped = True
+        self.wakeup.set()
+        self.thread.join()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+"""Arch_Lab storage benchmarks. Run this as a script.
+
+Measures how long file backends take to save and load a task set and how big
+their files are, with every compression codec (compression benchmark), how
+YAML loaders and dumpers compare (yaml benchmark), how pickle formats
+compare (pickle benchmark), how reads of a shared engine scale with threads
+(threads benchmark) and how search index compares to scanning every task
+(search benchmark).
+"""
+
+import io
+import os
+import sys
+import time
+import pickle
+import copyreg
+import random
+import argparse
+import tempfile
+import threading
+import yaml
+import engine
+import yaml_backend
+import compression
+import search
+from pickle_backend import PickleFileBackend
+from json_backend import JsonFileBackend
+from yaml_backend import YamlFileBackend
+
+BACKENDS = (('pickle', PickleFileBackend),
+            ('json', JsonFileBackend),
+            ('yaml', YamlFileBackend))
+# Reader thread counts and seconds every run of threads benchmark takes.
+THREADS = (1, 2, 4, 8)
+DURATION = 1.0
+# Number of tasks every read of threads benchmark fetches.
+PAGE = 100
+WORDS = ('buy', 'milk', 'call', 'mom', 'finish', 'lab', 'report', 'fix',
+         'bike', 'read', 'book', 'pay', 'rent', 'meet', 'team', 'at', 'noon')
+# Queries search benchmark runs, commonest words first.
+QUERIES = ('at', 'milk mom', 'buy milk call mom', 'task123', 'nothing')
+
+
+def make_tasks(count, seed=0):
+    """Generate pending and finished lists of random tasks.
+
+    count: int - number of tasks, a quarter of them finished.
+    seed: int - random seed, so that every run gets same tasks.
+    return: ([engine.Task, -||-], [engine.Task, -||-])
+    """
+    rnd = random.Random(seed)
+    tasks = sorted(engine.Task(" ".join(rnd.choices(WORDS,
+                                                    k=rnd.randint(2, 8))),
+                               rnd.randint(2000, 2030), rnd.randint(1, 12),
+                               rnd.randint(1, 28))
+                   for _ in range(count))
+    return tasks[count // 4:], tasks[:count // 4]
+
+
+def timed(func, *args):
+    """Call func with args.
+
+    return: (float, anything) - seconds it took and what it returned.
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_compression(count, methods):
+    """Print save time, load time and file size for every backend and codec.
+
+    count: int - number of tasks to save.
+    methods: seq of strings - savemethods to measure.
+    """
+    item = make_tasks(count)
+    print("{} tasks".format(count))
+    print("{:8} {:6} {:>10} {:>10} {:>12} {:>7}".format(
+        "method", "codec", "save, s", "load, s", "size, bytes", "ratio"))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        target = os.path.join(tmpdir, "bench")
+        for name, backend in BACKENDS:
+            if name not in methods:
+                continue
+            plain = None
+            for codec in (None,) + tuple(compression.CODECS):
+                fbk = compression.wrap(backend, codec)
+                save, _ = timed(fbk.save, target, item)
+                load, loaded = timed(fbk.load, target)
+                assert list(loaded) == list(item), \
+                    "{} {} lost tasks".format(name, codec)
+                size = os.path.getsize(target)
+                plain = plain or size
+                print("{:8} {:6} {:10.3f} {:10.3f} {:12} {:7.2f}".format(
+                    name, codec or 'none', save, load, size, plain / size))
+
+
+def bench_yaml(count):
+    """Print YAML save and load throughput of every loader and dumper.
+
+    Compares libyaml and pure-Python task schemas with python object tags
+    that were written by plain yaml.dump before.
+
+    count: int - number of tasks to save.
+    """
+    item = make_tasks(count)
+    variants = [('legacy', yaml.Dumper, yaml.UnsafeLoader),
+                ('python', yaml_backend.PyTaskDumper,
+                 yaml_backend.PyTaskLoader)]
+    if yaml_backend.TaskLoader is not yaml_backend.PyTaskLoader:
+        variants.append(('libyaml', yaml_backend.TaskDumper,
+                         yaml_backend.TaskLoader))
+    print("{} tasks".format(count))
+    print("{:8} {:>10} {:>10} {:>12} {:>12} {:>12}".format(
+        "yaml", "save, s", "load, s", "save, task/s", "load, task/s",
+        "size, bytes"))
+    for name, dumper, loader in variants:
+        save, text = timed(yaml.dump, item, None, dumper)
+        with engine.gc_paused():
+            load, loaded = timed(yaml.load, text, loader)
+        assert list(loaded) == list(item), "{} lost tasks".format(name)
+        print("{:8} {:10.3f} {:10.3f} {:12.0f} {:12.0f} {:12}".format(
+            name, save, load, count / save, count / load,
+            len(text.encode())))
+
+
+class LegacyPickler(pickle.Pickler):
+    """Pickler writing tasks as pickle.dump did before Task had __reduce__."""
+    def reducer_override(self, obj):
+        if type(obj) is engine.Task:
+            return (copyreg.__newobj__, (engine.Task,),
+                    (obj.content, obj.ordinal))
+        return NotImplemented
+
+
+def _legacy_dump(item, fil):
+    """Pickle item into fil in format written before VERSION header."""
+    LegacyPickler(fil, pickle.DEFAULT_PROTOCOL).dump(item)
+
+
+def _reduce_dump(item, fil):
+    """Pickle item into fil with highest protocol and Task.__reduce__."""
+    pickle.dump(item, fil, pickle.HIGHEST_PROTOCOL)
+
+
+def bench_pickle(count):
+    """Print pickle save and load time and size of every format.
+
+    Compares columnar format of PickleFileBackend with tasks pickled one by
+    one through Task.__reduce__, and with format written before either.
+
+    count: int - number of tasks to save.
+    """
+    item = make_tasks(count)
+    variants = (('legacy', _legacy_dump, pickle.load),
+                ('reduce', _reduce_dump, pickle.load),
+                ('columns', PickleFileBackend.dump, PickleFileBackend.parse))
+    print("{} tasks".format(count))
+    print("{:8} {:>10} {:>10} {:>12}".format(
+        "pickle", "save, s", "load, s", "size, bytes"))
+    for name, dump, parse in variants:
+        fil = io.BytesIO()
+        save, _ = timed(dump, item, fil)
+        fil.seek(0)
+        load, loaded = timed(parse, fil)
+        assert loaded == item, "{} lost tasks".format(name)
+        print("{:8} {:10.3f} {:10.3f} {:12}".format(
+            name, save, load, len(fil.getvalue())))
+
+
+class ExclusiveEngine(engine.ThreadSafeEngine):
+    """ThreadSafeEngine that holds lock for writing for views too."""
+    def view_pending_tasks(self, start=None, stop=None):
+        with self.lock:
+            return engine.ListEngine.view_pending_tasks(self, start, stop)
+
+
+def _stress(eng, readers, seconds):
+    """Read pages of pending tasks on many threads while one thread changes
+    them.
+
+    eng: engine.ListEngine descendant instance with at least PAGE tasks.
+    readers: int - number of reading threads.
+    seconds: float - how long to run.
+    return: (int, int) - number of reads and writes done.
+    """
+    counts = [0] * readers
+    writes = [0]
+    size = len(eng.pending_task_list) - PAGE
+    stop = threading.Event()
+
+    def read(num):
+        rnd = random.Random(num)
+        while not stop.is_set():
+            start = rnd.randrange(size)
+            eng.view_pending_tasks(start, start + PAGE)
+            counts[num] += 1
+
+    def write():
+        while not stop.wait(0.001):
+            eng.new_task("stress", 2016, 1, 1)
+            eng.remove_pending_task(0)
+            writes[0] += 1
+
+    threads = [threading.Thread(target=read, args=(num,))
+               for num in range(readers)]
+    threads.append(threading.Thread(target=write))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts), writes[0]
+
+
+def bench_threads(count):
+    """Print read throughput of engine shared by reader threads and a
+    writer thread.
+
+    Compares ThreadSafeEngine, whose views only wait for changes, with same
+    engine holding exclusive lock for views. With the GIL reads do not run in
+    parallel either way, so what scales is how much readers wait for each
+    other.
+
+    count: int - number of tasks engine holds.
+    """
+    pending, finished = make_tasks(max(count, 2 * PAGE))
+    records = [(task.content, task.date, False) for task in pending]
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print("{} tasks, {} per read, GIL {}".format(
+        len(records), PAGE, "enabled" if gil else "disabled"))
+    print("{:10} {:>7} {:>12} {:>12} {:>8}".format(
+        "lock", "readers", "reads/s", "per thread", "writes"))
+    cwd = os.getcwd()
+    for name, cls in (('rwlock', engine.ThreadSafeEngine),
+                      ('exclusive', ExclusiveEngine)):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.chdir(tmpdir)
+            try:
+                eng = cls()
+                eng.import_tasks(records)
+                for readers in THREADS:
+                    reads, writes = _stress(eng, readers, DURATION)
+                    print("{:10} {:7} {:12.0f} {:12.0f} {:8}".format(
+                        name, readers, reads / DURATION,
+                        reads / DURATION / readers, writes))
+                eng.flush()
+            finally:
+                os.chdir(cwd)
+
+
+def _scan(pending, finished, query):
+    """Find tasks having every word of query by looking at each of them."""
+    wanted = search.words(query)
+    return [(task, done) for done, tasks in ((False, pending),
+                                             (True, finished))
+            for task in tasks if wanted <= search.words(task.content)]
+
+
+def bench_search(count):
+    """Print time search index takes to build, save and load, and time
+    queries take with it and without it.
+
+    Every tenth task gets a word of it's own, so that rare words are tried
+    too.
+
+    count: int - number of tasks to search.
+    """
+    pending, finished = make_tasks(count)
+    for num, task in enumerate(pending[::10]):
+        task.content += " task{}".format(num)
+    with engine.gc_paused():
+        build, index = timed(search.TaskIndex.build, pending, finished)
+        dump, data = timed(pickle.dumps, index, pickle.HIGHEST_PROTOCOL)
+        load, loaded = timed(pickle.loads, data)
+        attach, attached = timed(loaded.attach, pending, finished)
+    assert attached, "loaded index lost task IDs"
+    print("{} tasks, {} words".format(count, len(index.postings)))
+    print("build {:.3f} s, save {:.3f} s, load {:.3f} s, attach {:.3f} s, "
+          "{} bytes".format(build, dump, load, attach, len(data)))
+    print("{:20} {:>8} {:>10} {:>10} {:>10}".format(
+        "query", "found", "index, s", "loaded, s", "scan, s"))
+    for query in QUERIES:
+        fast, found = timed(index.search, query)
+        first, again = timed(loaded.search, query)
+        slow, scanned = timed(_scan, pending, finished, query)
+        assert found == again, "loaded index found other tasks"
+        assert sorted(id(x) for x, _ in found) == sorted(
+            id(x) for x, _ in scanned), "index found other tasks"
+        print("{:20} {:8} {:10.4f} {:10.4f} {:10.4f}".format(
+            query, len(found), fast, first, slow))
+
+
+# Available benchmarks, name: function taking number of tasks and methods
+SUITES = {
+    'compression': bench_compression,
+    'yaml': lambda count, methods: bench_yaml(count),
+    'pickle': lambda count, methods: bench_pickle(count),
+    'threads': lambda count, methods: bench_threads(count),
+    'search': lambda count, methods: bench_search(count),
+}
+
+
+def main():
+    """Entry point for benchmarks."""
+    parser = argparse.ArgumentParser(description="Arch_Lab storage benchmarks")
+    parser.add_argument('-n', '--tasks', type=int, default=20000,
+                        help="number of tasks to use")
+    parser.add_argument('-m', '--method', action='append',
+                        choices=[name for name, _ in BACKENDS],
+                        help="savemethod to measure, all by default")
+    parser.add_argument('suite', nargs='*', default=list(SUITES),
+                        help="benchmarks to run, all by default: " +
+                        ", ".join(SUITES))
+    args = parser.parse_args()
+    for suite in args.suite:
+        if suite not in SUITES:
+            parser.error("unknown benchmark " + suite)
+    for suite in args.suite:
+        SUITES[suite](args.tasks, args.method or [x for x, _ in BACKENDS])
+        print()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    main()
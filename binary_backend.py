@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+"""Arch_Lab binary serialization backend.
+
+This module provides a serialization backend for the Arch_Lab program. You
+probably should not be importing it directly.
+"""
+
+import mmap
+import struct
+import collections.abc
+import engine
+
+MAGIC = b'ArchLab\x00'
+VERSION = 1
+# magic, version, number of pending tasks, number of finished tasks
+HEADER = struct.Struct('<8sHQQ')
+# date ordinal, content offset in string heap, content length in bytes, ID
+RECORD = struct.Struct('<iQIq')
+
+
+class BinaryFileBackend(engine.FileBackend):
+    """FileBackend implementation for memory-mapped binary format.
+
+    File consists of a header, fixed-width records for pending and then
+    finished tasks, and a heap of UTF-8 encoded task descriptions records
+    point into.
+
+    Loading only maps the file into memory, and tasks are decoded from it
+    when they are accessed for the first time.
+    """
+    def save(target, item):
+        """Serialize two lists of Tasks into filename target.
+
+        File is written with engine.atomic_open, so task lists mapped from the
+        old file stay valid.
+
+        target: string - file name.
+        item: ([engine.Task, -||-], [engine.Task, -||-]) - item to serialize.
+        """
+        pending, finished = item
+        records, heap, size = [], [], 0
+        for task in (*pending, *finished):
+            content = task.content.encode('utf-8')
+            records.append(RECORD.pack(task.ordinal, size, len(content),
+                                       task.id))
+            heap.append(content)
+            size += len(content)
+
+        with engine.atomic_open(target, 'wb') as fil:
+            fil.write(HEADER.pack(MAGIC, VERSION, len(pending), len(finished)))
+            fil.write(b''.join(records))
+            fil.write(b''.join(heap))
+
+    def load(target):
+        """Map filename target into two lazy lists of Tasks.
+
+        Will return tuple of two empty lists if file does not exist or is
+        empty.
+
+        target: string - file name.
+        return: (MappedTaskList, MappedTaskList)
+        """
+        try:
+            with open(target, 'rb') as fil:
+                mm = mmap.mmap(fil.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return ([], [])
+
+        magic, version, npending, nfinished = HEADER.unpack_from(mm)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} is not a task file".format(target))
+        heap = HEADER.size + (npending + nfinished) * RECORD.size
+        return (MappedTaskList(mm, HEADER.size, npending, heap),
+                MappedTaskList(mm, HEADER.size + npending * RECORD.size,
+                               nfinished, heap))
+
+
+class MappedTaskList(collections.abc.MutableSequence):
+    """List of Tasks decoded on demand from memory-mapped file.
+
+    Until list is changed, it only keeps a cache of decoded Tasks. Once it is
+    changed, it switches to a real list of Tasks and record numbers, and
+    records are still decoded as they are accessed.
+    """
+    def __init__(self, mm, start, count, heap):
+        """Initialize self.
+
+        mm: mmap.mmap - mapped file.
+        start: int - offset of first record.
+        count: int - number of records.
+        heap: int - offset of string heap.
+        """
+        self._view = memoryview(mm)
+        self._start = start
+        self._count = count
+        self._heap = heap
+        self._cache = {}
+        self._items = None
+
+    def __len__(self):
+        if self._items is None:
+            return self._count
+        return len(self._items)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        idx = self._index(idx)
+        if self._items is None:
+            task = self._cache.get(idx)
+            if task is None:
+                task = self._cache[idx] = self._decode(idx)
+            return task
+        task = self._items[idx]
+        if type(task) is int:
+            task = self._items[idx] = self._decode(task)
+        return task
+
+    def __setitem__(self, idx, task):
+        self._materialize()
+        self._items[idx] = task
+
+    def __delitem__(self, idx):
+        self._materialize()
+        del self._items[idx]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __eq__(self, other):
+        """Return self == other.
+
+        MappedTaskList is equal to any sequence holding equal items in the
+        same order.
+        """
+        try:
+            if len(self) != len(other):
+                return False
+        except TypeError:
+            return NotImplemented
+        return all(x == y for x, y in zip(self, other))
+
+    def __repr__(self):
+        return "{}({!r})".format("MappedTaskList", list(self))
+
+    def insert(self, idx, task):
+        self._materialize()
+        self._items.insert(idx, task)
+
+    def copy(self):
+        """Copy list without decoding it.
+
+        Copy of an unchanged list shares it's cache of decoded Tasks, copy of
+        a changed one gets a copy of it's list of record numbers and Tasks.
+
+        return: MappedTaskList
+        """
+        other = MappedTaskList.__new__(MappedTaskList)
+        other.__dict__.update(self.__dict__)
+        if self._items is not None:
+            other._items = list(self._items)
+        return other
+
+    def _index(self, idx):
+        """Normalize idx, raise IndexError if it is out of range."""
+        size = len(self)
+        if idx < 0:
+            idx += size
+        if not 0 <= idx < size:
+            raise IndexError("MappedTaskList index out of range")
+        return idx
+
+    def _decode(self, num):
+        """Decode record number num into a Task."""
+        date, offset, length, task_id = RECORD.unpack_from(
+            self._view, self._start + num * RECORD.size)
+        offset += self._heap
+        return engine.Task.from_ordinal(
+            str(self._view[offset:offset + length], 'utf-8'), date, task_id)
+
+    def _materialize(self):
+        """Switch to a list of record numbers and already decoded Tasks."""
+        if self._items is None:
+            self._items = list(range(self._count))
+            for idx, task in self._cache.items():
+                self._items[idx] = task
+            self._cache = None
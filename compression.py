@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+"""Arch_Lab transparent compression.
+
+This module provides a compression layer that wraps serialization backends of
+the Arch_Lab program. You probably should not be importing it directly.
+
+Serialized data is streamed through the compressor as it is written and read,
+so whole file is never held in memory as bytes. Files are recognized by their
+header on load, so a file written with any codec (or none) can be loaded no
+matter which codec is configured.
+"""
+
+import io
+import contextlib
+import bz2
+import gzip
+import lzma
+import engine
+
+
+def _zlib(fil, mode):
+    """Open deflate (zlib) stream in gzip container over binary file fil."""
+    return gzip.GzipFile(filename='', mode=mode, fileobj=fil,
+                         compresslevel=6, mtime=0)
+
+
+def _lzma(fil, mode):
+    """Open xz stream over binary file fil."""
+    return lzma.LZMAFile(fil, mode)
+
+
+def _bz2(fil, mode):
+    """Open bzip2 stream over binary file fil."""
+    return bz2.BZ2File(fil, mode)
+
+
+# Available codecs, name: (file header, opener)
+CODECS = {
+    'zlib': (b'\x1f\x8b', _zlib),
+    'lzma': (b'\xfd7zXZ\x00', _lzma),
+    'bz2': (b'BZh', _bz2),
+}
+HEADER_SIZE = max(len(header) for header, _ in CODECS.values())
+
+
+def config_codec(config):
+    """Get codec chosen by config parameter 'compression'.
+
+    Raises ValueError if codec is unknown.
+
+    config: configparser.ConfigParser - program config.
+    return: string - one of CODECS, or None if it is 'none' or not set.
+    """
+    codec = config['DEFAULT'].get('compression', 'none')
+    if codec == 'none':
+        return None
+    if codec not in CODECS:
+        raise ValueError("unknown compression codec " + codec)
+    return codec
+
+
+def detect(fil):
+    """Find codec of a file by it's header.
+
+    fil: seekable binary file-like object, positioned at the start. It is
+         positioned at the start again on return.
+    return: string - codec name, or None if file is not compressed.
+    """
+    header = fil.read(HEADER_SIZE)
+    fil.seek(0)
+    for codec, (magic, _) in CODECS.items():
+        if header.startswith(magic):
+            return codec
+    return None
+
+
+def reader(fil, text=False):
+    """Wrap binary file fil to read it's contents decompressed.
+
+    fil: seekable binary file-like object, positioned at the start.
+    text: boolean - True to get a UTF-8 text stream.
+    return: file-like object.
+    """
+    codec = detect(fil)
+    if codec is not None:
+        fil = CODECS[codec][1](fil, 'rb')
+    if text:
+        fil = io.TextIOWrapper(fil, encoding='utf-8')
+    return fil
+
+
+@contextlib.contextmanager
+def writer(fil, codec=None, text=False):
+    """Wrap binary file fil to write compressed contents into it.
+
+    Compressed stream is finished on exit, but fil is left open.
+
+    fil: binary file-like object.
+    codec: string - one of CODECS, or None to write plain contents.
+    text: boolean - True to get a UTF-8 text stream.
+    return: file-like object.
+    """
+    stream = fil if codec is None else CODECS[codec][1](fil, 'wb')
+    if text:
+        wrapper = io.TextIOWrapper(stream, encoding='utf-8')
+        yield wrapper
+        wrapper.flush()
+        wrapper.detach()
+    else:
+        yield stream
+    if stream is not fil:
+        stream.close()
+
+
+def wrap(backend, codec=None):
+    """Make FileBackend that compresses files of another one.
+
+    Backends that can not stream (their streams attribute is False) are
+    returned as is, since they manage their files on their own. So are
+    backends already wrapped.
+
+    backend: engine.FileBackend descendant - backend to wrap.
+    codec: string - one of CODECS to compress saved files with, or None to
+           save them plain. Loaded files are decompressed with whatever codec
+           they were written with.
+    return: engine.FileBackend descendant.
+    """
+    if not backend.streams:
+        return backend
+
+    class CompressedFileBackend(engine.FileBackend):
+        """FileBackend implementation wrapping another one.
+
+        Streams serialized data of wrapped backend through a compressor.
+
+        Attributes:
+          wrapped - wrapped FileBackend descendant.
+          codec - codec name files are saved with, or None.
+        """
+        sections = backend.sections
+
+        def save(target, item):
+            with engine.atomic_open(target, 'wb') as raw:
+                with writer(raw, codec, backend.text) as fil:
+                    backend.dump(item, fil)
+
+        def load(target):
+            try:
+                with open(target, 'rb') as raw:
+                    with reader(raw, backend.text) as fil:
+                        return backend.parse(fil)
+            except (FileNotFoundError, EOFError):
+                return ([], [])
+
+    CompressedFileBackend.wrapped = backend
+    CompressedFileBackend.codec = codec
+    return CompressedFileBackend
@@ -28,6 +28,7 @@ You probably should not be importing it directly.
 import sys
 import argparse
 import lab
+import transfer
 
 
 class SimpleController(lab.Controller):
@@ -35,14 +36,64 @@ class SimpleController(lab.Controller):
 
     SimpleController supports connecting given interface and engine without any
     extra features.
+
+    Controller is a state machine: every view and action method returns the
+    method to run next, or None to stop, and loop() runs them one after
+    another. Thus stack depth stays the same however long the session is.
+
+    Attributes:
+      pending_opts - pending task menu, (descriptor, option, state) tuples.
+      finished_opts - finished task menu, (descriptor, option, state) tuples.
+      viewing_finished - True if finished tasks were viewed last, False if
+                         pending ones were.
     """
+    def __init__(self, _interface, _engine):
+        """Initialize self.
+
+        _interface: Interface descendant - interface to be used.
+        _engine: Engine descendant - engine to be used.
+        """
+        super().__init__(_interface, _engine)
+        self.pending_opts = (
+            ("A", "Add new task", self.add_new_task),
+            ("R", "Remove task", self.remove_pending_task),
+            ("E", "Edit task", self.edit_pending_task),
+            ("M", "Mark task finished", self.finish_task),
+            ("F", "View finished tasks", self.view_finished_tasks),
+            ("S", "Search tasks", self.search_tasks),
+            ("C", "Edit configuration", self.view_config_pending),
+            ("Q", "Quit", self.shutdown)
+        )
+        self.finished_opts = (
+            ("W", "Wipe finished tasks", self.clear_finished_tasks),
+            ("R", "Remove task", self.remove_finished_task),
+            ("E", "Edit task", self.edit_finished_task),
+            ("M", "Mark task pending", self.unfinish_task),
+            ("L", "View pending tasks", self.view_pending_tasks),
+            ("S", "Search tasks", self.search_tasks),
+            ("C", "Edit configuration", self.view_config_finished),
+            ("Q", "Quit", self.shutdown)
+        )
+        self.viewing_finished = False
+
     def run(self):
         """Execution should normally start here.
 
-        Displays welcome message and switches to pending task view.
+        Displays welcome message and switches to pending task view. Views are
+        refreshed whenever engine tells tasks were changed by another
+        process, refer to tasks_changed.
         """
+        self.engine.watch(self.tasks_changed)
         self.interface.welcome()
-        self.view_pending_tasks()
+        self.loop(self.view_pending_tasks)
+
+    def loop(self, state):
+        """Run states until one of them returns None.
+
+        state: method to run first.
+        """
+        while state is not None:
+            state = state()
 
     def view_pending_tasks(self):
         """Provide interactive view of pending tasks.
@@ -50,23 +101,16 @@ class SimpleController(lab.Controller):
         Tasks will be sorted by date from earliest to latest; tasks that are
         overdue (dated earlier than current date, but still pending) and tasks
         scheduled for current date will be marked accordingly.
-        """
-        PENDING_TASK_OPTS = (
-            ("A", "Add new task", self.add_new_task),
-            ("R", "Remove task", self.remove_pending_task),
-            ("E", "Edit task", self.edit_pending_task),
-            ("M", "Mark task finished", self.finish_task),
-            ("F", "View finished tasks", self.view_finished_tasks),
-            ("C", "Edit configuration", self.view_config_pending),
-            ("Q", "Quit", self.shutdown)
-        )
 
-        self.interface.print_pending_tasks(self.engine.view_pending_tasks())
-        try:
-            self.interface.pending_tasks_menu(PENDING_TASK_OPTS)[2]()
-        except TypeError:
+        return: action chosen by user.
+        """
+        self.viewing_finished = False
+        self.print_pending_tasks()
+        choice = self.interface.pending_tasks_menu(self.pending_opts)
+        if choice is None:
             self.interface.bad_input()
-            self.view_pending_tasks()
+            return self.view_pending_tasks
+        return choice[2]
 
     def add_new_task(self):
         """Add new task interactively.
@@ -79,7 +123,7 @@ class SimpleController(lab.Controller):
         except (TypeError, ValueError):
             self.interface.bad_input()
 
-        self.view_pending_tasks()
+        return self.view_pending_tasks
 
     def remove_pending_task(self):
         """Provide interactive way to remove one pending task.
@@ -93,7 +137,7 @@ class SimpleController(lab.Controller):
         except IndexError:
             self.interface.bad_task()
 
-        self.view_pending_tasks()
+        return self.view_pending_tasks
 
     def edit_pending_task(self):
         """Provide interactive way to edit one pending task.
@@ -112,7 +156,7 @@ class SimpleController(lab.Controller):
         except ValueError:
             self.interface.bad_input()
 
-        self.view_pending_tasks()
+        return self.view_pending_tasks
 
     def finish_task(self):
         """Mark pending task as finished interactively.
@@ -127,7 +171,7 @@ class SimpleController(lab.Controller):
         except IndexError:
             self.interface.bad_task()
 
-        self.view_pending_tasks()
+        return self.view_pending_tasks
 
     def view_config_pending(self):
         """Provide interactive configuration.
@@ -137,29 +181,22 @@ class SimpleController(lab.Controller):
         Afterwards returns to the pending task view.
         """
         self.view_config()
-        self.view_pending_tasks()
+        return self.view_pending_tasks
 
     def view_finished_tasks(self):
         """Provide interactive view of finished tasks.
 
         Tasks will be sorted by date from earliest to latest.
-        """
-        FINISHED_TASK_OPTS = (
-            ("W", "Wipe finished tasks", self.clear_finished_tasks),
-            ("R", "Remove task", self.remove_finished_task),
-            ("E", "Edit task", self.edit_finished_task),
-            ("M", "Mark task pending", self.unfinish_task),
-            ("L", "View pending tasks", self.view_pending_tasks),
-            ("C", "Edit configuration", self.view_config_finished),
-            ("Q", "Quit", self.shutdown)
-        )
 
+        return: action chosen by user.
+        """
+        self.viewing_finished = True
         self.interface.print_finished_tasks(self.engine.view_finished_tasks())
-        try:
-            self.interface.finished_tasks_menu(FINISHED_TASK_OPTS)[2]()
-        except TypeError:
+        choice = self.interface.finished_tasks_menu(self.finished_opts)
+        if choice is None:
             self.interface.bad_input()
-            self.view_finished_tasks()
+            return self.view_finished_tasks
+        return choice[2]
 
     def clear_finished_tasks(self):
         """Remove all finished tasks.
@@ -167,7 +204,7 @@ class SimpleController(lab.Controller):
         Afterwards returns to the finished task view.
         """
         self.engine.clear_finished_tasks()
-        self.view_finished_tasks()
+        return self.view_finished_tasks
 
     def remove_finished_task(self):
         """Provide interactive way to remove one finished task.
@@ -182,7 +219,7 @@ class SimpleController(lab.Controller):
         except IndexError:
             self.interface.bad_task()
 
-        self.view_finished_tasks()
+        return self.view_finished_tasks
 
     def edit_finished_task(self):
         """Provide interactive way to edit one finished task.
@@ -201,7 +238,7 @@ class SimpleController(lab.Controller):
         except ValueError:
             self.interface.bad_input()
 
-        self.view_finished_tasks()
+        return self.view_finished_tasks
 
     def unfinish_task(self):
         """Mark finished task as pending.
@@ -215,7 +252,7 @@ class SimpleController(lab.Controller):
         except IndexError:
             self.interface.bad_task()
 
-        self.view_finished_tasks()
+        return self.view_finished_tasks
 
     def view_config_finished(self):
         """Provide interactive configuration.
@@ -225,21 +262,64 @@ class SimpleController(lab.Controller):
         Afterwards returns to the finished task view.
         """
         self.view_config()
-        self.view_finished_tasks()
+        return self.view_finished_tasks
+
+    def search_tasks(self):
+        """Provide interactive search of tasks.
+
+        Asks for words to search for and prints tasks that have all of them,
+        until user enters nothing. Then returns to the view search was
+        started from.
+        """
+        query = self.interface.search_dialog()
+        if not query.strip():
+            if self.viewing_finished:
+                return self.view_finished_tasks
+            return self.view_pending_tasks
+        self.interface.print_found_tasks(self.engine.search_tasks(query))
+        return self.search_tasks
 
     def shutdown(self):
         """Execution should normally end here.
 
         Calls save_dialog so that user can choose if tasks should be saved or
-        not.
+        not. Engine autosave is stopped first, so that declined changes are
+        not saved anyway.
+
+        return: None, which stops the loop.
         """
+        self.engine.stop_autosave()
         self.save_dialog()
+        return None
 
     def save_dialog(self):
         """Provide interactive way to save tasks on exit."""
         if self.engine.changes_detected() and self.interface.save_dialog():
             self.engine.save_tasks()
 
+    def tasks_changed(self):
+        """Refresh view after tasks were changed by another process.
+
+        Called by engine, possibly on another thread while user is choosing
+        an action. Tasks that were viewed last are printed anew, so that
+        positions user picks match them.
+        """
+        self.interface.tasks_changed()
+        if self.viewing_finished:
+            self.interface.print_finished_tasks(
+                self.engine.view_finished_tasks())
+        else:
+            self.print_pending_tasks()
+
+    def print_pending_tasks(self):
+        """Print pending tasks, marked by engine date queries.
+
+        Tasks and their marks are both taken from engine's columnar view, so
+        that they match even if tasks change in between.
+        """
+        columns = self.engine.pending_columns()
+        self.interface.print_pending_tasks(columns.view(), columns.marks())
+
     def view_config(self):
         """Provide interactive configuration."""
         t1, t2 = (self.engine.get_savemethod(),
@@ -276,6 +356,12 @@ class ArgumentController(SimpleController):
         -m, --mfinish   switch to finish task dialogue
         -f, --finished  switch to finished view
         -c, --config    switch to config dialogue
+        -s, --search    print tasks that have every given word
+        -b, --batch     apply operations from file, '-' for stdin
+        --import        import tasks from file, '-' for stdin
+        --export        export tasks to file, '-' for stdout
+        --format        format for import and export, ndjson or csv; guessed
+                        by file name by default
         """
         parser = argparse.ArgumentParser()
         group = parser.add_mutually_exclusive_group()
@@ -285,16 +371,177 @@ class ArgumentController(SimpleController):
         group.add_argument("-m", "--mfinish", action='store_true')
         group.add_argument("-f", "--finished", action='store_true')
         group.add_argument("-c", "--config", action='store_true')
+        group.add_argument("-s", "--search", metavar="WORDS")
+        group.add_argument("-b", "--batch", metavar="FILE")
+        group.add_argument("--import", dest="import_", metavar="FILE")
+        group.add_argument("--export", metavar="FILE")
+        parser.add_argument("--format", choices=sorted(transfer.FORMATS))
         args = parser.parse_args()
         if args.add:
-            self.add_new_task()
+            self.loop(self.add_new_task)
         elif args.remove:
-            self.remove_pending_task()
+            self.loop(self.remove_pending_task)
         elif args.edit:
-            self.edit_pending_task()
+            self.loop(self.edit_pending_task)
         elif args.mfinish:
-            self.finish_task()
+            self.loop(self.finish_task)
         elif args.finished:
-            self.view_finished_tasks()
+            self.loop(self.view_finished_tasks)
         elif args.config:
-            self.view_config_pending()
+            self.loop(self.view_config_pending)
+        elif args.search is not None:
+            self.interface.print_found_tasks(
+                self.engine.search_tasks(args.search))
+        elif args.batch == '-':
+            if self.process_batch(sys.stdin):
+                sys.exit(1)
+        elif args.batch is not None:
+            with open(args.batch, encoding='utf-8') as fil:
+                if self.process_batch(fil):
+                    sys.exit(1)
+        elif args.import_ is not None:
+            self.import_file(args.import_, args.format)
+        elif args.export is not None:
+            self.export_file(args.export, args.format)
+
+    def import_file(self, name, fmt=None):
+        """Import tasks from file and save them.
+
+        On malformed record reports it to stderr and exits without saving.
+
+        name: string - file name, '-' for stdin.
+        fmt: string - transfer format, guessed by file name if None.
+        """
+        reader = transfer.FORMATS[fmt or transfer.guess_format(name)][0]
+        try:
+            if name == '-':
+                self.engine.import_tasks(reader(sys.stdin))
+            else:
+                with open(name, encoding='utf-8', newline='') as fil:
+                    self.engine.import_tasks(reader(fil))
+        except ValueError as e:
+            print("{}: {}".format(name, e), file=sys.stderr)
+            sys.exit(1)
+        self.engine.save_tasks()
+
+    def export_file(self, name, fmt=None):
+        """Export all tasks to file.
+
+        name: string - file name, '-' for stdout.
+        fmt: string - transfer format, guessed by file name if None.
+        """
+        writer = transfer.FORMATS[fmt or transfer.guess_format(name)][1]
+        if name == '-':
+            writer(sys.stdout, transfer.engine_records(self.engine))
+        else:
+            with open(name, 'w', encoding='utf-8', newline='') as fil:
+                writer(fil, transfer.engine_records(self.engine))
+
+    def process_batch(self, stream):
+        """Apply operations read from stream, then save tasks once.
+
+        Every line holds one operation, fields separated by whitespace:
+          add DATE CONTENT
+          remove IDX
+          edit IDX DATE [CONTENT]
+          finish IDX
+          fremove IDX
+          fedit IDX DATE [CONTENT]
+          unfinish IDX
+          clear
+          shift DAYS
+        IDX is position of a task, as in the views, or '@' followed by task
+        ID, which stays the same while other lines move tasks around. DATE is
+        YYYY-MM-DD, or '-' to keep the old date when editing. Omitted CONTENT
+        keeps the old one. DAYS moves every pending task by that many days,
+        may be negative. Empty lines and lines starting with '#' are skipped.
+
+        Lines that fail are reported to stderr and skipped, the rest are
+        still applied and saved.
+
+        stream: iterable of strings - lines of operations.
+        return: int - number of failed lines.
+        """
+        eng = self.engine
+        ops = {
+            'add': (eng.new_task, None, 'dc'),
+            'remove': (eng.remove_pending_task,
+                       eng.remove_pending_task_by_id, 'i'),
+            'edit': (eng.edit_pending_task, eng.edit_pending_task_by_id,
+                     'ido'),
+            'finish': (eng.finish_task, eng.finish_task_by_id, 'i'),
+            'fremove': (eng.remove_finished_task,
+                        eng.remove_finished_task_by_id, 'i'),
+            'fedit': (eng.edit_finished_task, eng.edit_finished_task_by_id,
+                      'ido'),
+            'unfinish': (eng.unfinish_task, eng.unfinish_task_by_id, 'i'),
+            'clear': (eng.clear_finished_tasks, None, ''),
+            'shift': (eng.shift_pending_tasks, None, 'n'),
+        }
+        failed = 0
+        for num, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            name, *rest = line.split(None, 1)
+            if name not in ops:
+                failed += 1
+                print("line {}: unknown operation {!r}".format(num, name),
+                      file=sys.stderr)
+                continue
+            method, by_id, spec = ops[name]
+            try:
+                args = ArgumentController.parse_fields(spec, *rest)
+                if by_id is not None and rest[0].startswith('@'):
+                    method = by_id
+                method(*args)
+            except KeyError as e:
+                failed += 1
+                print("line {}: no task with ID {}".format(num, e),
+                      file=sys.stderr)
+            except (TypeError, ValueError, IndexError) as e:
+                failed += 1
+                print("line {}: {}: {}".format(num, type(e).__name__, e),
+                      file=sys.stderr)
+
+        if self.engine.changes_detected():
+            self.engine.save_tasks()
+        return failed
+
+    def parse_fields(spec, text=""):
+        """Parse fields of a batch operation.
+
+        Raises ValueError if fields do not match spec.
+
+        spec: string - one letter per field: 'i' for index or '@' and ID,
+              'n' for number, 'd' for date, 'c' for content, 'o' for content
+              that may be omitted. Content can only be last.
+        text: string - fields separated by whitespace.
+        return: list - arguments for the engine method, content goes before
+                date as engine expects.
+        """
+        fields = text.split(None, len(spec) - 1) if spec else text.split()
+        if spec.endswith('o') and len(fields) == len(spec) - 1:
+            fields.append("")
+        if len(fields) != len(spec):
+            raise ValueError("expected {} field(s), got {}"
+                             .format(len(spec), len(fields)))
+
+        args, content, date = [], [], []
+        for kind, field in zip(spec, fields):
+            if kind == 'i':
+                args.append(int(field[1:] if field.startswith('@')
+                                else field))
+            elif kind == 'n':
+                if field.startswith('@'):
+                    raise ValueError("bad number {!r}".format(field))
+                args.append(int(field))
+            elif kind in 'co':
+                content.append(field)
+            elif field == '-':
+                date = [None, None, None]
+            else:
+                date = [int(x) for x in field.split('-')]
+                if len(date) != 3:
+                    raise ValueError("bad date {!r}".format(field))
+        return args + content + date
@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+"""Arch_Lab daemon. Run this as a script or import and run main().
+
+Daemon keeps one engine in memory and serves it's operations over a Unix
+domain socket, so that every program run does not have to load tasks anew.
+Module also provides RemoteEngine, an Engine implementation that talks to
+the daemon.
+
+Protocol is line-based: every request is a JSON object {"op": name, "args":
+[...]} and every response is either {"result": value} or {"error": name,
+"message": string}. Dates travel as ordinals.
+"""
+
+import os
+import sys
+import json
+import socket
+import itertools
+import datetime
+import configparser
+import lab
+from lab import SAVEFILE
+from lab import CONFIG
+
+SOCKET = SAVEFILE + '.sock'
+# Number of task records RemoteEngine.import_tasks sends in one request.
+IMPORT_CHUNK = 1 << 14
+
+# Engine operations daemon will serve.
+OPS = ('view_pending_tasks', 'new_task', 'remove_pending_task',
+       'edit_pending_task', 'finish_task', 'view_finished_tasks',
+       'clear_finished_tasks', 'remove_finished_task', 'edit_finished_task',
+       'unfinish_task', 'import_tasks', 'save_tasks', 'get_savemethod',
+       'get_available_savemethods', 'set_savemethod', 'changes_detected',
+       'view_task', 'view_pending_tasks_with_ids',
+       'view_finished_tasks_with_ids', 'remove_pending_task_by_id',
+       'edit_pending_task_by_id', 'finish_task_by_id',
+       'remove_finished_task_by_id', 'edit_finished_task_by_id',
+       'unfinish_task_by_id', 'search_tasks', 'shift_pending_tasks')
+
+# Exceptions that are raised again on the client side.
+ERRORS = {x.__name__: x for x in (IndexError, TypeError, ValueError,
+                                  KeyError, NotImplementedError)}
+
+
+class EngineServer():
+    """Serves engine operations over a Unix domain socket with asyncio.
+
+    All requests are handled on the event loop thread one at a time, so the
+    engine is never used concurrently.
+
+    Attributes:
+      engine - Engine descendant instance being served.
+      path - socket file name.
+    """
+    def __init__(self, engine, path=SOCKET):
+        """Initialize self.
+
+        engine: Engine descendant instance to serve.
+        path: string - socket file name.
+        """
+        self.engine = engine
+        self.path = path
+        self.loop = None
+        self.stopped = None
+
+    def dispatch(self, request):
+        """Run one request against engine.
+
+        request: dict - {"op": string, "args": list}.
+        return: dict - response.
+        """
+        try:
+            if request['op'] not in OPS:
+                raise ValueError("unknown operation {}".format(request['op']))
+            args = request['args']
+            if request['op'] == 'import_tasks':
+                args = [[(content, datetime.date.fromordinal(date), done)
+                         for content, date, done in args[0]]]
+            result = getattr(self.engine, request['op'])(*args)
+        except Exception as e:
+            return {"error": type(e).__name__, "message": str(e)}
+        if request['op'] in ('view_pending_tasks', 'view_finished_tasks'):
+            result = [(content, date.toordinal()) for content, date in result]
+        elif request['op'] in ('view_pending_tasks_with_ids',
+                               'view_finished_tasks_with_ids'):
+            result = [(task_id, content, date.toordinal())
+                      for task_id, content, date in result]
+        elif request['op'] == 'view_task':
+            result = (result[0], result[1].toordinal(), result[2])
+        elif request['op'] == 'search_tasks':
+            result = [(task_id, content, date.toordinal(), finished)
+                      for task_id, content, date, finished in result]
+        return {"result": result}
+
+    async def handle(self, reader, writer):
+        """Serve one client connection until it is closed."""
+        try:
+            line = await reader.readline()
+            while line:
+                try:
+                    response = json.dumps(
+                        self.dispatch(json.loads(line.decode())))
+                except (TypeError, ValueError) as e:
+                    response = json.dumps({"error": type(e).__name__,
+                                           "message": str(e)})
+                writer.write(response.encode() + b'\n')
+                await writer.drain()
+                line = await reader.readline()
+        finally:
+            writer.close()
+
+    async def serve(self):
+        """Serve connections until stop() is called or a signal arrives.
+
+        Stale socket file left by a crashed daemon is removed. Will raise
+        OSError if another daemon is already listening.
+        """
+        import asyncio
+        import signal
+
+        if os.path.exists(self.path):
+            other = RemoteEngine.connect(self.path)
+            if other is not None:
+                other.close()
+                raise OSError("daemon is already running on " + self.path)
+            os.unlink(self.path)
+
+        self.loop = asyncio.get_running_loop()
+        self.stopped = self.loop.create_future()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self.loop.add_signal_handler(sig, self.stop)
+            except (ValueError, RuntimeError):
+                pass
+        server = await asyncio.start_unix_server(self.handle, path=self.path)
+        try:
+            async with server:
+                await self.stopped
+        finally:
+            os.unlink(self.path)
+
+    def stop(self):
+        """Make serve() return. Safe to call from any thread."""
+        def finish():
+            if not self.stopped.done():
+                self.stopped.set_result(None)
+        self.loop.call_soon_threadsafe(finish)
+
+
+class RemoteEngine(lab.Engine):
+    """Engine implementation for Arch_Lab.
+
+    Forwards every operation to the engine held by a running daemon.
+    """
+    def connect(path=SOCKET):
+        """Connect to the daemon.
+
+        path: string - socket file name.
+        return: RemoteEngine, or None if daemon is not running.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            return None
+        return RemoteEngine(sock)
+
+    def __init__(self, sock):
+        """Initialize self.
+
+        sock: socket.socket - socket connected to the daemon.
+        """
+        super().__init__()
+        self.sock = sock
+        self.fil = sock.makefile('rwb')
+
+    def close(self):
+        """Disconnect from the daemon."""
+        self.fil.close()
+        self.sock.close()
+
+    def call(self, op, *args):
+        """Run operation on remote engine.
+
+        Errors listed in ERRORS are raised again, others become
+        RuntimeError.
+
+        op: string - Engine method name.
+        return: whatever the method returns, as decoded from JSON.
+        """
+        self.fil.write(json.dumps({"op": op, "args": args}).encode() + b'\n')
+        self.fil.flush()
+        line = self.fil.readline()
+        if not line:
+            raise ConnectionError("daemon closed connection")
+        response = json.loads(line.decode())
+        if 'error' in response:
+            raise ERRORS.get(response['error'],
+                             RuntimeError)(response['message'])
+        return response['result']
+
+    def view_pending_tasks(self, start=None, stop=None):
+        return [(content, datetime.date.fromordinal(date))
+                for content, date in self.call('view_pending_tasks',
+                                               start, stop)]
+
+    def new_task(self, content, year, month, day):
+        return self.call('new_task', content, year, month, day)
+
+    def remove_pending_task(self, idx):
+        self.call('remove_pending_task', idx)
+
+    def edit_pending_task(self, idx, content, year, month, day):
+        self.call('edit_pending_task', idx, content, year, month, day)
+
+    def finish_task(self, idx):
+        self.call('finish_task', idx)
+
+    def view_finished_tasks(self, start=None, stop=None):
+        return [(content, datetime.date.fromordinal(date))
+                for content, date in self.call('view_finished_tasks',
+                                               start, stop)]
+
+    def clear_finished_tasks(self):
+        self.call('clear_finished_tasks')
+
+    def remove_finished_task(self, idx):
+        self.call('remove_finished_task', idx)
+
+    def edit_finished_task(self, idx, content, year, month, day):
+        self.call('edit_finished_task', idx, content, year, month, day)
+
+    def unfinish_task(self, idx):
+        self.call('unfinish_task', idx)
+
+    def shift_pending_tasks(self, days):
+        self.call('shift_pending_tasks', days)
+
+    def view_task(self, task_id):
+        content, date, finished = self.call('view_task', task_id)
+        return (content, datetime.date.fromordinal(date), finished)
+
+    def view_pending_tasks_with_ids(self, start=None, stop=None):
+        return [(task_id, content, datetime.date.fromordinal(date))
+                for task_id, content, date in
+                self.call('view_pending_tasks_with_ids', start, stop)]
+
+    def view_finished_tasks_with_ids(self, start=None, stop=None):
+        return [(task_id, content, datetime.date.fromordinal(date))
+                for task_id, content, date in
+                self.call('view_finished_tasks_with_ids', start, stop)]
+
+    def remove_pending_task_by_id(self, task_id):
+        self.call('remove_pending_task_by_id', task_id)
+
+    def edit_pending_task_by_id(self, task_id, content, year, month, day):
+        self.call('edit_pending_task_by_id', task_id, content, year, month,
+                  day)
+
+    def finish_task_by_id(self, task_id):
+        self.call('finish_task_by_id', task_id)
+
+    def remove_finished_task_by_id(self, task_id):
+        self.call('remove_finished_task_by_id', task_id)
+
+    def edit_finished_task_by_id(self, task_id, content, year, month, day):
+        self.call('edit_finished_task_by_id', task_id, content, year, month,
+                  day)
+
+    def unfinish_task_by_id(self, task_id):
+        self.call('unfinish_task_by_id', task_id)
+
+    def search_tasks(self, query):
+        return [(task_id, content, datetime.date.fromordinal(date), finished)
+                for task_id, content, date, finished in
+                self.call('search_tasks', query)]
+
+    def import_tasks(self, records):
+        """Add many tasks at once.
+
+        Records are sent IMPORT_CHUNK at a time, so that requests stay small.
+        """
+        count = 0
+        records = iter(records)
+        chunk = list(itertools.islice(records, IMPORT_CHUNK))
+        while chunk:
+            count += self.call('import_tasks',
+                               [(content, date.toordinal(), done)
+                                for content, date, done in chunk])
+            chunk = list(itertools.islice(records, IMPORT_CHUNK))
+        return count
+
+    def save_tasks(self):
+        self.call('save_tasks')
+
+    def get_savemethod(self):
+        return self.call('get_savemethod')
+
+    def get_available_savemethods(self):
+        return tuple(tuple(x) for x in
+                     self.call('get_available_savemethods'))
+
+    def set_savemethod(self, method):
+        self.call('set_savemethod', method)
+
+    def changes_detected(self):
+        return self.call('changes_detected')
+
+
+def main():
+    """Entry point for daemon.
+
+    Serves engine chosen by config until interrupted, then saves tasks if
+    they changed and closes engine.
+    """
+    import asyncio
+
+    config = configparser.ConfigParser()
+    config.read(CONFIG)
+    config['DEFAULT'].setdefault('engine', 'list')
+
+    server = EngineServer(lab.make_engine(config))
+    try:
+        asyncio.run(server.serve())
+    finally:
+        if server.engine.changes_detected():
+            server.engine.save_tasks()
+        server.engine.close()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    main()
@@ -25,23 +25,283 @@ This module provides implementations of Engine class for Arch_Lab program. You
 probably should not be importing it directly.
 """
 
+import os
 import sys
+import gc
+import random
 import datetime
 import bisect
+import functools
+import threading
+import contextlib
+import concurrent.futures
+import itertools
+import operator
+import collections
 import configparser
+import pickle
 import lab
+import registry
+from sortedlist import SortedTaskList
+from taskcolumns import TaskColumns, MAX_ORDINAL
+from autosave import Autosaver
+from watcher import Watcher
+from storagelock import StorageLock
+from rwlock import RWLock
+from search import TaskIndex, SEARCH_SUFFIX
 from lab import SAVEFILE
 from lab import CONFIG
 
-AVAILABLE_SAVEMETHODS = (('pickle', 'simple python-based object file format'),
-                         ('json', 'JavaScript object notation'),
-                         ('yaml', 'YAML file format'))
+IMPORT_BATCH = 1 << 16
+# Number of tasks in one chunk of a streamed task list.
+CHUNK = 1 << 16
+FINISHED_SUFFIX = '.finished'
+# Source of task IDs, reseeded in forked processes so that they do not
+# generate same IDs as their parent.
+_ids = random.Random()
+os.register_at_fork(after_in_child=_ids.seed)
+# Per-thread count of tasks loaded without IDs, refer to missing_ids.
+_missing = threading.local()
+# Mutators that change the list of finished tasks.
+FINISHED_MUTATORS = frozenset(('finish_task', 'clear_finished_tasks',
+                               'remove_finished_task', 'edit_finished_task',
+                               'unfinish_task'))
+
+
+def mutator(method):
+    """Decorate engine method that changes task lists.
+
+    Decorated method will notify engine about the change by calling it's
+    _mutated method with a journal record - method name and arguments. Method
+    should check it's arguments before it changes anything, as engine is not
+    notified if it raises, so that a failed call does not mark engine as
+    changed.
+
+    Method runs holding engine lock, so that it never interleaves with task
+    lists being copied for save. Task lists are kept as merge base before
+    first change after load or save, refer to ListEngine.save_tasks.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        with self.lock:
+            unchanged = self.base is None
+            self._keep_base()
+            try:
+                result = method(self, *args)
+            except BaseException:
+                if unchanged:
+                    self.base = None
+                raise
+            self._mutated(method.__name__, *args)
+            return result
+    return wrapper
+
+
+@contextlib.contextmanager
+def atomic_open(target, mode='wb', **kwargs):
+    """Open temporary file that replaces target once it is written.
+
+    File is flushed and fsynced before it is renamed over target, and the
+    directory is fsynced after that, so that target holds either old or new
+    contents whenever program or system crashes. If writing fails, temporary
+    file is removed and target is left alone. Temporary file is named after
+    process and thread, so that writers of same target never share it.
+
+    target: string - file name.
+    mode: string - 'wb' or 'w'; other arguments are passed to open.
+    """
+    tmp = '{}.{}.{}.tmp'.format(target, os.getpid(), threading.get_ident())
+    try:
+        with open(tmp, mode, **kwargs) as fil:
+            yield fil
+            fil.flush()
+            os.fsync(fil.fileno())
+        os.replace(tmp, target)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp)
+        raise
+    try:
+        fd = os.open(os.path.dirname(target) or os.curdir, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def gc_paused():
+    """Pause cyclic garbage collector for the duration of the block.
+
+    Loading builds millions of objects that never form cycles, and collector
+    would otherwise scan them again and again while they are created.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def chunked(item, size=CHUNK):
+    """Split two lists of tasks into chunks.
+
+    item: ([Task, -||-], [Task, -||-]) - pending and finished tasks.
+    size: int - greatest number of tasks in a chunk.
+    return: iterator of (int, [Task, -||-]) - list number, 0 for pending
+            and 1 for finished, and up to size of it's tasks, in order.
+    """
+    for index, tasks in enumerate(item):
+        for start in range(0, len(tasks), size):
+            yield index, list(tasks[start:start + size])
+
+
+def merge_tasks(base, ours, theirs):
+    """Three-way merge of sorted task lists.
+
+    Tasks added in ours since base are added to theirs, and tasks removed
+    in ours are removed from theirs. Same change done in both, like a task
+    added or finished in both, is applied once. Lists are walked together
+    one date at a time, so this takes linear time. Tasks of one date keep
+    order of theirs, with ones added in ours after them.
+
+    Tasks with same ID and content are one task, and merged list has it
+    once. That way a task finished in both is finished once, even if
+    finished tasks were loaded here after they were saved there, so that
+    ours has it twice.
+
+    base: sorted seq of Tasks - list both ours and theirs started from.
+    ours: sorted seq of Tasks - list changed here.
+    theirs: sorted seq of Tasks - list changed elsewhere.
+    return: [Task, -||-] - merged list, sorted.
+    """
+    merged = []
+    runs = [itertools.groupby(tasks, operator.attrgetter('ordinal'))
+            for tasks in (base, ours, theirs)]
+    heads = [next(run, None) for run in runs]
+    while heads != [None, None, None]:
+        ordinal = min(head[0] for head in heads if head is not None)
+        groups = []
+        for num, head in enumerate(heads):
+            if head is not None and head[0] == ordinal:
+                groups.append(list(head[1]))
+                heads[num] = next(runs[num], None)
+            else:
+                groups.append([])
+        merged.extend(_merge_date(*groups))
+    return merged
+
+
+def _merge_date(base, ours, theirs):
+    """Three-way merge of tasks scheduled on one date.
+
+    Refer to merge_tasks.
+
+    return: [Task, -||-]
+    """
+    if ours == base:
+        return theirs
+    if theirs == base:
+        return _unique(ours)
+    delta = collections.Counter(task.content for task in ours)
+    delta.subtract(task.content for task in base)
+    done = collections.Counter(task.content for task in theirs)
+    done.subtract(task.content for task in base)
+    for content, own in delta.items():
+        other = done[content]
+        if own > 0 and other > 0:
+            delta[content] = max(own - other, 0)
+        elif own < 0 and other < 0:
+            delta[content] = min(own - other, 0)
+    merged = []
+    for task in theirs:
+        if delta[task.content] < 0:
+            delta[task.content] += 1
+        else:
+            merged.append(task)
+    for task in ours:
+        if delta[task.content] > 0:
+            delta[task.content] -= 1
+            merged.append(task)
+    return _unique(merged)
+
+
+def _unique(tasks):
+    """Drop tasks with same ID and content as ones before them.
+
+    tasks: [Task, -||-]
+    return: [Task, -||-]
+    """
+    kept = set()
+    unique = []
+    for task in tasks:
+        key = (task.id, task.content)
+        if key not in kept:
+            kept.add(key)
+            unique.append(task)
+    return unique
+
+
+def savemethod_backend(method):
+    """Find file backend and savefile of a savemethod.
+
+    Backend is looked up in registry and only imported here. Savefile name
+    is taken from SAVEFILE and extension is savemethod-dependent. Raises
+    KeyError if method is unknown.
+
+    method: string - savemethod.
+    return: (FileBackend descendant, string) - backend and savefile.
+    """
+    savemethod = registry.find(method)
+    return savemethod.load(), SAVEFILE + savemethod.extension
+
+
+class Save():
+    """Task lists copied for save, to be written by ListEngine writer thread.
+
+    Attributes:
+      records - journal records to append, or None.
+      item - (pending, finished) task lists to save if records can't be
+             appended, as given by ListEngine._snapshot.
+      base - [pending, finished] task lists as they were last loaded or
+             saved, to merge with savefile if another process saved it.
+      write_finished - True if finished tasks should be saved into their
+                       section file.
+    """
+    def __init__(self, records, item, base, write_finished):
+        """Initialize self. Arguments are same as attributes."""
+        self.records = records
+        self.item = item
+        self.base = base
+        self.write_finished = write_finished
 
 
 class FileBackend():
     """Abstract class/interface for file backend implementations for
     EngineConfig class.
+
+    Attributes:
+      sections - True if ListEngine may store pending and finished tasks in
+                 separate files, so that finished ones are only loaded when
+                 needed. Backends that must see both lists at once set it to
+                 False.
+      streams - True if backend implements dump, parse, dump_chunks and
+                parse_chunks, so that it's files can be compressed and
+                streamed. Refer to compression.wrap and migrate.
+      appends - True if backend implements append.
+      text - True if dump and parse work with text streams, not binary.
     """
+    sections = True
+    streams = False
+    appends = False
+    text = False
+
     def __init__(self):
         if type(self) is FileBackend:
             raise TypeError("FileBackend should not be instantiated")
@@ -64,6 +324,65 @@ class FileBackend():
         """
         raise NotImplementedError()
 
+    def append(target, records):
+        """Append journal records to filename target.
+
+        Optional. Records are tuples of ListEngine mutator method name and
+        it's arguments, in order they were done since target was last loaded
+        or saved.
+
+        target: string - file name.
+        records: [(string, ...), -||-] - records to append.
+        return: boolean - True if records were appended, False if backend
+                can't do that and whole item should be saved instead.
+        """
+        return False
+
+    def dump(item, fil):
+        """Serialize item into open file fil.
+
+        Optional, implemented by backends with streams set to True.
+
+        item: any python data structure - item to serialize.
+        fil: file-like object, text or binary as given by text attribute.
+        """
+        raise NotImplementedError()
+
+    def parse(fil):
+        """Deserialize open file fil.
+
+        Optional, implemented by backends with streams set to True. Will
+        return tuple of two empty lists if file is empty.
+
+        fil: file-like object, text or binary as given by text attribute.
+        return: any Python data structure or ([], [])
+        """
+        raise NotImplementedError()
+
+    def dump_chunks(chunks, fil):
+        """Serialize chunks of two lists of Tasks into open file fil.
+
+        Optional, implemented by backends with streams set to True. File is
+        written as it would be by dump of the whole lists, without holding
+        them in memory at once. Chunks of pending tasks come first.
+
+        chunks: iterable of (int, [Task, -||-]) - list number, 0 for pending
+                and 1 for finished, and some of it's tasks. Refer to chunked.
+        fil: file-like object, text or binary as given by text attribute.
+        """
+        raise NotImplementedError()
+
+    def parse_chunks(fil):
+        """Deserialize two lists of Tasks from open file fil in chunks.
+
+        Optional, implemented by backends with streams set to True. Yields
+        nothing if file is empty.
+
+        fil: file-like object, text or binary as given by text attribute.
+        return: iterator of (int, [Task, -||-]), as taken by dump_chunks.
+        """
+        raise NotImplementedError()
+
 
 class EngineConfig(lab.Engine):
     """This class is intended to provide an unified configuration reading
@@ -78,20 +397,18 @@ class EngineConfig(lab.Engine):
     def __init__(self):
         """Initialize self.
 
-        Sets up file_backend as specified by config and savefile. Savefile
-        extensions are hard-coded and savemethod-dependent, and file name is
-        taken from SAVEFILE.
+        Sets up file_backend as specified by config and savefile.
 
-        Reads config parameter 'savemethod' and chooses file backend as
-        follows to be stored as self.file_backend:
-          pickle - pickle_backend.PickleFileBackend
-          json - json_backend.JsonFileBackend
-          yaml - yaml_backend.YamlFileBackend
-        Will output an error message and finish the program if 'savemethod' is
-        anything else.
+        Reads config parameter 'savemethod' and chooses file backend and
+        savefile with savemethod_backend, to be stored as self.file_backend
+        and self.savefile. Will output an error message and finish the
+        program if 'savemethod' is unknown.
 
         If 'savemethod' is not specified in config, pickle is chosen as
         default.
+
+        Reads config parameter 'compression' and wraps file backend into
+        compression layer, refer to compressed.
         """
         super().__init__()
         if type(self) is EngineConfig:
@@ -104,19 +421,34 @@ class EngineConfig(lab.Engine):
         except KeyError:
             self.config['DEFAULT']['savemethod'] = 'pickle'
 
-        if self.config['DEFAULT']['savemethod'] == 'pickle':
-            from pickle_backend import PickleFileBackend as file_backend
-            self.savefile = SAVEFILE + '.pkl'
-        elif self.config['DEFAULT']['savemethod'] == 'json':
-            from json_backend import JsonFileBackend as file_backend
-            self.savefile = SAVEFILE + '.json'
-        elif self.config['DEFAULT']['savemethod'] == 'yaml':
-            from yaml_backend import YamlFileBackend as file_backend
-            self.savefile = SAVEFILE + '.yaml'
-        else:
+        try:
+            file_backend, self.savefile = savemethod_backend(
+                self.config['DEFAULT']['savemethod'])
+        except KeyError:
+            print('WARNING: Config is broken!')
+            sys.exit(1)
+        self.file_backend = self.compressed(file_backend)
+
+    def compressed(self, file_backend):
+        """Wrap file backend into compression layer chosen by config.
+
+        Config parameter 'compression' is one of compression.CODECS (zlib,
+        lzma or bz2) or none, which is default. Files are recognized on load
+        whatever it is set to, so it can be changed any time. Backends that
+        can not be compressed are left as they are. Will output an error
+        message and finish the program if codec is unknown.
+
+        file_backend: FileBackend descendant.
+        return: FileBackend descendant.
+        """
+        import compression
+
+        try:
+            codec = compression.config_codec(self.config)
+        except ValueError:
             print('WARNING: Config is broken!')
             sys.exit(1)
-        self.file_backend = file_backend
+        return compression.wrap(file_backend, codec)
 
     def get_savemethod(self):
         return self.config['DEFAULT']['savemethod']
@@ -125,13 +457,13 @@ class EngineConfig(lab.Engine):
         """Get savemethods that are currently available.
 
         And their hopefully helpful descriptions. Available savemethods are
-        specified by AVAILABLE_SAVEMETHODS variable.
+        built-in ones and plugins found by registry.
 
         return: seq of two-item seqs ((string, string), -||-), where first item
                 in every seq is a savemethod and second is it's hopefully
                 helpful description.
         """
-        return AVAILABLE_SAVEMETHODS
+        return tuple((x.name, x.description) for x in registry.savemethods())
 
     def set_savemethod(self, method):
         """Change employed savemethod.
@@ -145,49 +477,226 @@ class EngineConfig(lab.Engine):
         with open(CONFIG, 'w') as fil:
             self.config.write(fil)
 
-        if self.config['DEFAULT']['savemethod'] == 'pickle':
-            from pickle_backend import PickleFileBackend as file_backend
-            self.savefile = SAVEFILE + '.pkl'
-        elif self.config['DEFAULT']['savemethod'] == 'json':
-            from json_backend import JsonFileBackend as file_backend
-            self.savefile = SAVEFILE + '.json'
-        elif self.config['DEFAULT']['savemethod'] == 'yaml':
-            from yaml_backend import YamlFileBackend as file_backend
-            self.savefile = SAVEFILE + '.yaml'
-        else:
+        try:
+            file_backend, self.savefile = savemethod_backend(
+                self.config['DEFAULT']['savemethod'])
+        except KeyError:
             print('WARNING: Config is broken!')
             sys.exit(1)
-        self.file_backend = file_backend
+        self.file_backend = self.compressed(file_backend)
 
 
 class ListEngine(EngineConfig):
     """Engine implementation for Arch_Lab.
 
     Extends EngineConfig with actual data management functionality.
+
+    Attributes:
+      generation - number of mutations done to task lists so far.
+      saved_generation - generation that was last loaded or saved.
+      saved_stat - (mtime, size) of savefile as it was last loaded or saved.
+                   Refer to file_stat.
+      saved_version - version stamp of savefile as it was last loaded or
+                      saved. Refer to storagelock.StorageLock.
+      base - [pending, finished] copies of task lists as they were before
+             first change since last load or save, or None if there were no
+             changes. Finished is None if finished tasks were not loaded.
+      saves - Saves submitted to writer thread that it did not start yet.
+      journal - list of changes done since last load or save, as recorded by
+                mutator, or None if some change could not be recorded.
+      columns - (generation, TaskColumns) cache for pending_columns.
+      ids - [generation, pending, finished] cache of dicts mapping task IDs to
+            Tasks, refer to _id_index. Dict is None until it is needed.
+      search_index - search.TaskIndex over both task lists, or None until
+                     it is needed, refer to search_tasks.
+      finished_changed - True if finished tasks differ from ones in their
+                         section file, so it has to be written on save.
+      lock - lock held while task lists are changed or copied for save, of
+             lock_type class attribute, threading.RLock by default.
+      writer - single thread executor that writes saves in background.
+      writes - futures of saves that were not waited for by flush yet.
+      autosaver - autosave.Autosaver saving tasks in background, or None if
+                  autosave is disabled.
+      watcher - watcher.Watcher reloading tasks saved by other processes, or
+                None if watching is disabled.
+      listeners - callbacks to call when tasks saved by other processes are
+                  applied to task lists, refer to watch.
+
+    If file backend supports sections, savefile only holds pending tasks and
+    finished ones are kept in savefile + FINISHED_SUFFIX. That file is only
+    loaded when finished_task_list is accessed, and only saved if it changed.
+
+    Saves are written on writer thread from copies of task lists, and tasks
+    themselves are never changed in place (edits replace Task objects), so
+    task lists may be changed while a save is being written.
+
+    Several processes may share a savefile. It is loaded holding a shared
+    lock and saved holding an exclusive one, and if another process saved it
+    since it was loaded, stored tasks are merged with ours instead of being
+    overwritten, refer to save_tasks. Changes saved by another process can
+    also be applied as they happen, refer to reload.
     """
+    lock_type = threading.RLock
+
     def __init__(self):
         """Initialize self with tasks stored previously.
 
         Will call load function of self.file backend given by configuration for
         current pending and finished lists and accordingly generated filename.
+
+        Finished tasks found in savefile (as written before sections were
+        introduced) are used and moved to their section on next save.
+
+        Tasks stored without IDs (as written before tasks had them) get new
+        ones, and engine is marked as changed, so that next save stores them
+        and they stay the same on later loads.
+
+        Reads config parameters 'autosave_mutations' and 'autosave_interval'.
+        If either is above zero, tasks are saved in background after that
+        many changes or every that many seconds. Both are 0 by default, which
+        disables autosave.
+
+        Reads config parameter 'watch_interval'. If it is above zero, savefile
+        is polled every that many seconds and tasks saved there by other
+        processes are reloaded, refer to reload. It is 0 by default, which
+        disables watching.
+
+        Reads config parameter 'save_search_index'. If it is true, search
+        index is kept in savefile + SEARCH_SUFFIX between runs, refer to
+        close, and loaded here if it matches savefile. It is false by
+        default.
+
+        Will output an error message and finish the program if these
+        parameters are not numbers.
         """
         super().__init__()
-        (self.pending_task_list,
-         self.finished_task_list) = self.file_backend.load(self.savefile)
-
-    def view_pending_tasks(self):
+        self.lock = self.lock_type()
+        self.writer = concurrent.futures.ThreadPoolExecutor(1)
+        self.writes = []
+        self._finished = None
+        self.finished_changed = False
+        self.base = None
+        self.saves = []
+        self.listeners = []
+        missing = missing_ids()
+        with self.storage_lock() as lock:
+            pending, finished = self.file_backend.load(self.savefile)
+            self.saved_version = lock.version()
+        new_ids = missing_ids() != missing
+        self.pending_task_list = pending
+        if finished or not self.file_backend.sections:
+            self.finished_task_list = finished
+            self.finished_changed = self.file_backend.sections
+        self.generation = 0
+        self.journal = []
+        self.columns = None
+        self.ids = None
+        self.search_index = None
+        self.mark_saved()
+
+        self.autosaver = None
+        self.watcher = None
+        try:
+            mutations = self.config['DEFAULT'].getint('autosave_mutations', 0)
+            interval = self.config['DEFAULT'].getfloat('autosave_interval', 0)
+            watch = self.config['DEFAULT'].getfloat('watch_interval', 0)
+            self.save_search_index = self.config['DEFAULT'].getboolean(
+                'save_search_index', False)
+        except ValueError:
+            print('WARNING: Config is broken!')
+            sys.exit(1)
+        if self.save_search_index:
+            self.search_index = self._load_search_index()
+        if mutations > 0 or interval > 0:
+            self.autosaver = Autosaver(self, max(mutations, 0),
+                                       max(interval, 0))
+        if watch > 0:
+            self.watcher = Watcher(self, watch)
+        if new_ids:
+            self._mutated()
+
+    @property
+    def finished_task_list(self):
+        """List of finished tasks, loaded on first access.
+
+        Engine is marked as changed if loaded tasks had no IDs, refer to
+        __init__.
+        """
+        if self._finished is None:
+            missing = missing_ids()
+            self._finished = self._load_finished()
+            if self.base is not None:
+                self.base[1] = ListEngine._copy(self._finished)
+            if missing_ids() != missing:
+                self._mutated()
+        return self._finished
+
+    @finished_task_list.setter
+    def finished_task_list(self, tasks):
+        self._finished = tasks
+
+    def view_pending_tasks(self, start=None, stop=None):
         """Fetch pending tasks.
 
         Returns the list of stored pending tasks as a list of tuples.
 
+        start: int - position of first task to fetch, optional.
+        stop: int - position after last task to fetch, optional.
         return: [(string, datetime.date), -||-]
         """
-        return [(task.content, task.date)
-                for task in self.pending_task_list]
+        if start is None and stop is None:
+            tasks = self.pending_task_list
+        else:
+            tasks = self.pending_task_list[start:stop]
+        return [(task.content, task.date) for task in tasks]
+
+    def pending_columns(self):
+        """Fetch pending tasks in columnar form.
+
+        Result is cached until task lists change, so that any number of date
+        queries costs one pass over the pending list. After any change it is
+        built anew, except after shift_pending_tasks. It is shared by all
+        callers, so it's columns are read-only.
+
+        return: TaskColumns
+        """
+        if self.columns is None or self.columns[0] != self.generation:
+            self.columns = (self.generation,
+                            TaskColumns(self.pending_task_list))
+        return self.columns[1]
 
     def new_task(self, content, year, month, day):
-        bisect.insort(self.pending_task_list, Task(content, year, month, day))
+        """Add a new pending task.
+
+        Task gets a new ID, refer to add_task for the rest.
+
+        return: int - ID of the new task.
+        """
+        task_id = Task.new_id()
+        with self.lock:
+            self.add_task(task_id, content, year, month, day)
+            self._reindex(task_id, None, False,
+                          datetime.date(year, month, day).toordinal())
+        return task_id
+
+    @mutator
+    def add_task(self, task_id, content, year, month, day):
+        """Add a new pending task with given ID.
+
+        Journal records this rather than new_task, so that the task gets
+        same ID when journal is replayed.
 
+        task_id: int - task ID, refer to Task.new_id.
+        content: string - task description.
+        year: int - year task is scheduled on.
+        month: int - month task is scheduled on.
+        day: int - day task is scheduled on.
+        """
+        task = Task(content, year, month, day, task_id)
+        bisect.insort(self.pending_task_list, task)
+        self._index((), (task,))
+
+    @mutator
     def remove_pending_task(self, idx):
         """Remove task from the list of pending tasks.
 
@@ -195,45 +704,59 @@ class ListEngine(EngineConfig):
 
         idx: int - descriptor, namely position of a task in the list.
         """
-        self.pending_task_list.pop(idx)
+        self._index((self.pending_task_list.pop(idx),), ())
 
+    @mutator
     def edit_pending_task(self, idx, content, year, month, day):
         """Edit a task in the list of pending tasks.
 
         If content is "", description will not change. If either of year,
         month or date is None, all three of them will not change.
 
+        Task is moved to keep the list sorted if it's date changes.
+
         idx: int - descriptor, namely position of a task in the list.
         content: string - new task description.
         year: int - new year task is scheduled on.
         month: int - new month task is scheduled on.
         day: int - new day task is scheduled on.
         """
-        if content != "":
-            self.pending_task_list[idx].content = content
-        if year is not None and month is not None and day is not None:
-            self.pending_task_list[idx].date = datetime.date(year, month, day)
+        self._index(*ListEngine._edit_task(self.pending_task_list,
+                                           idx, content, year, month, day))
 
+    @mutator
     def finish_task(self, idx):
-        bisect.insort(self.finished_task_list, self.pending_task_list.pop(idx))
+        finished = self.finished_task_list
+        task = self.pending_task_list.pop(idx)
+        bisect.insort(finished, task)
+        self._index((task,), (task,), True)
 
-    def view_finished_tasks(self):
+    def view_finished_tasks(self, start=None, stop=None):
         """Fetch finished tasks.
 
         Returns the list of stored finished tasks as a list of tuples.
 
+        start: int - position of first task to fetch, optional.
+        stop: int - position after last task to fetch, optional.
         return: [(string, datetime.date), -||-]
         """
-        return [(task.content, task.date)
-                for task in self.finished_task_list]
+        if start is None and stop is None:
+            tasks = self.finished_task_list
+        else:
+            tasks = self.finished_task_list[start:stop]
+        return [(task.content, task.date) for task in tasks]
 
+    @mutator
     def clear_finished_tasks(self):
         """Remove all finished tasks.
 
         List of finished tasks will be empty after this.
         """
+        if self.search_index is not None:
+            self._index(self.finished_task_list, ())
         self.finished_task_list = []
 
+    @mutator
     def remove_finished_task(self, idx):
         """Remove task from the list of finished tasks.
 
@@ -241,65 +764,1194 @@ class ListEngine(EngineConfig):
 
         idx: int - descriptor, namely position of a task in the list.
         """
-        self.finished_task_list.pop(idx)
+        self._index((self.finished_task_list.pop(idx),), ())
 
+    @mutator
     def edit_finished_task(self, idx, content, year, month, day):
         """Edit a task in the list of finished tasks.
 
         If content is "", description will not change. If either of year,
         month or date is None, all three of them will not change.
 
+        Task is moved to keep the list sorted if it's date changes.
+
         idx: int - descriptor, namely position of a task in the list.
         content: string - new task description.
         year: int - new year task is scheduled on.
         month: int - new month task is scheduled on.
         day: int - new day task is scheduled on.
         """
-        if content != "":
-            self.finished_task_list[idx].content = content
-        if year is not None and month is not None and day is not None:
-            self.finished_task_list[idx].date = datetime.date(year, month, day)
+        self._index(*ListEngine._edit_task(self.finished_task_list,
+                                           idx, content, year, month, day),
+                    finished=True)
 
+    @mutator
     def unfinish_task(self, idx):
-        bisect.insort(self.pending_task_list, self.finished_task_list.pop(idx))
+        task = self.finished_task_list.pop(idx)
+        bisect.insort(self.pending_task_list, task)
+        self._index((task,), (task,))
+
+    @mutator
+    def shift_pending_tasks(self, days):
+        """Move every pending task by days.
+
+        Pending tasks are sorted by date, so ValueError is raised before any
+        task is moved if first or last date gets out of range. Tasks are
+        replaced with moved copies having same IDs, one by one, so that save
+        being written is not affected, and keep their order. If columnar view
+        was cached for pending_columns, it is moved too, refer to
+        TaskColumns.shifted.
+
+        days: int - number of days to add, may be negative.
+        """
+        if type(days) is not int:
+            raise TypeError("Number of days should be an int")
+        tasks = self.pending_task_list
+        if tasks and (tasks[0].ordinal + days < 1 or
+                      tasks[-1].ordinal + days > MAX_ORDINAL):
+            raise ValueError("date out of range")
+        columns = self.columns
+        self._adopt([Task.from_ordinal(task.content, task.ordinal + days,
+                                       task.id)
+                     for task in tasks], None)
+        if columns is not None and columns[0] == self.generation:
+            # mutator bumps generation once this returns
+            self.columns = (self.generation + 1, columns[1].shifted(days))
+
+    def view_task(self, task_id):
+        """Fetch task by ID.
+
+        Raises KeyError if there is no such task. Finished tasks are loaded
+        if task is not pending.
+
+        task_id: int - task ID, as returned by new_task.
+        return: (string, datetime.date, boolean) - description, date and
+                whether task is finished.
+        """
+        for finished in (False, True):
+            task = self._id_index(finished).get(task_id)
+            if task is not None:
+                return (task.content, task.date, finished)
+        raise KeyError(task_id)
+
+    def view_pending_tasks_with_ids(self, start=None, stop=None):
+        """Fetch pending tasks along with their IDs.
+
+        Same as view_pending_tasks otherwise.
+
+        return: [(int, string, datetime.date), -||-]
+        """
+        if start is None and stop is None:
+            tasks = self.pending_task_list
+        else:
+            tasks = self.pending_task_list[start:stop]
+        return [(task.id, task.content, task.date) for task in tasks]
+
+    def view_finished_tasks_with_ids(self, start=None, stop=None):
+        """Fetch finished tasks along with their IDs.
+
+        Same as view_finished_tasks otherwise.
+
+        return: [(int, string, datetime.date), -||-]
+        """
+        if start is None and stop is None:
+            tasks = self.finished_task_list
+        else:
+            tasks = self.finished_task_list[start:stop]
+        return [(task.id, task.content, task.date) for task in tasks]
+
+    def remove_pending_task_by_id(self, task_id):
+        """Remove pending task by ID.
+
+        Raises KeyError if there is no such pending task.
+
+        task_id: int - task ID, as returned by new_task.
+        """
+        with self.lock:
+            self.remove_pending_task(self._find_id(False, task_id))
+            self._reindex(task_id, False, None)
+
+    def edit_pending_task_by_id(self, task_id, content, year, month, day):
+        """Edit pending task by ID.
+
+        Raises KeyError if there is no such pending task. Refer to
+        edit_pending_task for the rest.
+        """
+        with self.lock:
+            ordinal = self._edited_ordinal(False, task_id, year, month, day)
+            self.edit_pending_task(self._find_id(False, task_id),
+                                   content, year, month, day)
+            self._reindex(task_id, False, False, ordinal)
+
+    def finish_task_by_id(self, task_id):
+        """Finish pending task by ID.
+
+        Raises KeyError if there is no such pending task.
+
+        task_id: int - task ID, as returned by new_task.
+        """
+        with self.lock:
+            ordinal = self._id_index(False)[task_id].ordinal
+            self.finish_task(self._find_id(False, task_id))
+            self._reindex(task_id, False, True, ordinal)
+
+    def remove_finished_task_by_id(self, task_id):
+        """Remove finished task by ID.
+
+        Raises KeyError if there is no such finished task.
+
+        task_id: int - task ID, as returned by new_task.
+        """
+        with self.lock:
+            self.remove_finished_task(self._find_id(True, task_id))
+            self._reindex(task_id, True, None)
+
+    def edit_finished_task_by_id(self, task_id, content, year, month, day):
+        """Edit finished task by ID.
+
+        Raises KeyError if there is no such finished task. Refer to
+        edit_finished_task for the rest.
+        """
+        with self.lock:
+            ordinal = self._edited_ordinal(True, task_id, year, month, day)
+            self.edit_finished_task(self._find_id(True, task_id),
+                                    content, year, month, day)
+            self._reindex(task_id, True, True, ordinal)
+
+    def unfinish_task_by_id(self, task_id):
+        """Return finished task to pending ones by ID.
+
+        Raises KeyError if there is no such finished task.
+
+        task_id: int - task ID, as returned by new_task.
+        """
+        with self.lock:
+            ordinal = self._id_index(True)[task_id].ordinal
+            self.unfinish_task(self._find_id(True, task_id))
+            self._reindex(task_id, True, False, ordinal)
+
+    def search_tasks(self, query):
+        """Find tasks whose description has every word of query.
+
+        Search index is built on first search, loading finished tasks, and
+        then kept up to date by every change, so that search only costs as
+        much as the rarest word of query. Refer to search.TaskIndex.
+
+        query: string - words to look for, case is ignored.
+        return: [(int, string, datetime.date, boolean), -||-] - ID,
+                description, date and whether task is finished, pending
+                tasks first, both ordered by date.
+        """
+        with self.lock, gc_paused():
+            if self.search_index is None:
+                self.search_index = TaskIndex.build(self.pending_task_list,
+                                                    self.finished_task_list)
+            elif (self.search_index.tasks is None and
+                  not self.search_index.attach(self.pending_task_list,
+                                               self.finished_task_list)):
+                self.search_index = TaskIndex.build(self.pending_task_list,
+                                                    self.finished_task_list)
+            return [(task.id, task.content, task.date, finished)
+                    for task, finished in self.search_index.search(query)]
+
+    def import_tasks(self, records):
+        """Add many tasks at once.
+
+        Records are taken IMPORT_BATCH at a time, every batch is sorted and
+        appended to the lists, and the lists are sorted once at the end.
+        Timsort merges the sorted runs in near-linear time, instead of moving
+        list items for every task like new_task does. Tasks with equal dates
+        end up in the same order as if they were added with new_task.
+
+        Imported tasks are not journaled, so next save writes all the tasks.
+        Finished tasks are only loaded if there are finished ones to import.
+        If records raise an error, batches imported before it are kept, and
+        engine is only marked as changed if there were any.
+
+        records: iterable of (string, datetime.date, boolean) - description,
+                 date and whether task is finished.
+        return: int - number of imported tasks.
+        """
+        with self.lock:
+            unchanged = self.base is None
+            self._keep_base()
+            pending = list(self.pending_task_list)
+            finished = []
+            count = 0
+            records = iter(records)
+            try:
+                batch = list(itertools.islice(records, IMPORT_BATCH))
+                while batch:
+                    new = ([], [])
+                    for content, date, done in batch:
+                        if type(content) is not str:
+                            raise TypeError("Task content should be a string")
+                        new[bool(done)].append(
+                            Task.from_ordinal(content, date.toordinal()))
+                    for done, tasks, part in zip((False, True),
+                                                 (pending, finished), new):
+                        part.sort(key=operator.attrgetter('ordinal'))
+                        tasks.extend(part)
+                        self._index((), part, done)
+                    count += len(batch)
+                    batch = list(itertools.islice(records, IMPORT_BATCH))
+            finally:
+                pending.sort(key=operator.attrgetter('ordinal'))
+                self.pending_task_list = pending
+                if finished:
+                    finished[:0] = self.finished_task_list
+                    finished.sort(key=operator.attrgetter('ordinal'))
+                    self.finished_task_list = finished
+                if count:
+                    self._mutated()
+                elif unchanged:
+                    self.base = None
+        return count
 
     def save_tasks(self):
         """Serialize task lists.
 
         Will serialize tasks using a FileBackend descendant. Refer to
         EngineConfig for details.
+
+        If file backend supports appending, only journal of changes done
+        since last load or save is written. If it supports sections, finished
+        tasks are only written if they changed.
+
+        Finished section is written before savefile, so that crash in between
+        may duplicate a task that was just finished, but never lose it.
+
+        Task lists are copied and written on writer thread, so this returns
+        before they are on disk. Use flush to wait for that.
+
+        Writer thread locks savefile exclusively while writing it, waiting for
+        other processes to finish their saves. If savefile was saved by
+        another process since it was last loaded or saved here, as told by
+        it's version stamp, tasks stored there are merged with ours and
+        written whole, refer to merge_tasks. Changes merged from savefile are
+        applied to task lists then.
+        """
+        with self.lock:
+            records, self.journal = self.journal, []
+            item = self._snapshot()
+            base, self.base = self.base, None
+            if base is None:
+                base = list(item)
+            write_finished = self.finished_changed
+            self.finished_changed = False
+            self.saved_generation = self.generation
+            save = Save(records, item, base, write_finished)
+            self.saves.append(save)
+            self.writes = [write for write in self.writes
+                           if not write.done() or write.exception()]
+            self.writes.append(self.writer.submit(
+                self._write, self.file_backend, self.savefile, save))
+
+    def flush(self):
+        """Wait until all saves are written.
+
+        Raises error of a save that failed. Next save will write all the
+        tasks then.
+        """
+        with self.lock:
+            writes, self.writes = self.writes, []
+        for write in writes:
+            write.result()
+
+    def close(self):
+        """Finish using engine.
+
+        Stops autosaver and watcher, then waits until all saves are written,
+        so that nothing is written after this returns. If
+        'save_search_index' config parameter is true, search index is written
+        to savefile + SEARCH_SUFFIX then, as long as it changed and all the
+        changes are saved, with savefile version, modification time and size,
+        so that it is only loaded while savefile stays the same.
         """
-        self.file_backend.save(self.savefile,
-                               (self.pending_task_list,
-                                self.finished_task_list))
+        self.stop_autosave()
+        watcher, self.watcher = self.watcher, None
+        if watcher is not None:
+            watcher.stop()
+        self.flush()
+        with self.lock:
+            index = self.search_index
+            if (not self.save_search_index or index is None or
+                    not index.changed or
+                    self.generation != self.saved_generation):
+                return
+            stamp = (self.saved_version, self.saved_stat)
+            with atomic_open(self.savefile + SEARCH_SUFFIX) as fil:
+                pickle.dump((stamp, index), fil, pickle.HIGHEST_PROTOCOL)
+            index.changed = False
+
+    def set_savemethod(self, method):
+        """Change employed savemethod.
+
+        Same as EngineConfig.set_savemethod. Nothing is done if method is
+        the one employed already. As new savefile does not have current tasks
+        in it, next save will write them all. Finished tasks are loaded first,
+        as they may only be in the old savefile.
+
+        Tasks already stored in new savefile are overwritten, not merged.
+        They are kept as merge base, so that tasks saved there by other
+        processes afterwards are merged on next save, refer to save_tasks.
+        """
+        if method == self.get_savemethod():
+            return
+        self.flush()
+        with self.lock:
+            self._finished = self.finished_task_list
+            super().set_savemethod(method)
+            with self.storage_lock() as lock:
+                pending, finished = self.file_backend.load(self.savefile)
+                if self.file_backend.sections and not finished:
+                    finished = self.file_backend.load(
+                        self.finished_file())[1]
+                self.saved_version = lock.version()
+            self.base = [pending, finished]
+            self.journal = None
+            self.finished_changed = True
 
     def changes_detected(self):
-        return self.file_backend.load(
-            self.savefile
-        ) != (self.pending_task_list,
-              self.finished_task_list)
+        """Answers if task set changed.
+
+        Specifically, if currently used task set differs from stored ones.
+
+        As long as savefile was not touched since last load or save, as told
+        by it's modification time and size, compares generation counters only.
+        If savefile changed on disk, falls back to loading it and comparing
+        tasks one by one. Finished section is not loaded for that, changes to
+        finished tasks are tracked by finished_changed instead.
+
+        Waits for saves being written first.
+        """
+        self.flush()
+        if self.file_stat() != self.saved_stat:
+            pending, finished = self.file_backend.load(self.savefile)
+            if self.file_backend.sections and not finished:
+                return (self.finished_changed or
+                        pending != self.pending_task_list)
+            return (pending, finished) != (self.pending_task_list,
+                                           self.finished_task_list)
+        return self.generation != self.saved_generation
+
+    def stop_autosave(self):
+        """Stop autosaver, if there is one.
+
+        Waits for a checkpoint being written, so that no autosave is started
+        after this returns. Changes done afterwards are only saved by
+        save_tasks.
+        """
+        with self.lock:
+            autosaver, self.autosaver = self.autosaver, None
+        if autosaver is not None:
+            autosaver.stop()
+
+    def watch(self, callback):
+        """Register callback to call when tasks saved by another process
+        are applied to task lists.
+
+        Callback is called without arguments on writer thread, holding
+        engine lock, so it may view tasks but should not change them.
+
+        callback: callable.
+        """
+        self.listeners.append(callback)
+
+    def reload(self):
+        """Apply tasks saved by another process to task lists.
+
+        Does nothing if savefile was not saved since it was last loaded or
+        saved here, as told by it's version stamp. Otherwise tasks that were
+        removed from or added to savefile since then are removed from or
+        added to task lists one by one, keeping changes done here, and
+        listeners are notified, refer to watch. Finished tasks are only
+        reloaded if they were loaded.
+
+        Is done on writer thread, so that it never interleaves with a save.
+        If a save is waiting to be written, does nothing, as that save will
+        merge with savefile anyway. Search index is built anew on next search
+        after tasks are reloaded.
+
+        return: boolean - True if task lists were changed.
+        """
+        return self.writer.submit(self._reload).result()
+
+    def mark_saved(self):
+        """Remember that task lists are same as ones in savefile now.
+
+        Stores current generation and savefile modification time and size.
+        """
+        self.saved_generation = self.generation
+        self.saved_stat = self.file_stat()
+
+    def storage_lock(self, exclusive=False):
+        """Lock savefile against other processes.
+
+        exclusive: boolean - take exclusive lock, for saving, instead of
+                   shared one, for loading.
+        return: storagelock.StorageLock - acquired lock.
+        """
+        return StorageLock(self.savefile).acquire(exclusive)
+
+    def finished_file(self):
+        """Get name of the file finished tasks are stored in.
+
+        return: string - savefile + FINISHED_SUFFIX.
+        """
+        return self.savefile + FINISHED_SUFFIX
+
+    def file_stat(self):
+        """Stat savefile cheaply.
+
+        return: (int, int) - modification time in nanoseconds and size, or
+                None if savefile does not exist.
+        """
+        try:
+            stat = os.stat(self.savefile)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _mutated(self, *record):
+        """Register a change done to task lists.
+
+        record: (string, ...) - mutator method name and it's arguments. If
+                empty, change can't be journaled and next save will write
+                all the tasks.
+        """
+        self.generation += 1
+        if self.autosaver is not None:
+            self.autosaver.notify()
+        if self._finished is not None and (not record or
+                                           record[0] in FINISHED_MUTATORS):
+            self.finished_changed = True
+        if self.journal is not None:
+            if record:
+                self.journal.append(record)
+            else:
+                self.journal = None
+
+    def _keep_base(self):
+        """Copy task lists as merge base if they were not changed yet.
+
+        Called before every change. Lists are only copied once after load or
+        save, and tasks are shared with the copies, as they are never changed
+        in place. Refer to _copy.
+        """
+        if self.base is None:
+            self.base = [ListEngine._copy(self.pending_task_list),
+                         None if self._finished is None
+                         else ListEngine._copy(self._finished)]
+
+    def _copy(tasks):
+        """Copy task list.
+
+        Lists that decode tasks lazily, like binary_backend.MappedTaskList,
+        are copied with their copy method, so that tasks are not decoded
+        before they are needed.
+
+        tasks: seq of Tasks
+        return: seq of Tasks
+        """
+        if hasattr(tasks, 'copy'):
+            return tasks.copy()
+        return list(tasks)
+
+    def _merge_saved(backend, target, item, base):
+        """Merge task lists with ones another process saved.
+
+        Refer to save_tasks. Finished tasks are only merged if they were
+        loaded here, otherwise ones in their section file stay as they are.
+        They are merged against their section file as it was when they were
+        loaded, which may be newer than savefile loaded before it. A task
+        finished both here and there is still finished once, as it keeps it's
+        ID, refer to merge_tasks.
+
+        backend: FileBackend descendant savefile is stored with.
+        target: string - savefile.
+        item: (pending, finished) - task lists being saved, finished is None
+              if they were not loaded.
+        base: [pending, finished] - task lists as they were last loaded or
+              saved.
+        return: (pending, finished) - merged task lists.
+        """
+        theirs = backend.load(target)
+        pending = merge_tasks(base[0], item[0], theirs[0])
+        finished = None
+        if item[1] is not None:
+            if backend.sections and not theirs[1]:
+                theirs = ([], backend.load(target + FINISHED_SUFFIX)[1])
+            finished = merge_tasks(base[1], item[1], theirs[1])
+        return pending, finished
+
+    def _rebase(self, item, merged):
+        """Apply changes merged from savefile to task lists.
+
+        Runs on writer thread once merged tasks are saved. Changes done since
+        task lists were copied for save are kept. Merge base and saves that
+        are not written yet are rebased the same way, so that they include
+        merged changes too.
+
+        item: (pending, finished) - task lists as they were copied for save.
+        merged: (pending, finished) - task lists as saved, finished is None
+                if they were not merged.
+        """
+        def rebase(lists):
+            return [lists[num] if merged[num] is None or lists[num] is None
+                    else merge_tasks(item[num], lists[num], merged[num])
+                    for num in (0, 1)]
+
+        with self.lock:
+            unchanged = self.generation == self.saved_generation
+            pending, finished = rebase([self.pending_task_list,
+                                        self._finished])
+            self._adopt(pending, None if merged[1] is None else finished)
+            if self.base is not None:
+                self.base = rebase(self.base)
+            for save in self.saves:
+                save.item = tuple(rebase(save.item))
+                save.base = rebase(save.base)
+                save.records = None
+                save.write_finished |= merged[1] is not None
+            self.journal = None
+            self.generation += 1
+            if unchanged:
+                self.saved_generation = self.generation
+            self._notify()
+
+    def _adopt(self, pending, finished):
+        """Replace task lists with merged or moved ones.
+
+        Search index is dropped, to be built anew when needed.
+
+        pending: [Task, -||-] - new pending tasks.
+        finished: [Task, -||-] - new finished tasks, or None to keep them.
+        """
+        self.pending_task_list = pending
+        if finished is not None:
+            self.finished_task_list = finished
+        self.search_index = None
+
+    def _reload(self):
+        """Apply tasks saved by another process. Runs on writer thread.
+
+        Refer to reload.
+
+        return: boolean - True if task lists were changed.
+        """
+        with self.storage_lock() as lock:
+            version = lock.version()
+            if version == self.saved_version:
+                return False
+            stat = self.file_stat()
+            pending, finished = self.file_backend.load(self.savefile)
+            if self._finished is None:
+                finished = None
+            elif self.file_backend.sections and not finished:
+                finished = self.file_backend.load(self.finished_file())[1]
+
+        with self.lock:
+            if self.saves:
+                return False
+            theirs = (pending, None if self._finished is None else finished)
+            base = self.base or (self.pending_task_list, self._finished)
+            delta = [None if theirs[num] is None or base[num] is None
+                     else ListEngine._diff_tasks(base[num], theirs[num])
+                     for num in (0, 1)]
+            for tasks, changes in zip((self.pending_task_list,
+                                       self._finished), delta):
+                if changes is not None:
+                    self._apply_delta(tasks, *changes)
+            self.search_index = None
+            if self.base is not None:
+                self.base = [old if changes is None
+                             else ListEngine._copy(tasks)
+                             for tasks, old, changes in zip(theirs, self.base,
+                                                            delta)]
+            # Reloaded tasks are placed by date, which may order tasks of
+            # same date unlike savefile does, so positional journal records
+            # would not replay; next save writes all the tasks instead.
+            self.journal = None
+            unchanged = self.generation == self.saved_generation
+            self.generation += 1
+            if unchanged:
+                self.saved_generation = self.generation
+            self.saved_version = version
+            self.saved_stat = stat
+            self._notify()
+        return True
+
+    def _diff_tasks(old, new):
+        """Find tasks removed and added between two task lists.
+
+        Equal tasks are counted, so that removing one of two same tasks is
+        told apart from removing both.
+
+        old: [Task, -||-] - task list as it was.
+        new: [Task, -||-] - task list as it is.
+        return: ([Task, -||-], [Task, -||-]) - removed and added tasks.
+        """
+        old, new = collections.Counter(old), collections.Counter(new)
+        return list((old - new).elements()), list((new - old).elements())
+
+    def _apply_delta(self, tasks, removed, added):
+        """Remove and add tasks one by one, keeping task list sorted.
+
+        Removed tasks that are not there any more are skipped.
+
+        tasks: [Task, -||-] - task list to change.
+        removed: [Task, -||-] - tasks to remove.
+        added: [Task, -||-] - tasks to add.
+        """
+        for task in removed:
+            ListEngine._discard_task(tasks, task)
+        for task in added:
+            bisect.insort(tasks, task)
+
+    def _discard_task(tasks, task):
+        """Remove a task equal to given one from sorted task list, if there
+        is one.
+
+        tasks: [Task, -||-] or SortedTaskList - task list to change.
+        task: Task - task to remove.
+        """
+        idx = bisect.bisect_left(tasks, task)
+        while idx < len(tasks) and not task < tasks[idx]:
+            if tasks[idx] == task:
+                tasks.pop(idx)
+                return
+            idx += 1
+
+    def _notify(self):
+        """Call listeners, printing their errors to stderr."""
+        for callback in self.listeners:
+            try:
+                callback()
+            except Exception as e:
+                print("WARNING: listener failed: {}".format(e),
+                      file=sys.stderr)
+
+    def _snapshot(self):
+        """Copy task lists for save.
+
+        Lists are copied with _copy, so that lazily decoded ones are not
+        decoded holding engine lock. Copies are turned into plain lists, that
+        every FileBackend can handle, on writer thread, refer to _write.
+
+        return: (pending, finished) - finished is None if they were not
+                loaded.
+        """
+        return (ListEngine._copy(self.pending_task_list),
+                None if self._finished is None
+                else ListEngine._copy(self._finished))
+
+    def _write(self, backend, target, save):
+        """Write a save. Runs on writer thread.
+
+        If savefile was saved by another process, merges with it first,
+        refer to save_tasks. If save fails, next one will write all the tasks
+        and merge with savefile.
+
+        backend: FileBackend descendant to write with.
+        target: string - savefile.
+        save: Save - task lists to write.
+        """
+        with self.lock:
+            self.saves.remove(save)
+        records, item, base = save.records, save.item, save.base
+        write_finished = save.write_finished
+        merged = None
+        try:
+            with self.storage_lock(exclusive=True) as lock:
+                if lock.version() != self.saved_version:
+                    merged = ListEngine._merge_saved(backend, target, item,
+                                                     base)
+                    records = None
+                    write_finished = merged[1] is not None
+                saved = item if merged is None else merged
+                self.saved_version = lock.bump()
+                if records is None or not backend.append(target, records):
+                    saved = tuple(None if tasks is None else list(tasks)
+                                  for tasks in saved)
+                    if not backend.sections:
+                        backend.save(target, saved)
+                    else:
+                        if write_finished:
+                            backend.save(target + FINISHED_SUFFIX,
+                                         ([], saved[1]))
+                        backend.save(target, (saved[0], []))
+        except BaseException:
+            with self.lock:
+                self.journal = None
+                self.finished_changed = self._finished is not None
+                self.saved_generation = None
+                self.saved_version = None
+                self.base = base
+                for save in self.saves:
+                    save.base = base
+                    save.records = None
+                    save.write_finished = save.item[1] is not None
+            raise
+        if merged is not None:
+            self._rebase(item, merged)
+        stat = self.file_stat()
+        with self.lock:
+            self.saved_stat = stat
+
+    def _load_finished(self):
+        """Load finished tasks from their section file.
+
+        return: list of finished Tasks.
+        """
+        return self.file_backend.load(self.finished_file())[1]
+
+    def _id_index(self, finished):
+        """Get dict mapping IDs of pending or finished tasks to Tasks.
+
+        Dict is built on first use and kept until task lists change, except
+        for changes done by ID, which update it in place, refer to _reindex.
+        So any number of lookups by ID costs one pass over the list.
+
+        finished: bool - whether to index finished tasks.
+        return: {int: Task}
+        """
+        ids = self.ids
+        if ids is None or ids[0] != self.generation:
+            ids = self.ids = [self.generation, None, None]
+        if ids[1 + finished] is None:
+            tasks = self.finished_task_list if finished else \
+                self.pending_task_list
+            ids[1 + finished] = {task.id: task for task in tasks}
+        return ids[1 + finished]
+
+    def _find_id(self, finished, task_id):
+        """Find position of task by ID.
+
+        Raises KeyError if there is no such task.
+
+        finished: bool - whether to look for finished task.
+        task_id: int - task ID.
+        return: int - position of task in it's list.
+        """
+        task = self._id_index(finished)[task_id]
+        tasks = self.finished_task_list if finished else self.pending_task_list
+        return self._position(tasks, task.ordinal, task_id)
+
+    def _position(self, tasks, ordinal, task_id):
+        """Find position of task by ID and date in sorted sequence tasks.
+
+        Tasks with same date are next to each other, so only those are
+        looked through.
+
+        Raises KeyError if there is no such task.
+        """
+        idx = self._bisect(tasks, Task.from_ordinal("", ordinal, 0))
+        for idx in range(idx, len(tasks)):
+            task = tasks[idx]
+            if task.id == task_id:
+                return idx
+            if task.ordinal != ordinal:
+                break
+        raise KeyError(task_id)
+
+    def _bisect(self, tasks, task):
+        """Find position of first task not less than task in sorted list."""
+        return bisect.bisect_left(tasks, task)
+
+    def _edited_ordinal(self, finished, task_id, year, month, day):
+        """Get date ordinal task will have after it is edited by ID.
+
+        Raises KeyError if there is no such task.
+        """
+        task = self._id_index(finished)[task_id]
+        if year is None or month is None or day is None:
+            return task.ordinal
+        return datetime.date(year, month, day).toordinal()
+
+    def _reindex(self, task_id, source, target, ordinal=None):
+        """Update ID index after one change of task task_id.
+
+        Index is only updated if it was up to date before the change,
+        otherwise it is rebuilt when needed. Caller should hold lock.
+
+        task_id: int - ID of changed task.
+        source: bool - whether task was finished, None for a new task.
+        target: bool - whether task is finished now, None if it was removed.
+        ordinal: int - date ordinal task has now, if target is not None.
+        """
+        ids = self.ids
+        if ids is None or ids[0] != self.generation - 1:
+            return
+        if source is not None and ids[1 + source] is not None:
+            del ids[1 + source][task_id]
+        if target is not None and ids[1 + target] is not None:
+            tasks = self.finished_task_list if target else \
+                self.pending_task_list
+            ids[1 + target][task_id] = tasks[
+                self._position(tasks, ordinal, task_id)]
+        ids[0] = self.generation
+
+    def _index(self, removed, added, finished=False):
+        """Update search index after one change, if there is one.
+
+        removed: iterable of Tasks - tasks that were removed or replaced.
+        added: iterable of Tasks - tasks that were added or replaced them.
+        finished: boolean - whether added tasks are finished.
+        """
+        if self.search_index is not None:
+            for task in removed:
+                self.search_index.discard(task)
+            for task in added:
+                self.search_index.add(task, finished)
+
+    def _load_search_index(self):
+        """Load search index saved by close.
+
+        return: search.TaskIndex, or None if there is no saved index or it
+                was saved for another version of savefile.
+        """
+        try:
+            with open(self.savefile + SEARCH_SUFFIX, 'rb') as fil, \
+                    gc_paused():
+                stamp, index = pickle.load(fil)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        if stamp != (self.saved_version, self.saved_stat):
+            return None
+        return index
+
+    def _edit_task(tasks, idx, content, year, month, day):
+        """Edit task number idx in sorted sequence tasks.
+
+        Task is replaced with an edited copy having same ID, so that save
+        being written is not affected.
+
+        Refer to ListEngine.edit_pending_task for arguments.
+
+        return: ((Task,), (Task,)) - old task and edited one.
+        """
+        old = tasks[idx]
+        if content == "":
+            content = old.content
+        if year is not None and month is not None and day is not None:
+            task = Task.from_ordinal(
+                content, datetime.date(year, month, day).toordinal(), old.id)
+            tasks.pop(idx)
+            bisect.insort(tasks, task)
+        else:
+            task = tasks[idx] = Task.from_ordinal(content, old.ordinal, old.id)
+        return (old,), (task,)
+
+
+class SortedListEngine(ListEngine):
+    """Engine implementation for Arch_Lab.
+
+    Extends ListEngine by keeping task lists in SortedTaskList containers, so
+    adding, removing and moving tasks costs O(log n) instead of O(n).
+    """
+    def __init__(self):
+        """Initialize self with tasks stored previously.
+
+        Tasks are loaded same way ListEngine does and then put into sorted
+        containers. Finished tasks that are not loaded yet are put into one
+        when they are.
+        """
+        super().__init__()
+        self.pending_task_list = SortedTaskList(self.pending_task_list)
+        if self._finished is not None:
+            self.finished_task_list = SortedTaskList(self._finished)
+
+    @mutator
+    def add_task(self, task_id, content, year, month, day):
+        """Add a new pending task with given ID.
+
+        Same as ListEngine.add_task.
+        """
+        task = Task(content, year, month, day, task_id)
+        self.pending_task_list.add(task)
+        self._index((), (task,))
+
+    @mutator
+    def edit_pending_task(self, idx, content, year, month, day):
+        """Edit a task in the list of pending tasks.
+
+        Same as ListEngine.edit_pending_task.
+        """
+        self._index(*SortedListEngine._edit_task(self.pending_task_list, idx,
+                                                 content, year, month, day))
+
+    @mutator
+    def finish_task(self, idx):
+        finished = self.finished_task_list
+        task = self.pending_task_list.pop(idx)
+        finished.add(task)
+        self._index((task,), (task,), True)
+
+    @mutator
+    def clear_finished_tasks(self):
+        """Remove all finished tasks.
+
+        List of finished tasks will be empty after this.
+        """
+        if self.search_index is not None:
+            self._index(self.finished_task_list, ())
+        self.finished_task_list = SortedTaskList()
+
+    @mutator
+    def edit_finished_task(self, idx, content, year, month, day):
+        """Edit a task in the list of finished tasks.
+
+        Same as ListEngine.edit_finished_task.
+        """
+        self._index(*SortedListEngine._edit_task(self.finished_task_list,
+                                                 idx, content, year, month,
+                                                 day),
+                    finished=True)
+
+    @mutator
+    def unfinish_task(self, idx):
+        task = self.finished_task_list.pop(idx)
+        self.pending_task_list.add(task)
+        self._index((task,), (task,))
+
+    def import_tasks(self, records):
+        """Add many tasks at once.
+
+        Same as ListEngine.import_tasks, sorted lists are rebuilt once at the
+        end.
+        """
+        with self.lock:
+            try:
+                return super().import_tasks(records)
+            finally:
+                self.pending_task_list = SortedTaskList(
+                    self.pending_task_list)
+                if type(self._finished) is list:
+                    self.finished_task_list = SortedTaskList(self._finished)
+
+    def _apply_delta(self, tasks, removed, added):
+        """Remove and add tasks one by one in SortedTaskList.
+
+        Same as ListEngine._apply_delta.
+        """
+        for task in removed:
+            ListEngine._discard_task(tasks, task)
+        for task in added:
+            tasks.add(task)
+
+    def _bisect(self, tasks, task):
+        """Find position of first task not less than task in SortedTaskList.
+
+        Same as ListEngine._bisect.
+        """
+        return tasks.bisect_left(task)
+
+    def _load_finished(self):
+        """Load finished tasks from their section file into SortedTaskList.
+
+        return: SortedTaskList of finished Tasks.
+        """
+        return SortedTaskList(super()._load_finished())
+
+    def _adopt(self, pending, finished):
+        """Replace task lists with merged or moved ones, in sorted containers.
+
+        Same as ListEngine._adopt.
+        """
+        super()._adopt(SortedTaskList(pending),
+                       None if finished is None else SortedTaskList(finished))
+
+    def _edit_task(tasks, idx, content, year, month, day):
+        """Edit task number idx in SortedTaskList tasks.
+
+        Same as ListEngine._edit_task.
+        """
+        old = tasks[idx]
+        if content == "":
+            content = old.content
+        if year is not None and month is not None and day is not None:
+            task = Task.from_ordinal(
+                content, datetime.date(year, month, day).toordinal(), old.id)
+            tasks.pop(idx)
+            tasks.add(task)
+        else:
+            task = tasks[idx] = Task.from_ordinal(content, old.ordinal, old.id)
+        return (old,), (task,)
+
+
+class ThreadSafeEngine(SortedListEngine):
+    """Engine implementation for Arch_Lab.
+
+    Extends SortedListEngine so that it may be used by many threads at once.
+    Engine lock is rwlock.RWLock: changes hold it for writing, as they do in
+    every ListEngine, and views hold it for reading, so they do not wait for
+    each other, only for changes.
+    """
+    lock_type = RWLock
+
+    def view_pending_tasks(self, start=None, stop=None):
+        """Fetch pending tasks.
+
+        Same as ListEngine.view_pending_tasks, holding lock for reading.
+        """
+        with self.lock.reading():
+            return super().view_pending_tasks(start, stop)
+
+    def pending_columns(self):
+        """Fetch pending tasks in columnar form.
+
+        Same as ListEngine.pending_columns, holding lock for reading.
+        """
+        with self.lock.reading():
+            return super().pending_columns()
+
+    def view_finished_tasks(self, start=None, stop=None):
+        """Fetch finished tasks.
+
+        Same as ListEngine.view_finished_tasks, holding lock for reading.
+        Finished tasks that are not loaded yet are loaded holding it for
+        writing.
+        """
+        if self._finished is None:
+            with self.lock:
+                self.finished_task_list
+        with self.lock.reading():
+            return super().view_finished_tasks(start, stop)
+
+    def view_task(self, task_id):
+        """Fetch task by ID.
+
+        Same as ListEngine.view_task, holding lock for reading. Finished tasks
+        that are not loaded yet are loaded holding it for writing.
+        """
+        with self.lock.reading():
+            for finished in (False, True):
+                if finished and self._finished is None:
+                    break
+                task = self._id_index(finished).get(task_id)
+                if task is not None:
+                    return (task.content, task.date, finished)
+            else:
+                raise KeyError(task_id)
+        with self.lock:
+            return super().view_task(task_id)
+
+    def view_pending_tasks_with_ids(self, start=None, stop=None):
+        """Fetch pending tasks along with their IDs.
+
+        Same as ListEngine.view_pending_tasks_with_ids, holding lock for
+        reading.
+        """
+        with self.lock.reading():
+            return super().view_pending_tasks_with_ids(start, stop)
+
+    def view_finished_tasks_with_ids(self, start=None, stop=None):
+        """Fetch finished tasks along with their IDs.
+
+        Same as ListEngine.view_finished_tasks_with_ids, holding lock for
+        reading. Finished tasks that are not loaded yet are loaded holding it
+        for writing.
+        """
+        if self._finished is None:
+            with self.lock:
+                self.finished_task_list
+        with self.lock.reading():
+            return super().view_finished_tasks_with_ids(start, stop)
 
 
 class Task:
     """Simple Task class.
 
-    Sortable.
+    Sortable. Keeps it's date as a proleptic Gregorian ordinal, so that
+    comparisons are done on ints, and has no per-instance __dict__.
+
+    Every task has an ID that is unique and stays the same when task is
+    edited, finished or saved. ID does not take part in comparisons, tasks
+    with same description and date are equal whatever their IDs.
 
     content: string - task description.
-    date: datetime.date - date task is scheduled on.
+    ordinal: int - ordinal of date task is scheduled on.
+    date: datetime.date - date task is scheduled on, computed from ordinal.
+    id: int - task ID, refer to new_id.
     """
-    def __init__(self, content_, year, month, day):
+    __slots__ = ('content', 'ordinal', 'id')
+
+    def __init__(self, content_, year, month, day, task_id=None):
         """Initialize Task instance.
 
         content: string - task description.
         year: int - year task is scheduled on.
         month: int - month task is scheduled on.
         day: int - day task is scheduled on.
+        task_id: int - task ID, new one by default.
         """
         if not isinstance(content_, str):
             raise TypeError("Content must be string!")
         self.content = content_
-        self.date = datetime.date(year, month, day)
+        self.ordinal = datetime.date(year, month, day).toordinal()
+        self.id = Task.new_id() if task_id is None else task_id
+
+    def from_ordinal(content, ordinal, task_id=None):
+        """Create Task from trusted values without validating them.
+
+        content: string - task description.
+        ordinal: int - ordinal of date task is scheduled on.
+        task_id: int - task ID, new one by default.
+        return: Task
+        """
+        task = Task.__new__(Task)
+        task.content = content
+        task.ordinal = ordinal
+        task.id = Task.new_id() if task_id is None else task_id
+        return task
+
+    def new_id():
+        """Generate a new task ID.
+
+        IDs are random 63 bit numbers, so that they fit signed 64 bit
+        integers and processes sharing a savefile do not have to agree on
+        them. Chance of any two of a million tasks getting the same ID is
+        about one in 20 million.
+
+        return: int
+        """
+        return _ids.getrandbits(63)
+
+    def missing_id():
+        """Generate a new ID for a task loaded without one.
+
+        Same as new_id, but counted, refer to missing_ids.
+
+        return: int
+        """
+        _missing.count = missing_ids() + 1
+        return Task.new_id()
+
+    @property
+    def date(self):
+        return datetime.date.fromordinal(self.ordinal)
+
+    @date.setter
+    def date(self, value):
+        self.ordinal = value.toordinal()
+
+    def __reduce__(self):
+        """Pickle Task as a call of _restore_task with content, ordinal and
+        ID.
+        """
+        return (_restore_task, (self.content, self.ordinal, self.id))
+
+    def __setstate__(self, state):
+        """Restore Task from pickled state.
+
+        Only used for pickles written before Task had __slots__, which
+        stored {'content': string, 'date': datetime.date} dicts. Such tasks
+        get new IDs, refer to missing_id.
+        """
+        self.content = state['content']
+        self.date = state['date']
+        self.id = Task.missing_id()
 
     def __lt__(self, other):
         """Task 'less than' comparison.
@@ -307,14 +1959,15 @@ class Task:
         Task is deemed less than another Task if it's date is less than
         another's.
         """
-        return self.date < other.date
+        return self.ordinal < other.ordinal
 
     def __hash__(self):
         """Return hash(self).
 
-        Task's hash will be same as (Task.content, Task.date).
+        Task's hash will be same as (Task.content, Task.ordinal), so that no
+        date has to be built for it.
         """
-        return hash((self.content, self.date))
+        return hash((self.content, self.ordinal))
 
     def __eq__(self, other):
         """Return self == other.
@@ -325,13 +1978,32 @@ class Task:
         raise a NotImplementedError exception.
         """
         try:
-            return (self.content, self.date) == (other.content, other.date)
+            return (self.content, self.ordinal) == (other.content,
+                                                    other.ordinal)
         except AttributeError:
             raise NotImplementedError
 
     def __repr__(self):
+        date = self.date
         return "{}('{}', {}, {}, {})".format("Task",
                                              self.content,
-                                             self.date.year,
-                                             self.date.month,
-                                             self.date.day)
+                                             date.year,
+                                             date.month,
+                                             date.day)
+
+
+def _restore_task(content, ordinal, task_id):
+    """Unpickle Task reduced by Task.__reduce__."""
+    return Task.from_ordinal(content, ordinal, task_id)
+
+
+def missing_ids():
+    """Count tasks loaded without IDs on current thread so far.
+
+    Such tasks, stored before tasks had IDs, get new ones from
+    Task.missing_id, so counts taken before and after a load tell if there
+    were any.
+
+    return: int
+    """
+    return getattr(_missing, 'count', 0)
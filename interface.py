@@ -27,6 +27,7 @@ You probably should not be importing it directly.
 
 import locale
 import lab
+from taskcolumns import OVERDUE, TODAY
 
 locale.setlocale(locale.LC_ALL, "en_US.utf8")
 
@@ -85,15 +86,18 @@ class TerminalInterface(lab.Interface):
                 return option
         return None
 
-    def print_tasks(tasks, finished):
+    def print_tasks(tasks, finished, marks=None):
         """Print tasks.
 
         Prints tasks as formatted list. Date displayed according to locale.
-        In 'pending' mode also marks tasks as 'overdue' or 'today'.
+        In 'pending' mode also marks tasks as 'overdue' or 'today', as told
+        by marks.
 
         tasks: ((string, datetime.date), -||-)
         finished: boolean. True  => 'finished' mode
                            False => 'pending' mode
+        marks: seq of ints - taskcolumns.OVERDUE, TODAY or UPCOMING for every
+               task, used in 'pending' mode.
 
         All branches tested in print_pending_tasks(), print_finished_tasks()
         """
@@ -105,15 +109,37 @@ class TerminalInterface(lab.Interface):
                 print("[{}]\t".format(idx), task[1].strftime("%d %b %Y, %A:"),
                       end="")
                 if not finished:
-                    if task[1] < task[1].today():
+                    if marks[idx] == OVERDUE:
                         print(" \x1b[1;31m<< !!OVERDUE!!\x1b[0m", end="")
-                    elif task[1] == task[1].today():
+                    elif marks[idx] == TODAY:
                         print(" \x1b[1;32m<< Today!\x1b[0m", end="")
                 print()
                 print("  {}".format(task[0]))
                 if task is not tasks[-1]:
                     print()
 
+    def print_found_tasks(tasks):
+        """Print tasks found by search.
+
+        Prints tasks as formatted list, marking finished ones. Tasks are
+        labelled with their IDs instead of positions, as they come from both
+        lists.
+
+        tasks: ((int, string, datetime.date, boolean), -||-)
+        """
+        print("=" * 80)
+        if not tasks:
+            print("\t>> No tasks found <<")
+        for num, (task_id, content, date, finished) in enumerate(tasks):
+            print("[@{}]\t".format(task_id), date.strftime("%d %b %Y, %A:"),
+                  end="")
+            if finished:
+                print(" \x1b[1m<< Finished\x1b[0m", end="")
+            print()
+            print("  {}".format(content))
+            if num != len(tasks) - 1:
+                print()
+
     def print_finished_tasks(tasks):
         """Print finished tasks.
 
@@ -137,7 +163,7 @@ class TerminalInterface(lab.Interface):
         TerminalInterface.menu(opts, "You are viewing finished tasks")
         return TerminalInterface.menu_decide(opts, input())
 
-    def print_pending_tasks(tasks):
+    def print_pending_tasks(tasks, marks):
         """Print pending tasks.
 
         Prints tasks as formatted list. Date displayed according to locale.
@@ -146,8 +172,10 @@ class TerminalInterface(lab.Interface):
         accordingly.
 
         tasks: ((string, datetime.date), -||-)
+        marks: seq of ints - taskcolumns.OVERDUE, TODAY or UPCOMING for every
+               task, refer to taskcolumns.TaskColumns.marks.
         """
-        TerminalInterface.print_tasks(tasks, False)
+        TerminalInterface.print_tasks(tasks, False, marks)
 
     def pending_tasks_menu(opts):
         """Provide interactive pending tasks menu.
@@ -218,6 +246,13 @@ class TerminalInterface(lab.Interface):
               "Enter new values or press Return to leave unchanged")
         return TerminalInterface.task_input()
 
+    def search_dialog():
+        """Ask for words to search tasks for.
+
+        return: string - query, empty to stop searching.
+        """
+        return input("Search for (press Return to go back): ")
+
     def bad_task():
         """Inform user that task is not there interactively.
 
@@ -245,6 +280,13 @@ class TerminalInterface(lab.Interface):
         choice = input('"N" for "No", any key for "Yes": ')
         return choice.upper() != 'N'
 
+    def tasks_changed():
+        """Inform user that tasks were changed by another process.
+
+        Makes use of ANSI escape codes for formatting.
+        """
+        print("\n  \x1b[1mTasks were changed by another program:\x1b[0m")
+
     def config_menu(current, available):
         """Provide interactive serialization configuration menu.
 
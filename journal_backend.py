@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+"""Arch_Lab journal serialization backend.
+
+This module provides a serialization backend for the Arch_Lab program. You
+probably should not be importing it directly.
+"""
+
+import os
+import uuid
+import pickle
+import threading
+import engine
+from storagelock import StorageLock
+
+JOURNAL_SUFFIX = '.log'
+COMPACT_MIN_SIZE = 1 << 16
+
+# Record opcodes. Position in this tuple is what gets written to the journal.
+OPS = ('new_task',
+       'remove_pending_task',
+       'edit_pending_task',
+       'finish_task',
+       'clear_finished_tasks',
+       'remove_finished_task',
+       'edit_finished_task',
+       'unfinish_task',
+       'add_task',
+       'shift_pending_tasks')
+
+
+class JournalFileBackend(engine.FileBackend):
+    """FileBackend implementation for append-only journal format.
+
+    Tasks are stored in two files: a pickled snapshot in target and a journal
+    of changes done after it in target + JOURNAL_SUFFIX. Both start with the
+    same random token, so that journal left from an older snapshot is never
+    replayed.
+
+    Journal is compacted into a new snapshot on a background thread once it
+    grows bigger than half of the snapshot. Compaction locks savefile
+    exclusively, as saves do, refer to storagelock.StorageLock, so that
+    records appended by other processes are not lost.
+
+    Journal records touch both task lists, so finished tasks are not stored
+    in a separate section.
+    """
+    sections = False
+    appends = True
+    lock = threading.Lock()
+
+    def save(target, item):
+        """Serialize item into filename target. Create file or overwrite.
+
+        Journal is started over.
+
+        target: string - file name.
+        item: any python data structure - item to serialize.
+        """
+        with JournalFileBackend.lock:
+            JournalFileBackend._write_snapshot(target, item)
+
+    def load(target):
+        """Deserialize filename target and replay it's journal.
+
+        Will return tuple of two empty lists if file does not exist.
+
+        target: string - file name.
+        return: ([engine.Task, -||-], [engine.Task, -||-])
+        """
+        with JournalFileBackend.lock:
+            return JournalFileBackend._read(target)
+
+    def append(target, records):
+        """Append journal records to filename target.
+
+        Starts compaction if journal has grown big enough.
+
+        target: string - file name.
+        records: [(string, ...), -||-] - records to append.
+        return: boolean - False if there is no journal to append to.
+        """
+        with JournalFileBackend.lock:
+            try:
+                fil = open(target + JOURNAL_SUFFIX, 'r+b')
+            except FileNotFoundError:
+                return False
+            with fil:
+                try:
+                    token = pickle.load(fil)
+                except (EOFError, pickle.UnpicklingError):
+                    token = None
+                fil.seek(0, os.SEEK_END)
+                for record in records:
+                    pickle.dump((OPS.index(record[0]),) + record[1:], fil,
+                                pickle.HIGHEST_PROTOCOL)
+                fil.flush()
+                os.fsync(fil.fileno())
+                size = fil.tell()
+
+        if size > max(COMPACT_MIN_SIZE, os.path.getsize(target) // 2):
+            threading.Thread(target=JournalFileBackend.compact,
+                             args=(target, (token, size))).start()
+        return True
+
+    def compact(target, journal=None):
+        """Replay journal into a new snapshot and start journal over.
+
+        Savefile is locked exclusively first, so that no process appends to
+        journal meanwhile. If journal is given and no longer matches, as
+        another process appended to it or started it over before lock was
+        taken, compaction is skipped and left to a later append.
+
+        target: string - file name.
+        journal: (string, int) - token and size of journal compaction was
+                 decided on, optional.
+        return: boolean - True if journal was compacted.
+        """
+        with StorageLock(target).acquire(True), JournalFileBackend.lock:
+            if (journal is not None and
+                    JournalFileBackend._journal(target) != journal):
+                return False
+            JournalFileBackend._write_snapshot(
+                target, JournalFileBackend._read(target))
+        return True
+
+    def replay(item, records):
+        """Apply journal records to task lists.
+
+        item: ([engine.Task, -||-], [engine.Task, -||-]) - task lists.
+        records: [(int, ...), -||-] - journal records, as stored.
+        return: ([engine.Task, -||-], [engine.Task, -||-])
+        """
+        tasks = JournalFileBackend.Replayer(*item)
+        for record in records:
+            getattr(engine.ListEngine, OPS[record[0]])(tasks, *record[1:])
+        return (tasks.pending_task_list, tasks.finished_task_list)
+
+    class Replayer(engine.ListEngine):
+        """ListEngine that works on given task lists.
+
+        Used to replay journal with exactly the same code that recorded it.
+        """
+        def __init__(self, pending, finished):
+            self.lock = threading.RLock()
+            self.pending_task_list = pending
+            self.finished_task_list = finished
+            self.generation = 0
+            self.base = None
+            self.journal = None
+            self.autosaver = None
+            self.ids = None
+            self.columns = None
+            self.search_index = None
+
+        def _keep_base(self):
+            """Do nothing, as replayed lists are never merged."""
+            pass
+
+    def _read(target):
+        """Read snapshot and replay journal. Caller should hold lock."""
+        try:
+            with open(target, 'rb') as fil:
+                token, item = pickle.load(fil)
+        except (FileNotFoundError, EOFError):
+            return ([], [])
+
+        records = []
+        try:
+            with open(target + JOURNAL_SUFFIX, 'rb') as fil:
+                if pickle.load(fil) == token:
+                    while True:
+                        records.append(pickle.load(fil))
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            pass
+        return JournalFileBackend.replay(item, records)
+
+    def _journal(target):
+        """Read token and size of journal. Caller should hold lock.
+
+        return: (string, int), or None if there is no readable journal.
+        """
+        try:
+            with open(target + JOURNAL_SUFFIX, 'rb') as fil:
+                return (pickle.load(fil), os.fstat(fil.fileno()).st_size)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _write_snapshot(target, item):
+        """Write item as a new snapshot. Caller should hold lock.
+
+        Snapshot is atomically written over target, and only then journal is
+        started over, so that crash at any point leaves consistent files
+        behind.
+        """
+        token = uuid.uuid4().hex
+        for name, obj in ((target, (token, item)),
+                          (target + JOURNAL_SUFFIX, token)):
+            with engine.atomic_open(name, 'wb') as fil:
+                pickle.dump(obj, fil, pickle.HIGHEST_PROTOCOL)
@@ -25,10 +25,86 @@ This module provides a serialization backend for the Arch_Lab program. You
 probably should not be importing it directly.
 """
 
+import re
 import json
 import engine
 import datetime
 
+# Number of characters read from file at once when parsing in chunks.
+BLOCK = 1 << 20
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class _Scanner():
+    """Reads JSON text file a value at a time, without loading all of it.
+
+    Attributes:
+      fil - text file-like object being read.
+      buf - text read from fil and not consumed yet, starting at pos.
+      pos - position of next character to consume in buf.
+      eof - True if fil has no more text.
+    """
+    def __init__(self, fil):
+        self.fil = fil
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        """Read next block of fil into buf, dropping consumed text."""
+        data = self.fil.read(BLOCK)
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        self.eof = not data
+
+    def char(self):
+        """Skip whitespace and peek at next character.
+
+        return: string - next character, or '' at end of file.
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ''
+            self.more()
+
+    def expect(self, chars):
+        """Consume next character, which should be one of chars.
+
+        Raises ValueError if it is not.
+
+        return: string - consumed character.
+        """
+        char = self.char()
+        if not char or char not in chars:
+            raise ValueError("malformed JSON: expected one of {!r}, got {!r}"
+                             .format(chars, char))
+        self.pos += 1
+        return char
+
+    def value(self, decode):
+        """Consume next JSON value.
+
+        Raises ValueError if it is malformed.
+
+        decode: json.JSONDecoder.raw_decode of decoder to use.
+        return: decoded value.
+        """
+        self.char()
+        while True:
+            try:
+                obj, end = decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ValueError("malformed JSON: " + e.msg)
+            else:
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            self.more()
+
 
 class JsonFileBackend(engine.FileBackend):
     """FileBackend implementation for JSON format.
@@ -38,6 +114,9 @@ class JsonFileBackend(engine.FileBackend):
     A very poor implementation seeing how JSON in Python is so problematic.
     Does not conform to interface in behaviour. Use at your own risk.
     """
+    streams = True
+    text = True
+
     class TaskJSONEncoder(json.JSONEncoder):
         """Custom encoder to allow serialization of engine.Task and
         datetime.date
@@ -46,14 +125,40 @@ class JsonFileBackend(engine.FileBackend):
             """Serialize engine.Task and datetime.date into JSON
 
             Pretty straight and dumb approach, Task into dict with
-            "__engine.Task__": True pair and pairs for other fields, date into
-            a tuple of it's three fields.
+            "__engine.Task__": True pair and pairs for content, date and id,
+            date into a tuple of it's three fields.
             """
             if isinstance(obj, engine.Task):
-                return {"__engine.Task__": True, **obj.__dict__}
+                return {"__engine.Task__": True,
+                        "content": obj.content, "date": obj.date,
+                        "id": obj.id}
             elif isinstance(obj, datetime.date):
                 return (obj.year, obj.month, obj.day)
 
+    class TaskJSONDecoder(json.JSONDecoder):
+        """Custom decoder that builds engine.Task instances while parsing."""
+        def __init__(self, **kwargs):
+            super().__init__(
+                object_hook=JsonFileBackend.TaskJSONDecoder.task_hook,
+                **kwargs)
+
+        def task_hook(obj, from_ordinal=engine.Task.from_ordinal,
+                      date=datetime.date):
+            """Turn decoded JSON object into engine.Task if it is one.
+
+            Objects are trusted to be written by TaskJSONEncoder, so tasks
+            are created with engine.Task.from_ordinal without validation.
+            Tasks written before they had IDs get new ones, refer to
+            engine.Task.missing_id. Other objects are returned as they are.
+            """
+            if '__engine.Task__' in obj:
+                task_id = obj.get('id')
+                if task_id is None:
+                    task_id = engine.Task.missing_id()
+                return from_ordinal(obj['content'],
+                                    date(*obj['date']).toordinal(), task_id)
+            return obj
+
     def save(target, item):
         """Serialize item into filename target. Create file or overwrite.
 
@@ -62,8 +167,8 @@ class JsonFileBackend(engine.FileBackend):
               instance or datetime.date instance or any Python data structure
               containing any combination of those - item to serialize.
         """
-        with open(target, 'w') as fil:
-            json.dump(item, fil, cls=JsonFileBackend.TaskJSONEncoder)
+        with engine.atomic_open(target, 'w') as fil:
+            JsonFileBackend.dump(item, fil)
 
     def load(target):
         """Deserialize filename target into two lists of Tasks.
@@ -75,13 +180,81 @@ class JsonFileBackend(engine.FileBackend):
         """
         try:
             with open(target, 'r') as fil:
-                tmp1, tmp2 = json.load(fil)
-                tmp1 = [engine.Task(x['content'],
-                                    x['date'][0], x['date'][1], x['date'][2])
-                        for x in tmp1 if '__engine.Task__' in x.keys()]
-                tmp2 = [engine.Task(x['content'],
-                                    x['date'][0], x['date'][1], x['date'][2])
-                        for x in tmp2 if '__engine.Task__' in x.keys()]
-                return (tmp1, tmp2)
-        except (FileNotFoundError, json.decoder.JSONDecodeError):
+                return JsonFileBackend.parse(fil)
+        except FileNotFoundError:
             return ([], [])
+
+    def dump(item, fil):
+        json.dump(item, fil, cls=JsonFileBackend.TaskJSONEncoder)
+
+    def parse(fil):
+        """Deserialize open file fil into two lists of Tasks.
+
+        Tasks are built in a single pass while JSON is parsed. Anything in
+        the lists that is not a task is dropped. Will return tuple of two
+        empty lists if file is not valid JSON.
+
+        fil: text file-like object.
+        return: ([engine.Task, -||-], [engine.Task, -||-])
+        """
+        try:
+            with engine.gc_paused():
+                tmp1, tmp2 = json.load(fil,
+                                       cls=JsonFileBackend.TaskJSONDecoder)
+        except json.decoder.JSONDecodeError:
+            return ([], [])
+        task = engine.Task
+        return ([x for x in tmp1 if type(x) is task],
+                [x for x in tmp2 if type(x) is task])
+
+    def dump_chunks(chunks, fil):
+        encode = JsonFileBackend.TaskJSONEncoder().encode
+        fil.write('[[')
+        index, sep = 0, ''
+        for num, tasks in chunks:
+            if num != index:
+                fil.write('], [')
+                index, sep = num, ''
+            if tasks:
+                fil.write(sep + ', '.join(map(encode, tasks)))
+                sep = ', '
+        if index == 0:
+            fil.write('], [')
+        fil.write(']]')
+
+    def parse_chunks(fil):
+        """Deserialize two lists of Tasks from open file fil in chunks.
+
+        File is read BLOCK at a time, and tasks are decoded one by one.
+        Anything in the lists that is not a task is dropped. Raises ValueError
+        if file is not valid JSON holding two lists.
+
+        fil: text file-like object.
+        return: iterator of (int, [engine.Task, -||-])
+        """
+        scanner = _Scanner(fil)
+        if not scanner.char():
+            return
+        decode = JsonFileBackend.TaskJSONDecoder().raw_decode
+        scanner.expect('[')
+        for index in (0, 1):
+            if index:
+                scanner.expect(',')
+            scanner.expect('[')
+            chunk = []
+            more = scanner.char() != ']'
+            if not more:
+                scanner.expect(']')
+            while more:
+                task = scanner.value(decode)
+                if type(task) is engine.Task:
+                    chunk.append(task)
+                    if len(chunk) == engine.CHUNK:
+                        yield index, chunk
+                        chunk = []
+                more = scanner.expect(',]') == ','
+            if chunk:
+                yield index, chunk
+        scanner.expect(']')
+        if scanner.char():
+            raise ValueError("malformed JSON: extra data after task lists")
@@ -32,6 +32,7 @@ import configparser
 
 CONFIG = 'config.ini'
 SAVEFILE = 'taskstorage'
+PLUGINS = 'plugins'
 
 
 class Engine():
@@ -42,22 +43,42 @@ class Engine():
         if type(self) is Engine:
             raise TypeError("Engine should not be instantiated")
 
-    def view_pending_tasks(self):
+    def view_pending_tasks(self, start=None, stop=None):
         """Fetch pending tasks.
 
         Should return the list of stored pending tasks as a list of tuples.
+        Only tasks from start to stop should be returned if these are given,
+        same as slicing the list would.
 
+        start: int - position of first task to fetch, optional.
+        stop: int - position after last task to fetch, optional.
         return: [(string, datetime.date), -||-]
         """
         raise NotImplementedError()
 
+    def pending_columns(self):
+        """Fetch pending tasks in columnar form, for date queries.
+
+        Optional. Built from view_pending_tasks by default, engines may keep
+        it cached. Columns should not be changed by caller.
+
+        return: taskcolumns.TaskColumns
+        """
+        from taskcolumns import TaskColumns
+
+        return TaskColumns.from_view(self.view_pending_tasks())
+
     def new_task(self, content, year, month, day):
         """Add new task to the list of pending tasks.
 
+        Task gets an ID that stays the same until it is removed, whatever
+        happens to it's position.
+
         content: string - task description.
         year: int - year task is scheduled on.
         month: int - month task is scheduled on.
         day: int - day task is scheduled on.
+        return: int - task ID.
         """
         raise NotImplementedError()
 
@@ -92,11 +113,15 @@ class Engine():
         """
         raise NotImplementedError()
 
-    def view_finished_tasks(self):
+    def view_finished_tasks(self, start=None, stop=None):
         """Fetch finished tasks.
 
         Should return the list of stored finished tasks as a list of tuples.
+        Only tasks from start to stop should be returned if these are given,
+        same as slicing the list would.
 
+        start: int - position of first task to fetch, optional.
+        stop: int - position after last task to fetch, optional.
         return: [(string, datetime.date), -||-]
         """
         raise NotImplementedError()
@@ -139,6 +164,130 @@ class Engine():
         """
         raise NotImplementedError()
 
+    def shift_pending_tasks(self, days):
+        """Move every pending task by a number of days.
+
+        Should raise ValueError without moving any task if a date would get
+        out of range.
+
+        days: int - number of days to add, may be negative.
+        """
+        raise NotImplementedError()
+
+    def view_task(self, task_id):
+        """Fetch one task by ID.
+
+        Should raise KeyError if there is no such task.
+
+        task_id: int - task ID, as returned by new_task.
+        return: (string, datetime.date, boolean) - description, date and
+                whether task is finished.
+        """
+        raise NotImplementedError()
+
+    def view_pending_tasks_with_ids(self, start=None, stop=None):
+        """Fetch pending tasks along with their IDs.
+
+        Should return same tasks as view_pending_tasks, in the same order,
+        taking start and stop the same way.
+
+        start: int - position of first task to fetch, optional.
+        stop: int - position after last task to fetch, optional.
+        return: [(int, string, datetime.date), -||-]
+        """
+        raise NotImplementedError()
+
+    def view_finished_tasks_with_ids(self, start=None, stop=None):
+        """Fetch finished tasks along with their IDs.
+
+        Should return same tasks as view_finished_tasks, in the same order,
+        taking start and stop the same way.
+
+        start: int - position of first task to fetch, optional.
+        stop: int - position after last task to fetch, optional.
+        return: [(int, string, datetime.date), -||-]
+        """
+        raise NotImplementedError()
+
+    def remove_pending_task_by_id(self, task_id):
+        """Remove task from the list of pending tasks by ID.
+
+        Should raise KeyError if there is no such pending task.
+
+        task_id: int - task ID, as returned by new_task.
+        """
+        raise NotImplementedError()
+
+    def edit_pending_task_by_id(self, task_id, content, year, month, day):
+        """Edit a task in the list of pending tasks by ID.
+
+        Should raise KeyError if there is no such pending task. Refer to
+        edit_pending_task for the rest.
+
+        task_id: int - task ID, as returned by new_task.
+        """
+        raise NotImplementedError()
+
+    def finish_task_by_id(self, task_id):
+        """Move task from the pending list to the finished list by ID.
+
+        Should raise KeyError if there is no such pending task.
+
+        task_id: int - task ID, as returned by new_task.
+        """
+        raise NotImplementedError()
+
+    def remove_finished_task_by_id(self, task_id):
+        """Remove task from the list of finished tasks by ID.
+
+        Should raise KeyError if there is no such finished task.
+
+        task_id: int - task ID, as returned by new_task.
+        """
+        raise NotImplementedError()
+
+    def edit_finished_task_by_id(self, task_id, content, year, month, day):
+        """Edit a task in the list of finished tasks by ID.
+
+        Should raise KeyError if there is no such finished task. Refer to
+        edit_finished_task for the rest.
+
+        task_id: int - task ID, as returned by new_task.
+        """
+        raise NotImplementedError()
+
+    def unfinish_task_by_id(self, task_id):
+        """Move task from the finished list to the pending list by ID.
+
+        Should raise KeyError if there is no such finished task.
+
+        task_id: int - task ID, as returned by new_task.
+        """
+        raise NotImplementedError()
+
+    def search_tasks(self, query):
+        """Find tasks whose description has every word of query.
+
+        Words are compared ignoring case, refer to search.words.
+
+        query: string - words to look for.
+        return: [(int, string, datetime.date, boolean), -||-] - ID,
+                description, date and whether task is finished, pending
+                tasks first, both ordered by date.
+        """
+        raise NotImplementedError()
+
+    def import_tasks(self, records):
+        """Add many tasks at once.
+
+        Should be cheaper than adding tasks one by one with new_task.
+
+        records: iterable of (string, datetime.date, boolean) - description,
+                 date and whether task is finished.
+        return: int - number of imported tasks.
+        """
+        raise NotImplementedError()
+
     def save_tasks(self):
         """Store task lists.
 
@@ -185,6 +334,42 @@ class Engine():
         """
         raise NotImplementedError()
 
+    def flush(self):
+        """Wait until tasks stored by save_tasks are written.
+
+        Optional. Engines that store tasks in background should raise error
+        of a failed save here. Does nothing by default.
+        """
+        pass
+
+    def stop_autosave(self):
+        """Stop saving tasks in background.
+
+        Optional. Engines that save tasks on their own should stop doing so,
+        so that tasks are only saved when asked to. Does nothing by default.
+        """
+        pass
+
+    def watch(self, callback):
+        """Register callback to call when tasks are changed by another
+        process.
+
+        Optional. Engines that notice such changes as they happen should call
+        callback without arguments then. Does nothing by default.
+
+        callback: callable.
+        """
+        pass
+
+    def close(self):
+        """Finish using engine.
+
+        Optional. Engines may write caches or release resources here. Waits
+        until tasks are written by default, refer to flush. Engine should
+        not save tasks on it's own after this, refer to stop_autosave.
+        """
+        self.flush()
+
 
 class Controller():
     """Abstract class/interface for controller implementations for Arch_Lab.
@@ -256,6 +441,10 @@ class Controller():
         """Mark finished task as pending."""
         raise NotImplementedError()
 
+    def search_tasks(self):
+        """Provide interactive search of tasks."""
+        raise NotImplementedError()
+
     def view_config_finished(self):
         """Provide interactive configuration.
 
@@ -270,6 +459,10 @@ class Controller():
         """Provide interactive way to save tasks on exit."""
         raise NotImplementedError()
 
+    def tasks_changed(self):
+        """Refresh view after tasks were changed by another process."""
+        raise NotImplementedError()
+
 
 class Interface():
     """Abstract class/interface for interface implementations for Arch_Lab.
@@ -302,10 +495,12 @@ class Interface():
         """
         raise NotImplementedError()
 
-    def print_pending_tasks(tasks):
+    def print_pending_tasks(tasks, marks):
         """Provide view of pending tasks.
 
         tasks: ((string, datetime.date), -||-)
+        marks: seq of ints - taskcolumns.OVERDUE, TODAY or UPCOMING for every
+               task, refer to taskcolumns.TaskColumns.marks.
         """
         raise NotImplementedError()
 
@@ -351,6 +546,21 @@ class Interface():
         """Inform user that task is not there interactively."""
         raise NotImplementedError()
 
+    def search_dialog():
+        """Ask for words to search tasks for.
+
+        return: string - query, as input by user, empty to stop searching.
+        """
+        raise NotImplementedError()
+
+    def print_found_tasks(tasks):
+        """Provide view of tasks found by search.
+
+        tasks: ((int, string, datetime.date, boolean), -||-) - ID,
+               description, date and whether task is finished.
+        """
+        raise NotImplementedError()
+
     def bad_input():
         """Inform user that they menace to crash the program with their input.
         """
@@ -362,6 +572,10 @@ class Interface():
         return: boolean - user's choice"""
         raise NotImplementedError()
 
+    def tasks_changed():
+        """Inform user that tasks were changed by another process."""
+        raise NotImplementedError()
+
     def config_menu(current, available):
         """Provide interactive serialization configuration menu.
 
@@ -375,26 +589,59 @@ class Interface():
         raise NotImplementedError()
 
 
+def make_engine(config):
+    """Create engine chosen by 'engine' config parameter.
+
+    config: configparser.ConfigParser - configuration read from CONFIG.
+
+    return: Engine descendant instance.
+    """
+    import engine
+
+    if config['DEFAULT']['engine'] == 'sorted':
+        eng = engine.SortedListEngine
+    elif config['DEFAULT']['engine'] == 'threadsafe':
+        eng = engine.ThreadSafeEngine
+    elif config['DEFAULT']['engine'] == 'sqlite':
+        from sqlite_engine import SqliteEngine as eng
+    else:
+        eng = engine.ListEngine
+    return eng()
+
+
 def main():
-    """Entry point for program."""
+    """Entry point for program.
+
+    With argument controller, engine held by running daemon is used if there
+    is one.
+    """
     import interface
-    import engine
     import controller
 
     config = configparser.ConfigParser()
     config.read(CONFIG)
     try:
         config['DEFAULT']['controller']
+        config['DEFAULT']['engine']
     except KeyError:
-        config['DEFAULT']['controller'] = 'argument'
+        config['DEFAULT'].setdefault('controller', 'argument')
+        config['DEFAULT'].setdefault('engine', 'list')
         with open(CONFIG, 'w') as fil:
             config.write(fil)
 
+    eng = None
     if config['DEFAULT']['controller'] == 'simple':
         ctr = controller.SimpleController
     else:
+        import daemon
         ctr = controller.ArgumentController
-    ctr(interface.TerminalInterface, engine.ListEngine()).run()
+        eng = daemon.RemoteEngine.connect()
+    if eng is None:
+        eng = make_engine(config)
+    try:
+        ctr(interface.TerminalInterface, eng).run()
+    finally:
+        eng.close()
     sys.exit()
 
 
@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+"""Arch_Lab migration. Run this as a script or import and run main().
+
+Moves tasks stored with configured savemethod into files of another one and
+switches config to it. Tasks are streamed a chunk at a time, so the store
+never has to fit in memory, except for backends that can not stream (journal
+and binary), which hold one whole list.
+
+New files are written next to the old ones, read back and checked against
+what was read, and only then put in place; config is switched last, so a
+failure at any point leaves the program working with old savemethod. Old
+files are left alone. Both savefiles are locked exclusively throughout,
+refer to storagelock.StorageLock, so that no running engine saves or loads
+tasks half way.
+"""
+
+import os
+import sys
+import struct
+import itertools
+import hashlib
+import argparse
+import configparser
+import engine
+import registry
+import compression
+from lab import CONFIG
+from storagelock import StorageLock
+
+NEW_SUFFIX = '.new'
+# Date ordinal, task ID and description length, hashed before every
+# description.
+_RECORD = struct.Struct('<iQQ')
+
+
+class Checksum():
+    """Counts and digests of two task lists, taken a chunk at a time.
+
+    Attributes:
+      counts - numbers of pending and finished tasks.
+      digests - hashlib.sha256 of dates, IDs and descriptions of pending
+                and finished tasks, in order.
+    """
+    def __init__(self):
+        self.counts = [0, 0]
+        self.digests = [hashlib.sha256(), hashlib.sha256()]
+        self.index = 0
+
+    def feed(self, chunks):
+        """Pass chunks of task lists through, taking their tasks into account.
+
+        Raises ValueError if pending tasks come after finished ones.
+
+        chunks: iterable of (int, [engine.Task, -||-]) - refer to
+                engine.chunked.
+        return: iterator of (int, [engine.Task, -||-]) - same chunks.
+        """
+        for index, tasks in chunks:
+            if index < self.index:
+                raise ValueError("pending tasks after finished ones")
+            self.index = index
+            digest = self.digests[index]
+            for task in tasks:
+                content = task.content.encode('utf-8', 'surrogatepass')
+                digest.update(_RECORD.pack(task.ordinal, task.id,
+                                           len(content)))
+                digest.update(content)
+            self.counts[index] += len(tasks)
+            yield index, tasks
+
+    def __eq__(self, other):
+        return self.counts == other.counts and all(
+            x.digest() == y.digest()
+            for x, y in zip(self.digests, other.digests))
+
+    def __str__(self):
+        return "{} pending and {} finished tasks".format(*self.counts)
+
+
+def _file_chunks(backend, target):
+    """Read chunks of task lists from one file of backend.
+
+    Yields nothing if file does not exist.
+    """
+    if not backend.streams:
+        yield from engine.chunked(backend.load(target))
+        return
+    try:
+        raw = open(target, 'rb')
+    except FileNotFoundError:
+        return
+    with raw, compression.reader(raw, backend.text) as fil:
+        yield from backend.parse_chunks(fil)
+
+
+def read_chunks(backend, savefile):
+    """Read tasks stored by backend a chunk at a time.
+
+    Finished tasks are read from their section file, unless savefile has
+    some, as ListEngine does.
+
+    backend: engine.FileBackend descendant, not wrapped for compression.
+    savefile: string - file name.
+    return: iterator of (int, [engine.Task, -||-]) - refer to
+            engine.chunked.
+    """
+    finished = False
+    for index, tasks in _file_chunks(backend, savefile):
+        finished = finished or index == 1
+        yield index, tasks
+    if backend.sections and not finished:
+        for index, tasks in _file_chunks(
+                backend, savefile + engine.FINISHED_SUFFIX):
+            if index == 1:
+                yield index, tasks
+
+
+def _write_file(backend, target, codec, chunks):
+    """Write chunks of task lists into one file of backend."""
+    if not backend.streams:
+        item = ([], [])
+        for index, tasks in chunks:
+            item[index].extend(tasks)
+        backend.save(target, item)
+        return
+    with engine.atomic_open(target, 'wb') as raw:
+        with compression.writer(raw, codec, backend.text) as fil:
+            backend.dump_chunks(chunks, fil)
+
+
+def write_chunks(backend, savefile, codec, chunks):
+    """Write tasks to be stored by backend a chunk at a time.
+
+    If backend supports sections, pending tasks are written into savefile
+    and finished ones into their section file, as ListEngine does.
+
+    backend: engine.FileBackend descendant, not wrapped for compression.
+    savefile: string - file name.
+    codec: string - one of compression.CODECS, or None.
+    chunks: iterable of (int, [engine.Task, -||-]) - pending tasks first.
+    """
+    if not backend.sections:
+        _write_file(backend, savefile, codec, chunks)
+        return
+    chunks = iter(chunks)
+    finished = []
+
+    def pending():
+        for index, tasks in chunks:
+            if index:
+                finished.append((index, tasks))
+                return
+            yield index, tasks
+
+    _write_file(backend, savefile, codec, pending())
+    _write_file(backend, savefile + engine.FINISHED_SUFFIX, codec,
+                itertools.chain(finished, chunks))
+
+
+def _new_files(prefix):
+    """List files whose names start with prefix."""
+    folder, base = os.path.split(prefix)
+    return [os.path.join(folder, name)
+            for name in os.listdir(folder or os.curdir)
+            if name.startswith(base)]
+
+
+def migrate(config, method):
+    """Move tasks into files of another savemethod and switch config to it.
+
+    Raises KeyError if method is unknown, ValueError if tasks already use it
+    or written files do not hold same tasks as were read.
+
+    config: configparser.ConfigParser - configuration read from CONFIG.
+    method: string - new savemethod.
+    return: Checksum of moved tasks.
+    """
+    source = config['DEFAULT'].get('savemethod', 'pickle')
+    if method == source:
+        raise ValueError("tasks are already stored with " + method)
+    src_backend, src_file = engine.savemethod_backend(source)
+    dst_backend, dst_file = engine.savemethod_backend(method)
+    codec = compression.config_codec(config)
+
+    locks = {name: StorageLock(name) for name in (src_file, dst_file)}
+    try:
+        # In order of names, so that two migrations can not deadlock.
+        for name in sorted(locks):
+            locks[name].acquire(True)
+        written = _migrate(src_backend, src_file, dst_backend, dst_file,
+                           codec, locks[dst_file])
+        config['DEFAULT']['savemethod'] = method
+        with engine.atomic_open(CONFIG, 'w') as fil:
+            config.write(fil)
+    finally:
+        for lock in locks.values():
+            lock.release()
+    return written
+
+
+def _migrate(src_backend, src_file, dst_backend, dst_file, codec, lock):
+    """Move tasks from files of one backend into files of another.
+
+    Savefiles should be locked exclusively. Version of dst_file is bumped
+    with lock before it is replaced, so that engines that loaded it notice.
+
+    return: Checksum of moved tasks.
+    """
+    new_file = dst_file + NEW_SUFFIX
+    try:
+        written = Checksum()
+        write_chunks(dst_backend, new_file, codec,
+                     written.feed(read_chunks(src_backend, src_file)))
+        check = Checksum()
+        for _ in check.feed(read_chunks(dst_backend, new_file)):
+            pass
+        if check != written:
+            raise ValueError("read {}, but wrote {}".format(written, check))
+        lock.bump()
+        for name in _new_files(new_file):
+            os.replace(name, dst_file + name[len(new_file):])
+    finally:
+        for name in _new_files(new_file):
+            os.unlink(name)
+    return written
+
+
+def main():
+    """Entry point for migration.
+
+    Takes new savemethod as the only argument. Refuses to run while daemon
+    is serving tasks, or if tasks are not kept by a file backend.
+    """
+    import daemon
+
+    methods = [savemethod.name for savemethod in registry.savemethods()]
+    parser = argparse.ArgumentParser(
+        description="Move tasks to another savemethod")
+    parser.add_argument('savemethod', choices=methods)
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read(CONFIG)
+    if config['DEFAULT'].get('engine', 'list') not in ('list', 'sorted',
+                                                       'threadsafe'):
+        print("Tasks are not kept in files with this engine",
+              file=sys.stderr)
+        sys.exit(1)
+    remote = daemon.RemoteEngine.connect()
+    if remote is not None:
+        remote.close()
+        print("Stop the daemon before migrating", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        moved = migrate(config, args.savemethod)
+    except (ValueError, OSError) as e:
+        print("Migration failed: {}".format(e), file=sys.stderr)
+        sys.exit(1)
+    print("Moved {} to {}".format(moved, args.savemethod))
+    sys.exit()
+
+
+if __name__ == "__main__":
+    main()
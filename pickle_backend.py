@@ -25,22 +25,127 @@ This module provides a serialization backend for the Arch_Lab program. You
 probably should not be importing it directly.
 """
 
+import array
 import pickle
 import engine
 
+# Header pickled before saved item, (FORMAT, VERSION, columnar). Files without
+# it were written by plain pickle.dump of item, they are format version 1.
+# Version 2 pickles task lists a chunk at a time, as columns of descriptions,
+# date ordinals and task IDs.
+FORMAT = 'Arch_Lab'
+VERSION = 2
+
+
+def _is_tasks(item):
+    """Check if item is a sequence of lists of engine.Task."""
+    return type(item) in (tuple, list) and all(
+        type(tasks) is list and all(type(x) is engine.Task for x in tasks)
+        for tasks in item)
+
+
+def _read_header(fil):
+    """Unpickle format header from fil.
+
+    Raises ValueError if file was written by a newer format version.
+
+    return: (tuple, anything) - header, or None if file has no header, and
+            whatever was unpickled.
+    """
+    head = pickle.load(fil)
+    if type(head) is not tuple or len(head) != 3 or head[0] != FORMAT:
+        return None, head
+    if head[1] > VERSION:
+        raise ValueError("pickle format version {} is not supported"
+                         .format(head[1]))
+    return head, head
+
+
+def _read_columns(fil):
+    """Unpickle columns of task lists from fil.
+
+    fil: binary file-like object, positioned after header.
+    return: iterator of (int, [engine.Task, -||-]) - chunks of task lists.
+    """
+    task = engine.Task.from_ordinal
+    chunk = pickle.load(fil)
+    while chunk is not None:
+        yield chunk[0], list(map(task, *chunk[1:]))
+        chunk = pickle.load(fil)
+
 
 class PickleFileBackend(engine.FileBackend):
     """FileBackend implementation for pickle format.
 
     Provides unified serialization interface to pickle for EngineConfig.
+
+    Saves use highest pickle protocol. Task lists are stored a chunk at a
+    time, as columns of descriptions, packed date ordinals and packed IDs,
+    anything else is pickled as is (tasks then reduce to (content, ordinal,
+    id), refer to engine.Task). Files start with a format header, refer to
+    VERSION; files written without it are still loaded.
     """
+    streams = True
+
     def save(target, item):
-        with open(target, 'wb') as fil:
-            pickle.dump(item, fil)
+        with engine.atomic_open(target, 'wb') as fil:
+            PickleFileBackend.dump(item, fil)
 
     def load(target):
         try:
             with open(target, 'rb') as fil:
-                return pickle.load(fil)
-        except (FileNotFoundError, EOFError):
+                return PickleFileBackend.parse(fil)
+        except FileNotFoundError:
             return ([], [])
+
+    def dump(item, fil):
+        if _is_tasks(item):
+            PickleFileBackend.dump_chunks(engine.chunked(item), fil)
+        else:
+            pickle.dump((FORMAT, VERSION, False), fil,
+                        pickle.HIGHEST_PROTOCOL)
+            pickle.dump(item, fil, pickle.HIGHEST_PROTOCOL)
+
+    def parse(fil):
+        """Deserialize open file fil.
+
+        Raises ValueError if file was written by a newer format version.
+        Will return tuple of two empty lists if file is empty.
+
+        fil: binary file-like object.
+        return: any Python data structure or ([], [])
+        """
+        with engine.gc_paused():
+            try:
+                head, item = _read_header(fil)
+            except EOFError:
+                return ([], [])
+            if head is None:
+                return item
+            if not head[2]:
+                return pickle.load(fil)
+            item = ([], [])
+            for index, tasks in _read_columns(fil):
+                item[index].extend(tasks)
+            return item
+
+    def dump_chunks(chunks, fil):
+        pickle.dump((FORMAT, VERSION, True), fil, pickle.HIGHEST_PROTOCOL)
+        for index, tasks in chunks:
+            pickle.dump((index, [x.content for x in tasks],
+                         array.array('i', [x.ordinal for x in tasks]),
+                         array.array('q', [x.id for x in tasks])),
+                        fil, pickle.HIGHEST_PROTOCOL)
+        pickle.dump(None, fil, pickle.HIGHEST_PROTOCOL)
+
+    def parse_chunks(fil):
+        try:
+            head, item = _read_header(fil)
+        except EOFError:
+            return
+        if head is None:
+            yield from engine.chunked(item)
+        elif not head[2]:
+            yield from engine.chunked(pickle.load(fil))
+        else:
+            yield from _read_columns(fil)
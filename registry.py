@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+"""Arch_Lab file backend registry.
+
+This module provides lookup of file backends by savemethod for the Arch_Lab
+program. You probably should not be importing it directly.
+
+Besides built-in backends, savemethods are provided by installed
+distributions through ENTRY_POINTS entry point group, where entry point name
+is the savemethod and it's value names FileBackend descendant, and by
+<savemethod>_backend.py modules in lab.PLUGINS directory, which name their
+FileBackend descendant with module attribute BACKEND.
+
+Backend module is only imported when it's savemethod is used, and plugins
+are only searched for when a savemethod is not a built-in one or all of them
+are listed.
+"""
+
+import os
+import sys
+import importlib
+import importlib.util
+from lab import PLUGINS
+
+ENTRY_POINTS = 'arch_lab.backends'
+PLUGIN_SUFFIX = '_backend.py'
+
+
+class Savemethod():
+    """Savemethod known to registry.
+
+    Attributes:
+      name - savemethod name, as set in config.
+      description - hopefully helpful description.
+      extension - savefile extension.
+      target - 'module:attribute' naming backend, or file name of plugin
+               module.
+    """
+    def __init__(self, name, description, extension, target):
+        """Initialize self. Arguments are same as attributes."""
+        self.name = name
+        self.description = description
+        self.extension = extension
+        self.target = target
+
+    def load(self):
+        """Import backend.
+
+        Plugin module is imported once, built-in and entry point modules
+        are taken from sys.modules if they were imported already.
+
+        return: engine.FileBackend descendant.
+        """
+        if self.target.endswith('.py'):
+            name = 'arch_lab_plugin_' + self.name
+            module = sys.modules.get(name)
+            if module is None:
+                spec = importlib.util.spec_from_file_location(name,
+                                                              self.target)
+                module = importlib.util.module_from_spec(spec)
+                sys.modules[name] = module
+                try:
+                    spec.loader.exec_module(module)
+                except BaseException:
+                    del sys.modules[name]
+                    raise
+            return module.BACKEND
+        module, _, attr = self.target.partition(':')
+        return getattr(importlib.import_module(module), attr)
+
+    def __repr__(self):
+        return "{}({!r}, {!r}, {!r}, {!r})".format(
+            "Savemethod", self.name, self.description, self.extension,
+            self.target)
+
+
+BUILTIN = (
+    Savemethod('pickle', 'simple python-based object file format', '.pkl',
+               'pickle_backend:PickleFileBackend'),
+    Savemethod('json', 'JavaScript object notation', '.json',
+               'json_backend:JsonFileBackend'),
+    Savemethod('yaml', 'YAML file format', '.yaml',
+               'yaml_backend:YamlFileBackend'),
+    Savemethod('journal', 'append-only log of changes', '.jnl',
+               'journal_backend:JournalFileBackend'),
+    Savemethod('binary', 'memory-mapped binary records', '.bin',
+               'binary_backend:BinaryFileBackend'),
+)
+_plugins = None
+
+
+def _discover():
+    """Find savemethods provided by entry points and plugin directory.
+
+    return: [Savemethod, -||-]
+    """
+    import importlib.metadata
+
+    found = []
+    for point in importlib.metadata.entry_points(group=ENTRY_POINTS):
+        source = point.dist.name if point.dist is not None else point.value
+        found.append(Savemethod(point.name, "provided by " + source,
+                                '.' + point.name, point.value))
+    try:
+        names = sorted(os.listdir(PLUGINS))
+    except OSError:
+        names = []
+    for name in names:
+        if name.endswith(PLUGIN_SUFFIX):
+            method = name[:-len(PLUGIN_SUFFIX)]
+            found.append(Savemethod(method, "plugin " + name, '.' + method,
+                                    os.path.join(PLUGINS, name)))
+    return found
+
+
+def savemethods():
+    """Get all known savemethods.
+
+    Built-in ones come first, then ones of entry points and then of plugin
+    directory. Savemethod that is already known is not overridden.
+    Plugins are searched for once.
+
+    return: (Savemethod, -||-)
+    """
+    global _plugins
+    if _plugins is None:
+        _plugins = _discover()
+    known, result = set(), []
+    for savemethod in BUILTIN + tuple(_plugins):
+        if savemethod.name not in known:
+            known.add(savemethod.name)
+            result.append(savemethod)
+    return tuple(result)
+
+
+def find(name):
+    """Find savemethod by name.
+
+    Raises KeyError if there is no such savemethod.
+
+    name: string - savemethod name.
+    return: Savemethod
+    """
+    for savemethod in BUILTIN:
+        if savemethod.name == name:
+            return savemethod
+    for savemethod in savemethods():
+        if savemethod.name == name:
+            return savemethod
+    raise KeyError(name)
+
+
+def capabilities(backend):
+    """Tell what a backend can do.
+
+    Capabilities are:
+      streaming - files are written and read as streams, so they can be
+                  compressed and migrated a chunk at a time.
+      partial load - finished tasks are kept in a separate file that is
+                     only loaded when needed.
+      append - changes can be appended to file instead of saving it whole.
+
+    backend: engine.FileBackend descendant.
+    return: frozenset of strings.
+    """
+    return frozenset(name for name, attr in (('streaming', 'streams'),
+                                             ('partial load', 'sections'),
+                                             ('append', 'appends'))
+                     if getattr(backend, attr))
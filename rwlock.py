@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+"""Arch_Lab reader/writer lock.
+
+This module provides a lock that many threads may hold for reading at once
+for the Arch_Lab engines. You probably should not be importing it directly.
+"""
+
+import threading
+import contextlib
+
+
+class RWLock():
+    """Reader/writer lock.
+
+    Any number of threads may hold it for reading at once, while holding it
+    for writing is exclusive. Threads waiting to write are preferred over
+    new readers, so that a steady stream of readers does not starve writers.
+
+    Both reading and writing are reentrant, and writer may read too. Reader
+    may not start writing without releasing the lock first, as two readers
+    doing that would wait for each other forever; RuntimeError is raised
+    instead.
+
+    Used as a context manager or with acquire and release, lock is held for
+    writing, so that it can replace threading.RLock.
+    """
+    def __init__(self):
+        """Initialize self."""
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = {}
+        self._writer = None
+        self._depth = 0
+        self._waiting = 0
+
+    def acquire_read(self):
+        """Acquire lock for reading, waiting for writers to finish."""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me and me not in self._readers:
+                while self._writer is not None or self._waiting:
+                    self._cond.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+    def release_read(self):
+        """Release lock acquired for reading."""
+        me = threading.get_ident()
+        with self._cond:
+            depth = self._readers.get(me, 0) - 1
+            if depth < 0:
+                raise RuntimeError("cannot release un-acquired lock")
+            if depth:
+                self._readers[me] = depth
+            else:
+                del self._readers[me]
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def reading(self):
+        """Hold lock for reading for the duration of the block."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    def acquire(self):
+        """Acquire lock for writing, waiting for readers and writers to
+        finish.
+
+        return: True
+        """
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._depth += 1
+                return True
+            if me in self._readers:
+                raise RuntimeError("cannot write while reading")
+            self._waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting -= 1
+            self._writer = me
+            self._depth = 1
+        return True
+
+    def release(self):
+        """Release lock acquired for writing."""
+        with self._cond:
+            if self._writer != threading.get_ident():
+                raise RuntimeError("cannot release un-acquired lock")
+            self._depth -= 1
+            if not self._depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+"""Arch_Lab full-text search.
+
+This module provides an inverted index over task descriptions for the
+Arch_Lab engines. You probably should not be importing it directly.
+
+A word is a run of letters, digits and underscores, compared ignoring case.
+Task matches a query if it's description has every word of the query.
+"""
+
+import re
+import array
+
+SEARCH_SUFFIX = '.idx'
+WORD = re.compile(r'\w+')
+
+
+def words(text):
+    """Split text into words.
+
+    text: string
+    return: set of strings - distinct words of text, casefolded.
+    """
+    return set(WORD.findall(text.casefold()))
+
+
+class TaskIndex():
+    """Inverted index over task descriptions.
+
+    Maps every word to IDs of tasks that have it, so that a query only looks
+    at tasks having it's rarest word. Index is changed one task at a time as
+    tasks are added, removed or edited.
+
+    Pickled index keeps word postings and IDs of indexed tasks only, as
+    arrays of IDs, so that it loads without splitting any description. They
+    are turned back into sets one by one when first used. Tasks themselves
+    are attached after loading, refer to attach.
+
+    Attributes:
+      postings - dict mapping words to sets (or arrays, if not used since
+                 index was loaded) of task IDs.
+      tasks - dict mapping task IDs to (Task, finished) pairs, or None if
+              tasks are not attached.
+      ids - set (or array, if not changed since index was loaded) of IDs of
+            indexed tasks while tasks are not attached, None otherwise.
+      changed - True if index changed since it was built or loaded.
+    """
+    def __init__(self):
+        """Initialize empty index with no tasks attached."""
+        self.postings = {}
+        self.tasks = None
+        self.ids = None
+        self.changed = False
+
+    def build(pending, finished):
+        """Index task lists.
+
+        pending: iterable of Tasks - pending tasks.
+        finished: iterable of Tasks - finished tasks.
+        return: TaskIndex with tasks attached.
+        """
+        index = TaskIndex()
+        index.tasks = {}
+        postings = index.postings
+        for done, tasks in ((False, pending), (True, finished)):
+            for task in tasks:
+                index.tasks[task.id] = (task, done)
+                for word in words(task.content):
+                    ids = postings.get(word)
+                    if ids is None:
+                        postings[word] = {task.id}
+                    else:
+                        ids.add(task.id)
+        index.changed = True
+        return index
+
+    def attach(self, pending, finished):
+        """Attach tasks to loaded index.
+
+        Tasks should be same as ones index was built from. Their IDs are
+        checked against indexed ones, as tasks of savefiles that do not
+        store IDs get new ones on every load; index should be built anew if
+        they do not match.
+
+        pending: iterable of Tasks - pending tasks.
+        finished: iterable of Tasks - finished tasks.
+        return: boolean - False if IDs do not match, tasks are not attached
+                then.
+        """
+        tasks = {task.id: (task, False) for task in pending}
+        tasks.update((task.id, (task, True)) for task in finished)
+        if (self.ids is None or len(self.ids) != len(tasks) or
+                not all(map(tasks.__contains__, self.ids))):
+            return False
+        self.tasks, self.ids = tasks, None
+        return True
+
+    def add(self, task, finished=False):
+        """Add task to index.
+
+        task: Task
+        finished: boolean - whether task is finished.
+        """
+        for word in words(task.content):
+            self._ids(word, True).add(task.id)
+        if self.tasks is not None:
+            self.tasks[task.id] = (task, finished)
+        elif self.ids is not None:
+            self._indexed().add(task.id)
+        self.changed = True
+
+    def discard(self, task):
+        """Remove task from index, if it is there.
+
+        task: Task
+        """
+        for word in words(task.content):
+            if word in self.postings:
+                ids = self._ids(word)
+                ids.discard(task.id)
+                if not ids:
+                    del self.postings[word]
+        if self.tasks is not None:
+            self.tasks.pop(task.id, None)
+        elif self.ids is not None:
+            self._indexed().discard(task.id)
+        self.changed = True
+
+    def search(self, query):
+        """Find tasks that have every word of query.
+
+        Tasks should be attached. IDs of tasks that are not attached are
+        skipped.
+
+        query: string
+        return: [(Task, boolean), -||-] - tasks and whether they are finished,
+                pending tasks first, both ordered by date and then by ID.
+        """
+        postings = sorted((self._ids(word) for word in words(query)), key=len)
+        if not postings:
+            return []
+        ids = set(postings[0])
+        for other in postings[1:]:
+            ids.intersection_update(other)
+        found = [self.tasks[task_id] for task_id in ids
+                 if task_id in self.tasks]
+        found.sort(key=lambda item: (item[1], item[0].ordinal, item[0].id))
+        return found
+
+    def _ids(self, word, create=False):
+        """Get set of IDs of tasks that have word.
+
+        Array loaded from pickle is replaced with a set on first use.
+
+        create: boolean - add empty set if word is not in index yet.
+        return: set of ints, empty one not in index if word is unknown and
+                create is False.
+        """
+        ids = self.postings.get(word)
+        if type(ids) is not set:
+            if ids is None and not create:
+                return set()
+            ids = self.postings[word] = set(ids or ())
+        return ids
+
+    def _indexed(self):
+        """Get set of IDs of indexed tasks while tasks are not attached.
+
+        Array loaded from pickle is replaced with a set on first use.
+        """
+        if type(self.ids) is not set:
+            self.ids = set(self.ids)
+        return self.ids
+
+    def __getstate__(self):
+        indexed = self.ids if self.tasks is None else self.tasks
+        return ({word: array.array('q', ids)
+                 for word, ids in self.postings.items()},
+                None if indexed is None else array.array('q', indexed))
+
+    def __setstate__(self, state):
+        self.postings, self.ids = state
+        self.tasks = None
+        self.changed = False
+
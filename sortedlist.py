@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+"""Arch_Lab sorted container.
+
+This module provides a sorted sequence for the Arch_Lab engines. You probably
+should not be importing it directly.
+"""
+
+import bisect
+import itertools
+
+
+class SortedTaskList():
+    """Sorted sequence with positional access.
+
+    Items are kept in a list of short sorted sublists. A Fenwick tree over
+    sublist lengths translates positions into (sublist, offset) pairs, so
+    adding, popping and indexing all cost O(log n) plus a memmove of at most
+    2 * LOAD pointers.
+
+    Equal items are kept in insertion order, same as bisect.insort does.
+    """
+    LOAD = 500
+
+    def __init__(self, iterable=()):
+        """Initialize self.
+
+        iterable: items to put in the container, need not be sorted.
+        """
+        self._len = 0
+        self._lists = []
+        self._maxes = []
+        self._tree = [0]
+        self.update(iterable)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._lists)
+
+    def __reversed__(self):
+        return itertools.chain.from_iterable(
+            reversed(sub) for sub in reversed(self._lists))
+
+    def __eq__(self, other):
+        """Return self == other.
+
+        SortedTaskList is equal to any sequence holding equal items in the
+        same order.
+        """
+        try:
+            if len(self) != len(other):
+                return False
+        except TypeError:
+            return NotImplemented
+        return all(x == y for x, y in zip(self, other))
+
+    def __getitem__(self, idx):
+        """Return item at position idx.
+
+        idx: int or slice - position(s) of item(s) in the container.
+        return: item or list of items for slices.
+        """
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self._len))]
+        pos, offset = self._locate(idx)
+        return self._lists[pos][offset]
+
+    def __setitem__(self, idx, value):
+        """Replace item at position idx with value.
+
+        Raises ValueError if value does not sort equal to the item it
+        replaces, as that would break the order.
+        """
+        pos, offset = self._locate(idx)
+        sub = self._lists[pos]
+        if value < sub[offset] or sub[offset] < value:
+            raise ValueError("replacement should sort equal to old item")
+        sub[offset] = value
+        if offset == len(sub) - 1:
+            self._maxes[pos] = value
+
+    def __delitem__(self, idx):
+        self.pop(idx)
+
+    def __repr__(self):
+        return "{}({!r})".format("SortedTaskList", list(self))
+
+    def add(self, value):
+        """Insert value keeping the container sorted.
+
+        value will be placed after any items equal to it.
+        """
+        if not self._lists:
+            self._lists.append([value])
+            self._maxes.append(value)
+            self._len = 1
+            self._build_tree()
+            return
+
+        pos = bisect.bisect_right(self._maxes, value)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._lists[pos].append(value)
+            self._maxes[pos] = value
+        else:
+            bisect.insort(self._lists[pos], value)
+        self._len += 1
+
+        if len(self._lists[pos]) > 2 * self.LOAD:
+            sub = self._lists[pos]
+            self._lists[pos:pos + 1] = [sub[:self.LOAD], sub[self.LOAD:]]
+            self._maxes[pos:pos + 1] = [sub[self.LOAD - 1], sub[-1]]
+            self._build_tree()
+        else:
+            self._tree_add(pos, 1)
+
+    def update(self, iterable):
+        """Add every item of iterable.
+
+        Cheaper than calling add() for each item when adding in bulk.
+        """
+        values = sorted(itertools.chain(self, iterable))
+        self._lists = [values[i:i + self.LOAD]
+                       for i in range(0, len(values), self.LOAD)]
+        self._maxes = [sub[-1] for sub in self._lists]
+        self._len = len(values)
+        self._build_tree()
+
+    def bisect_left(self, value):
+        """Find position of first item not less than value.
+
+        Same as bisect.bisect_left on a sorted list, in O(log n).
+        """
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        idx = bisect.bisect_left(self._lists[pos], value)
+        i = pos
+        while i:
+            idx += self._tree[i]
+            i -= i & -i
+        return idx
+
+    def pop(self, idx=-1):
+        """Remove and return item at position idx.
+
+        Raises IndexError if container is empty or idx is out of range.
+        """
+        pos, offset = self._locate(idx)
+        sub = self._lists[pos]
+        value = sub.pop(offset)
+        self._len -= 1
+
+        if not sub:
+            del self._lists[pos]
+            del self._maxes[pos]
+            self._build_tree()
+        elif len(sub) < self.LOAD // 2 and len(self._lists) > 1:
+            prev = pos - 1 if pos else pos
+            self._lists[prev:prev + 2] = [self._lists[prev] +
+                                          self._lists[prev + 1]]
+            self._maxes[prev:prev + 2] = [self._lists[prev][-1]]
+            self._build_tree()
+        else:
+            self._maxes[pos] = sub[-1]
+            self._tree_add(pos, -1)
+        return value
+
+    def _build_tree(self):
+        """Rebuild Fenwick tree of sublist lengths from scratch."""
+        tree = [0] + [len(sub) for sub in self._lists]
+        for i in range(1, len(tree)):
+            j = i + (i & -i)
+            if j < len(tree):
+                tree[j] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, pos, delta):
+        """Add delta to the length of sublist pos in Fenwick tree."""
+        tree = self._tree
+        i = pos + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _locate(self, idx):
+        """Translate position into (sublist, offset) pair.
+
+        Raises IndexError if idx is out of range.
+        """
+        if idx < 0:
+            idx += self._len
+        if not 0 <= idx < self._len:
+            raise IndexError("SortedTaskList index out of range")
+
+        tree = self._tree
+        pos = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] <= idx:
+                pos = nxt
+                idx -= tree[nxt]
+            step >>= 1
+        return pos, idx
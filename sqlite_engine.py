@@ -0,0 +1,473 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+"""Arch_Lab SQLite engine implementation.
+
+This module provides an implementation of Engine class for Arch_Lab program
+that keeps tasks in SQLite database. You probably should not be importing it
+directly.
+"""
+
+import sqlite3
+import itertools
+import datetime
+import lab
+import engine
+import search
+from lab import SAVEFILE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {0} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    content TEXT NOT NULL,
+    date INTEGER NOT NULL,
+    uid INTEGER
+);
+CREATE INDEX IF NOT EXISTS {0}_date ON {0} (date, id);
+"""
+UID_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS {0}_uid ON {0} (uid)"
+# Inverted index over task descriptions, one row per word of every task.
+WORDS = """
+CREATE TABLE IF NOT EXISTS words (
+    word TEXT NOT NULL,
+    uid INTEGER NOT NULL,
+    PRIMARY KEY (word, uid)
+) WITHOUT ROWID;
+"""
+PENDING = 'pending'
+FINISHED = 'finished'
+
+
+class SqliteEngine(lab.Engine):
+    """Engine implementation for Arch_Lab.
+
+    Keeps pending and finished tasks in two tables of SQLite database, indexed
+    by date. Dates are stored as proleptic Gregorian ordinals. Tasks with equal
+    dates are ordered by row id, which only grows, so positions of tasks are
+    same as ListEngine would give them. Task IDs are kept in uid column, which
+    has an index of it's own, so tasks are found by ID without scanning.
+    Words of task descriptions are kept in words table along with task IDs,
+    so that search does not scan tasks either, refer to search_tasks.
+
+    Changes are done in a transaction which is committed by save_tasks, so
+    tasks are never loaded into memory all at once.
+
+    Attributes:
+      savefile - name of database file. Is controlled by SAVEFILE variable.
+      db - sqlite3.Connection to savefile.
+    """
+    def __init__(self):
+        """Initialize self.
+
+        Opens database, creating tables if needed. Tasks stored before they
+        had IDs get them, and are added to words table if it is new.
+        """
+        super().__init__()
+        self.savefile = SAVEFILE + '.sqlite3'
+        self.db = sqlite3.connect(self.savefile)
+        self.db.executescript(SCHEMA.format(PENDING) + SCHEMA.format(FINISHED))
+        for table in (PENDING, FINISHED):
+            self._add_ids(table)
+        self._create_words()
+
+    def view_pending_tasks(self, start=None, stop=None):
+        """Fetch pending tasks.
+
+        Returns the list of stored pending tasks as a list of tuples.
+
+        start: int - position of first task to fetch, optional.
+        stop: int - position after last task to fetch, optional.
+        return: [(string, datetime.date), -||-]
+        """
+        return self._view(PENDING, start, stop)
+
+    def new_task(self, content, year, month, day):
+        task = engine.Task(content, year, month, day)
+        self._insert(PENDING, task.content, task.ordinal, task.id)
+        return task.id
+
+    def remove_pending_task(self, idx):
+        """Remove task from the list of pending tasks.
+
+        Raises IndexError if task does not exist.
+
+        idx: int - descriptor, namely position of a task in the list.
+        """
+        self._pop(PENDING, self._find(PENDING, idx))
+
+    def edit_pending_task(self, idx, content, year, month, day):
+        """Edit a task in the list of pending tasks.
+
+        Refer to ListEngine.edit_pending_task for details.
+        """
+        self._edit(PENDING, self._find(PENDING, idx),
+                   content, year, month, day)
+
+    def finish_task(self, idx):
+        self._insert(FINISHED, *self._pop(PENDING, self._find(PENDING, idx)))
+
+    def view_finished_tasks(self, start=None, stop=None):
+        """Fetch finished tasks.
+
+        Returns the list of stored finished tasks as a list of tuples.
+
+        start: int - position of first task to fetch, optional.
+        stop: int - position after last task to fetch, optional.
+        return: [(string, datetime.date), -||-]
+        """
+        return self._view(FINISHED, start, stop)
+
+    def clear_finished_tasks(self):
+        """Remove all finished tasks.
+
+        List of finished tasks will be empty after this.
+        """
+        self.db.execute('DELETE FROM words WHERE uid IN (SELECT uid FROM {})'
+                        .format(FINISHED))
+        self.db.execute('DELETE FROM {}'.format(FINISHED))
+
+    def remove_finished_task(self, idx):
+        """Remove task from the list of finished tasks.
+
+        Raises IndexError if task does not exist.
+
+        idx: int - descriptor, namely position of a task in the list.
+        """
+        self._pop(FINISHED, self._find(FINISHED, idx))
+
+    def edit_finished_task(self, idx, content, year, month, day):
+        """Edit a task in the list of finished tasks.
+
+        Refer to ListEngine.edit_finished_task for details.
+        """
+        self._edit(FINISHED, self._find(FINISHED, idx),
+                   content, year, month, day)
+
+    def unfinish_task(self, idx):
+        self._insert(PENDING, *self._pop(FINISHED, self._find(FINISHED, idx)))
+
+    def shift_pending_tasks(self, days):
+        """Move every pending task by the same number of days.
+
+        Refer to ListEngine.shift_pending_tasks for details.
+        """
+        if type(days) is not int:
+            raise TypeError("Number of days should be an int")
+        low, high = self.db.execute('SELECT MIN(date), MAX(date) FROM {}'
+                                    .format(PENDING)).fetchone()
+        if low is None:
+            return
+        if low + days < 1 or high + days > datetime.date.max.toordinal():
+            raise ValueError("date out of range")
+        self.db.execute('UPDATE {} SET date = date + ?'.format(PENDING),
+                        (days,))
+
+    def view_task(self, task_id):
+        """Fetch task by ID.
+
+        Raises KeyError if there is no such task.
+
+        task_id: int - task ID, as returned by new_task.
+        return: (string, datetime.date, boolean) - description, date and
+                whether task is finished.
+        """
+        for table in (PENDING, FINISHED):
+            row = self.db.execute('SELECT content, date FROM {} WHERE uid = ?'
+                                  .format(table), (task_id,)).fetchone()
+            if row is not None:
+                return (row[0], datetime.date.fromordinal(row[1]),
+                        table == FINISHED)
+        raise KeyError(task_id)
+
+    def view_pending_tasks_with_ids(self, start=None, stop=None):
+        """Fetch pending tasks along with their IDs.
+
+        start: int - position of first task to fetch, optional.
+        stop: int - position after last task to fetch, optional.
+        return: [(int, string, datetime.date), -||-]
+        """
+        return self._view_with_ids(PENDING, start, stop)
+
+    def view_finished_tasks_with_ids(self, start=None, stop=None):
+        """Fetch finished tasks along with their IDs.
+
+        start: int - position of first task to fetch, optional.
+        stop: int - position after last task to fetch, optional.
+        return: [(int, string, datetime.date), -||-]
+        """
+        return self._view_with_ids(FINISHED, start, stop)
+
+    def remove_pending_task_by_id(self, task_id):
+        self._pop(PENDING, self._find_id(PENDING, task_id))
+
+    def edit_pending_task_by_id(self, task_id, content, year, month, day):
+        self._edit(PENDING, self._find_id(PENDING, task_id),
+                   content, year, month, day)
+
+    def finish_task_by_id(self, task_id):
+        self._insert(FINISHED,
+                     *self._pop(PENDING, self._find_id(PENDING, task_id)))
+
+    def remove_finished_task_by_id(self, task_id):
+        self._pop(FINISHED, self._find_id(FINISHED, task_id))
+
+    def edit_finished_task_by_id(self, task_id, content, year, month, day):
+        self._edit(FINISHED, self._find_id(FINISHED, task_id),
+                   content, year, month, day)
+
+    def unfinish_task_by_id(self, task_id):
+        self._insert(PENDING,
+                     *self._pop(FINISHED, self._find_id(FINISHED, task_id)))
+
+    def search_tasks(self, query):
+        """Find tasks whose description has every word of query.
+
+        Task IDs are looked up in words table, one index lookup per word,
+        and tasks are then fetched by ID.
+
+        query: string - words to look for, case is ignored.
+        return: [(int, string, datetime.date, boolean), -||-] - ID,
+                description, date and whether task is finished, pending
+                tasks first, both ordered by date.
+        """
+        words = sorted(search.words(query))
+        if not words:
+            return []
+        found = ' INTERSECT '.join(['SELECT uid FROM words WHERE word = ?'] *
+                                   len(words))
+        return [(uid, content, datetime.date.fromordinal(date),
+                 table == FINISHED)
+                for table in (PENDING, FINISHED)
+                for uid, content, date in self.db.execute(
+                    'SELECT uid, content, date FROM {} WHERE uid IN ({}) '
+                    'ORDER BY date, id'.format(table, found), words)]
+
+    def import_tasks(self, records):
+        """Add many tasks at once.
+
+        Records are inserted engine.IMPORT_BATCH at a time with one statement
+        per batch, in the same order new_task would give them.
+
+        records: iterable of (string, datetime.date, boolean) - description,
+                 date and whether task is finished.
+        return: int - number of imported tasks.
+        """
+        count = 0
+        records = iter(records)
+        batch = list(itertools.islice(records, engine.IMPORT_BATCH))
+        while batch:
+            rows = ([], [])
+            for content, date, done in batch:
+                if type(content) is not str:
+                    raise TypeError("Task content should be a string")
+                rows[bool(done)].append((content, date.toordinal(),
+                                         engine.Task.new_id()))
+            for table, part in zip((PENDING, FINISHED), rows):
+                self.db.executemany('INSERT INTO {} (content, date, uid) '
+                                    'VALUES (?, ?, ?)'.format(table), part)
+                self._words((uid, content) for content, _, uid in part)
+            count += len(batch)
+            batch = list(itertools.islice(records, engine.IMPORT_BATCH))
+        return count
+
+    def save_tasks(self):
+        """Commit changes into database."""
+        self.db.commit()
+
+    def get_savemethod(self):
+        return 'sqlite'
+
+    def get_available_savemethods(self):
+        """Get savemethods that are currently available.
+
+        SqliteEngine can only store tasks in it's database.
+        """
+        return (('sqlite', 'SQLite database, managed by sqlite engine'),)
+
+    def set_savemethod(self, method):
+        """Change employed savemethod.
+
+        Does nothing, as there is only one savemethod available. Use 'engine'
+        config parameter to switch to another engine.
+        """
+        pass
+
+    def changes_detected(self):
+        """Answers if task set changed.
+
+        Specifically, if there are uncommitted changes.
+        """
+        return self.db.in_transaction
+
+    def _view(self, table, start=None, stop=None):
+        """Fetch tasks from start to stop of table ordered by date."""
+        return [(content, datetime.date.fromordinal(date))
+                for content, date in self.db.execute(
+                    'SELECT content, date FROM {} ORDER BY date, id '
+                    'LIMIT ? OFFSET ?'.format(table),
+                    self._limits(table, start, stop))]
+
+    def _limits(self, table, start, stop):
+        """Turn slice bounds into LIMIT and OFFSET values.
+
+        Table is only counted if a bound is negative.
+
+        return: (int, int) - limit, -1 for no limit, and offset.
+        """
+        if (start or 0) < 0 or (stop or 0) < 0:
+            start, stop, _ = slice(start, stop).indices(self.db.execute(
+                'SELECT count(*) FROM {}'.format(table)).fetchone()[0])
+        start = start or 0
+        if stop is None:
+            return -1, start
+        return max(stop - start, 0), start
+
+    def _view_with_ids(self, table, start=None, stop=None):
+        """Fetch tasks from start to stop of table with their IDs, ordered
+        by date."""
+        return [(uid, content, datetime.date.fromordinal(date))
+                for uid, content, date in self.db.execute(
+                    'SELECT uid, content, date FROM {} ORDER BY date, id '
+                    'LIMIT ? OFFSET ?'.format(table),
+                    self._limits(table, start, stop))]
+
+    def _add_ids(self, table):
+        """Add uid column to table created before tasks had IDs.
+
+        Every stored task gets a new ID and change is committed at once.
+        Index on uid is created if it is missing.
+        """
+        columns = [row[1] for row in self.db.execute(
+            'PRAGMA table_info({})'.format(table))]
+        if 'uid' not in columns:
+            self.db.execute('ALTER TABLE {} ADD COLUMN uid INTEGER'
+                            .format(table))
+            rowids = self.db.execute('SELECT id FROM {}'
+                                     .format(table)).fetchall()
+            self.db.executemany('UPDATE {} SET uid = ? WHERE id = ?'
+                                .format(table),
+                                [(engine.Task.new_id(), rowid)
+                                 for rowid, in rowids])
+            self.db.commit()
+        self.db.execute(UID_INDEX.format(table))
+
+    def _create_words(self):
+        """Create words table, adding every stored task to it if it is new.
+
+        Change is committed at once.
+        """
+        if self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'words'"
+                           ).fetchone():
+            return
+        self.db.executescript(WORDS)
+        for table in (PENDING, FINISHED):
+            self._words(self.db.execute('SELECT uid, content FROM {}'
+                                        .format(table)).fetchall())
+        self.db.commit()
+
+    def _words(self, tasks, remove=False):
+        """Add words of tasks to words table or remove them from it.
+
+        tasks: iterable of (int, string) - task IDs and descriptions.
+        remove: boolean - remove words instead of adding them.
+        """
+        rows = ((word, uid) for uid, content in tasks
+                for word in search.words(content))
+        if remove:
+            self.db.executemany('DELETE FROM words WHERE word = ? AND uid = ?',
+                                rows)
+        else:
+            self.db.executemany('INSERT OR IGNORE INTO words (word, uid) '
+                                'VALUES (?, ?)', rows)
+
+    def _insert(self, table, content, date, uid):
+        """Insert task into table, and it's words into words table.
+
+        It will get greatest row id, thus will be placed after tasks with
+        the same date.
+        """
+        self.db.execute('INSERT INTO {} (content, date, uid) VALUES (?, ?, ?)'
+                        .format(table), (content, date, uid))
+        self._words(((uid, content),))
+
+    def _find(self, table, idx):
+        """Find task at position idx of table.
+
+        Raises IndexError if there is no such task.
+
+        return: (int, string, int, int) - row id, content, date ordinal and
+                task ID.
+        """
+        if idx < 0:
+            idx += self.db.execute('SELECT count(*) FROM {}'
+                                   .format(table)).fetchone()[0]
+        row = None
+        if idx >= 0:
+            row = self.db.execute(
+                'SELECT id, content, date, uid FROM {} ORDER BY date, id '
+                'LIMIT 1 OFFSET ?'.format(table), (idx,)).fetchone()
+        if row is None:
+            raise IndexError("task index out of range")
+        return row
+
+    def _find_id(self, table, task_id):
+        """Find task by ID in table.
+
+        Raises KeyError if there is no such task.
+
+        return: (int, string, int, int) - same as _find.
+        """
+        row = self.db.execute('SELECT id, content, date, uid FROM {} '
+                              'WHERE uid = ?'.format(table),
+                              (task_id,)).fetchone()
+        if row is None:
+            raise KeyError(task_id)
+        return row
+
+    def _pop(self, table, row):
+        """Remove task found by _find or _find_id from table.
+
+        return: (string, int, int) - content, date ordinal and ID of removed
+                task.
+        """
+        rowid, content, date, uid = row
+        self.db.execute('DELETE FROM {} WHERE id = ?'.format(table), (rowid,))
+        self._words(((uid, content),), remove=True)
+        return content, date, uid
+
+    def _edit(self, table, row, content, year, month, day):
+        """Edit task found by _find or _find_id in table.
+
+        Task that gets a new date is reinserted with same ID, so that it's
+        position is same as ListEngine would give it.
+        """
+        rowid, old_content, date, uid = row
+        if content == "":
+            content = old_content
+        if year is not None and month is not None and day is not None:
+            date = datetime.date(year, month, day).toordinal()
+            self._pop(table, row)
+            self._insert(table, content, date, uid)
+        else:
+            self.db.execute('UPDATE {} SET content = ? WHERE id = ?'
+                            .format(table), (content, rowid))
+            self._words(((uid, old_content),), remove=True)
+            self._words(((uid, content),))
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+"""Arch_Lab savefile locking.
+
+This module provides advisory locking of savefiles shared by several Arch_Lab
+processes. You probably should not be importing it directly.
+
+Every savefile has a lock file next to it, savefile + LOCK_SUFFIX, which is
+locked with fcntl.flock and holds the version stamp of savefile: a number
+that grows by one on every save. A process remembers version of tasks it
+loaded and learns that another process saved since then if the stamp does
+not match, so that it merges instead of overwriting. On systems without
+fcntl, lock file still keeps the stamp, but is not locked.
+"""
+
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LOCK_SUFFIX = '.lock'
+
+
+class StorageLock():
+    """Lock on a savefile and it's version stamp.
+
+    Shared lock is taken to load savefile together with it's version, so
+    that any number of processes may load at once. Exclusive lock is taken
+    to save it. Savefiles are replaced atomically, so reading them without
+    a lock is safe too, as long as version does not matter.
+
+    Version is bumped before savefile is written, so that crash in between
+    makes other processes merge with unchanged tasks, which is harmless,
+    rather than overwrite ones that were saved.
+
+    Attributes:
+      path - lock file name.
+      fd - file descriptor of open lock file, or None if it is not held.
+    """
+    def __init__(self, savefile):
+        """Initialize self.
+
+        savefile: string - name of savefile to lock.
+        """
+        self.path = savefile + LOCK_SUFFIX
+        self.fd = None
+
+    def acquire(self, exclusive=False):
+        """Open lock file and lock it, waiting for other processes.
+
+        exclusive: boolean - take exclusive lock instead of shared one.
+        return: self
+        """
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        if fcntl is not None:
+            try:
+                fcntl.flock(self.fd,
+                            fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            except BaseException:
+                self.release()
+                raise
+        return self
+
+    def release(self):
+        """Unlock and close lock file. May be called from any thread."""
+        if self.fd is not None:
+            fd, self.fd = self.fd, None
+            os.close(fd)
+
+    def version(self):
+        """Read version stamp. Lock should be held.
+
+        return: int - version, 0 if savefile was never saved with a lock.
+        """
+        data = os.pread(self.fd, 32, 0)
+        try:
+            return int(data or 0)
+        except ValueError:
+            return -1
+
+    def bump(self):
+        """Increment version stamp. Exclusive lock should be held.
+
+        return: int - new version.
+        """
+        version = max(self.version(), 0) + 1
+        data = str(version).encode()
+        os.pwrite(self.fd, data, 0)
+        os.ftruncate(self.fd, len(data))
+        os.fsync(self.fd)
+        return version
+
+    def __enter__(self):
+        if self.fd is None:
+            self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
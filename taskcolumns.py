@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+"""Arch_Lab columnar task store.
+
+This module provides columnar representation of task lists for date queries.
+NumPy is used if it is installed, otherwise queries fall back to plain Python
+over compact arrays. You probably should not be importing it directly.
+"""
+
+import array
+import datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+OVERDUE = -1
+TODAY = 0
+UPCOMING = 1
+MAX_ORDINAL = datetime.date.max.toordinal()
+
+
+def _ordinal(date):
+    """Return ordinal of date, or of current date if date is None."""
+    if date is None:
+        date = datetime.date.today()
+    return date.toordinal()
+
+
+def _column(ordinals):
+    """Pack ordinals into read-only int32 column."""
+    if numpy is not None:
+        column = numpy.fromiter(ordinals, dtype=numpy.int32)
+        column.flags.writeable = False
+        return column
+    return memoryview(array.array('i', ordinals)).toreadonly()
+
+
+class TaskColumns():
+    """Columnar representation of a task list.
+
+    Keeps task descriptions in a tuple and dates in an int32 column of
+    ordinals, so that date queries run over the whole column at once.
+
+    Columns are read-only, as engines share them between callers until task
+    lists change. Refer to shifted for a moved copy.
+
+    Attributes:
+      contents - tuple of task descriptions.
+      dates - read-only int32 column of date ordinals, numpy.ndarray or
+              memoryview of array.array.
+    """
+    def __init__(self, tasks=()):
+        """Initialize self.
+
+        tasks: seq of engine.Task or anything with content and ordinal.
+        """
+        self.contents = tuple(task.content for task in tasks)
+        self.dates = _column(task.ordinal for task in tasks)
+
+    def from_view(tasks):
+        """Create TaskColumns from tasks as engine views give them.
+
+        tasks: seq of (string, datetime.date).
+        return: TaskColumns
+        """
+        columns = TaskColumns()
+        columns.contents = tuple(content for content, _ in tasks)
+        columns.dates = _column(date.toordinal() for _, date in tasks)
+        return columns
+
+    def view(self):
+        """Return tasks as engine views give them.
+
+        return: [(string, datetime.date), -||-]
+        """
+        return [(content, datetime.date.fromordinal(date))
+                for content, date in zip(self.contents, self.dates.tolist())]
+
+    def __len__(self):
+        return len(self.dates)
+
+    def marks(self, today=None):
+        """Mark tasks as overdue, today or upcoming.
+
+        today: datetime.date - date to compare with, current date by default.
+        return: seq of ints, OVERDUE, TODAY or UPCOMING for every task.
+        """
+        today = _ordinal(today)
+        if numpy is not None:
+            return numpy.sign(self.dates - today)
+        return [(date > today) - (date < today) for date in self.dates]
+
+    def overdue(self, today=None):
+        """Find overdue tasks.
+
+        today: datetime.date - date to compare with, current date by default.
+        return: seq of ints - positions of tasks dated earlier than today.
+        """
+        today = _ordinal(today)
+        if numpy is not None:
+            return numpy.flatnonzero(self.dates < today)
+        return [idx for idx, date in enumerate(self.dates) if date < today]
+
+    def due_today(self, today=None):
+        """Find tasks scheduled for today.
+
+        today: datetime.date - date to compare with, current date by default.
+        return: seq of ints - positions of tasks dated today.
+        """
+        today = _ordinal(today)
+        if numpy is not None:
+            return numpy.flatnonzero(self.dates == today)
+        return [idx for idx, date in enumerate(self.dates) if date == today]
+
+    def due_between(self, start, end):
+        """Find tasks scheduled in a date range.
+
+        start: datetime.date - first date of range.
+        end: datetime.date - last date of range.
+        return: seq of ints - positions of tasks dated in range, inclusive.
+        """
+        start, end = start.toordinal(), end.toordinal()
+        if numpy is not None:
+            return numpy.flatnonzero((self.dates >= start) &
+                                     (self.dates <= end))
+        return [idx for idx, date in enumerate(self.dates)
+                if start <= date <= end]
+
+    def shifted(self, days):
+        """Move every task date by days.
+
+        Raises ValueError if a date would get out of datetime.date range.
+
+        days: int - number of days to add, may be negative.
+        return: TaskColumns - moved copy, self is left as it is.
+        """
+        if len(self):
+            if numpy is not None:
+                low, high = int(self.dates.min()), int(self.dates.max())
+            else:
+                low, high = min(self.dates), max(self.dates)
+            if not 1 <= low + days <= high + days <= MAX_ORDINAL:
+                raise ValueError("date out of range")
+        columns = TaskColumns()
+        columns.contents = self.contents
+        if numpy is not None:
+            columns.dates = self.dates + numpy.int32(days)
+            columns.dates.flags.writeable = False
+        else:
+            columns.dates = _column(date + days for date in self.dates)
+        return columns
@@ -24,12 +24,25 @@
 import unittest
 import unittest.mock as mock
 import io
+import sys
+import os
 import copy
+import bisect
 import random
+import tempfile
+import subprocess
+import importlib.metadata
+import threading
+import asyncio
+import functools
+import concurrent.futures
 import datetime
 import string
+import re
+import inspect
 import configparser
 import pickle
+import sqlite3
 import yaml
 import json
 import lab
@@ -37,6 +50,22 @@ import engine
 import pickle_backend
 import yaml_backend
 import json_backend
+import journal_backend
+import binary_backend
+import sqlite_engine
+import daemon
+import sortedlist
+import taskcolumns
+import autosave
+import watcher
+import compression
+import migrate
+import registry
+import storagelock
+import rwlock
+import search
+import transfer
+import controller
 from interface import TerminalInterface
 
 
@@ -52,13 +81,60 @@ class TestPickleBackend(unittest.TestCase):
     def setUp(self):
         self.fakefil = io.BytesIO()
 
-    def test_save(self, mopen):
-        mopen().__enter__.return_value = self.fakefil
+    @mock.patch('engine.atomic_open')
+    def test_save(self, matomic, mopen):
+        matomic().__enter__.return_value = self.fakefil
         self.fbk.save("/tmp/blah", self.testval)
+        matomic.assert_called_with("/tmp/blah", 'wb')
 
         self.fakefil.seek(0)
+        self.assertEqual((pickle_backend.FORMAT, pickle_backend.VERSION,
+                          False), pickle.load(self.fakefil))
         self.assertEqual(self.testval, pickle.load(self.fakefil))
 
+    def test_save_load_tasks(self, mopen):
+        mopen().__enter__.return_value = self.fakefil
+        tasks = ([engine.Task('a', 2016, 1, 2), engine.Task('b', 1, 1, 1)],
+                 [engine.Task('c', 2016, 1, 3)])
+        self.fbk.dump(tasks, self.fakefil)
+        self.fakefil.seek(0)
+        self.assertTrue(pickle.load(self.fakefil)[2])
+        self.assertEqual((0, ["a", "b"]), pickle.load(self.fakefil)[:2])
+        self.fakefil.seek(0)
+        self.assertEqual(tasks, self.fbk.load("/tmp/blah"))
+
+    def test_chunks(self, mopen):
+        tasks = [engine.Task(str(x), 2016, 1, 1 + x % 28) for x in range(7)]
+        chunks = [(0, tasks[:3]), (0, tasks[3:5]), (1, tasks[5:])]
+        self.fbk.dump_chunks(chunks, self.fakefil)
+        self.fakefil.seek(0)
+        self.assertEqual(chunks, list(self.fbk.parse_chunks(self.fakefil)))
+        self.fakefil.seek(0)
+        self.assertEqual((tasks[:5], tasks[5:]),
+                         self.fbk.parse(self.fakefil))
+        self.assertEqual([], list(self.fbk.parse_chunks(io.BytesIO())))
+
+    def test_read_legacy(self, mopen):
+        mopen().__enter__.return_value = self.fakefil
+        self.fakefil.write(
+            b'\x80\x03]q\x00cengine\nTask\nq\x01)\x81q\x02}q\x03(X\x07\x00'
+            b'\x00\x00contentq\x04X\x01\x00\x00\x00aq\x05X\x04\x00\x00\x00'
+            b'dateq\x06cdatetime\ndate\nq\x07C\x04\x07\xe0\x01\x02q\x08\x85q'
+            b'\tRq\nuba]q\x0bh\x01)\x81q\x0c}q\r(h\x04X\x01\x00\x00\x00bq'
+            b'\x0eh\x06h\x07C\x04\x07\xe0\x01\x03q\x0f\x85q\x10Rq\x11uba'
+            b'\x86q\x12.')
+        self.fakefil.seek(0)
+        self.assertEqual(([engine.Task('a', 2016, 1, 2)],
+                          [engine.Task('b', 2016, 1, 3)]),
+                         self.fbk.load("/tmp/blah"))
+
+    def test_read_newer_version(self, mopen):
+        mopen().__enter__.return_value = self.fakefil
+        pickle.dump((pickle_backend.FORMAT, pickle_backend.VERSION + 1,
+                     True), self.fakefil)
+        self.fakefil.seek(0)
+        self.assertRaises(ValueError, self.fbk.load, "/tmp/blah")
+
     def test_read_correct(self, mopen):
         mopen().__enter__.return_value = self.fakefil
         pickle.dump(self.testval, self.fakefil)
@@ -84,12 +160,13 @@ class TestYamlBackend(unittest.TestCase):
     def setUp(self):
         self.fakefil = io.StringIO()
 
-    def test_save(self, mopen):
-        mopen().__enter__.return_value = self.fakefil
+    @mock.patch('engine.atomic_open')
+    def test_save(self, matomic, mopen):
+        matomic().__enter__.return_value = self.fakefil
         self.fbk.save("/tmp/blah", self.testval)
 
         self.fakefil.seek(0)
-        self.assertEqual(self.testval, yaml.load(self.fakefil))
+        self.assertEqual(self.testval, yaml.safe_load(self.fakefil))
 
     def test_read_correct(self, mopen):
         mopen().__enter__.return_value = self.fakefil
@@ -108,6 +185,78 @@ class TestYamlBackend(unittest.TestCase):
         self.assertEqual(([], []), self.fbk.load("/tmp/blah"))
 
 
+    def test_save_load_tasks(self, mopen):
+        mopen().__enter__.return_value = self.fakefil
+        tasks = ([engine.Task('123', 123, 1, 1)],
+                 [engine.Task('a: b', 2016, 11, 11, 7)])
+        self.fbk.dump(tasks, self.fakefil)
+        self.assertIn("!task ['a: b', 736279, 7]", self.fakefil.getvalue())
+        self.assertNotIn("python", self.fakefil.getvalue())
+        self.fakefil.seek(0)
+        loaded = self.fbk.load("/tmp/blah")
+        self.assertEqual(list(tasks), loaded)
+        self.assertEqual([tasks[0][0].id, 7], [x[0].id for x in loaded])
+
+    def test_read_legacy(self, mopen):
+        mopen().__enter__.return_value = self.fakefil
+        self.fakefil.write("!!python/tuple\n"
+                           "- - !!python/object:engine.Task\n"
+                           "    content: a\n"
+                           "    date: 2016-01-02\n"
+                           "- - !!python/object:engine.Task "
+                           "{content: b, date: 2016-01-03}\n")
+        self.fakefil.seek(0)
+        self.assertEqual(([engine.Task('a', 2016, 1, 2)],
+                          [engine.Task('b', 2016, 1, 3)]),
+                         self.fbk.load("/tmp/blah"))
+
+    def test_read_unsafe(self, mopen):
+        mopen().__enter__.return_value = self.fakefil
+        self.fakefil.write("!!python/object/apply:os.system [echo]\n")
+        self.fakefil.seek(0)
+        self.assertRaises(yaml.YAMLError, self.fbk.load, "/tmp/blah")
+
+    def test_chunks(self, mopen):
+        tasks = [engine.Task("a\nb: 'c' " * x, 2016, 1, 1 + x % 28)
+                 for x in range(20)]
+        item = [tasks[:15], tasks[15:]]
+        self.fbk.dump_chunks([(0, tasks[:3]), (0, tasks[3:15]),
+                              (1, tasks[15:])], self.fakefil)
+        whole = io.StringIO()
+        self.fbk.dump(item, whole)
+        self.assertEqual(whole.getvalue(), self.fakefil.getvalue())
+        self.fakefil.seek(0)
+        with mock.patch('engine.CHUNK', 10):
+            self.assertEqual([(0, tasks[:10]), (0, tasks[10:15]),
+                              (1, tasks[15:])],
+                             list(self.fbk.parse_chunks(self.fakefil)))
+
+    def test_chunks_empty_or_legacy(self, mopen):
+        self.fbk.dump_chunks([(1, [])], self.fakefil)
+        self.assertEqual("- []\n- []\n", self.fakefil.getvalue())
+        self.fakefil.seek(0)
+        self.assertEqual([], list(self.fbk.parse_chunks(self.fakefil)))
+        self.assertEqual([], list(self.fbk.parse_chunks(io.StringIO(""))))
+        legacy = io.StringIO("- - !!python/object:engine.Task "
+                             "{content: b, date: 2016-01-03}\n- []\n")
+        self.assertEqual([(0, [engine.Task('b', 2016, 1, 3)])],
+                         list(self.fbk.parse_chunks(legacy)))
+        with self.assertRaises(ValueError):
+            list(self.fbk.parse_chunks(io.StringIO("- - !task [a, 1, 2]\n"
+                                                   "- - 5\n")))
+        with self.assertRaises(ValueError):
+            list(self.fbk.parse_chunks(io.StringIO("- - !task [a, 1, 2, 3]\n"
+                                                   "- []\n")))
+
+    def test_pure_python(self, mopen):
+        tasks = [[engine.Task('x', 2000, 1, 1)], []]
+        text = yaml.dump(tasks, Dumper=yaml_backend.PyTaskDumper)
+        self.assertEqual(text, yaml.dump(tasks,
+                                         Dumper=yaml_backend.TaskDumper))
+        self.assertEqual(tasks, yaml.load(text,
+                                          Loader=yaml_backend.PyTaskLoader))
+
+
 @mock.patch('json_backend.open')
 class TestJsonBackend(unittest.TestCase):
     fbk = json_backend.JsonFileBackend
@@ -118,15 +267,18 @@ class TestJsonBackend(unittest.TestCase):
     def setUp(self):
         self.fakefil = io.StringIO()
 
-    def test_save_load_correct(self, mopen):
+    @mock.patch('engine.atomic_open')
+    def test_save_load_correct(self, matomic, mopen):
+        matomic().__enter__.return_value = self.fakefil
         mopen().__enter__.return_value = self.fakefil
         self.fbk.save("/tmp/blah", self.Task_testval)
 
         self.fakefil.seek(0)
         self.assertEqual(self.Task_testval, self.fbk.load(self.fakefil))
 
-    def test_save_not_Task(self, mopen):
-        mopen().__enter__.return_value = self.fakefil
+    @mock.patch('engine.atomic_open')
+    def test_save_not_Task(self, matomic, mopen):
+        matomic().__enter__.return_value = self.fakefil
         self.fbk.save("/tmp/blah", self.testval)
 
         self.fakefil.seek(0)
@@ -137,11 +289,218 @@ class TestJsonBackend(unittest.TestCase):
         json.dump(self.testval, self.fakefil)
         self.assertEqual(([], []), self.fbk.load("/tmp/blah"))
 
+    def test_read_skips_non_tasks(self, mopen):
+        mopen().__enter__.return_value = self.fakefil
+        self.fakefil.write('[[{"__engine.Task__": true, "content": "a", '
+                           '"date": [2016, 2, 29]}, {"content": "b"}, 5], []]')
+        self.fakefil.seek(0)
+        pending, finished = self.fbk.load("/tmp/blah")
+        self.assertEqual([engine.Task("a", 2016, 2, 29)], pending)
+        self.assertIs(engine.Task, type(pending[0]))
+        self.assertEqual([], finished)
+
+    def test_chunks(self, mopen):
+        tasks = [engine.Task(str(x), 2016, 1, 1 + x % 28) for x in range(7)]
+        self.fbk.dump_chunks([(0, tasks[:3]), (0, tasks[3:5]),
+                              (1, tasks[5:])], self.fakefil)
+        self.fakefil.seek(0)
+        self.assertEqual((tasks[:5], tasks[5:]), self.fbk.parse(self.fakefil))
+        self.fakefil.seek(0)
+        with mock.patch('json_backend.BLOCK', 7):
+            with mock.patch('engine.CHUNK', 2):
+                self.assertEqual([(0, tasks[:2]), (0, tasks[2:4]),
+                                  (0, tasks[4:5]), (1, tasks[5:])],
+                                 list(self.fbk.parse_chunks(self.fakefil)))
+
+    def test_chunks_empty_or_malformed(self, mopen):
+        self.fbk.dump_chunks([], self.fakefil)
+        self.assertEqual("[[], []]", self.fakefil.getvalue())
+        for text in ("", " [ [ ] , [5, {}] ] "):
+            self.assertEqual([], list(self.fbk.parse_chunks(
+                io.StringIO(text))))
+        for text in ("[[]", "[[1,]]", "[[1] [2]]", "[[], []] x", "{}"):
+            with self.assertRaises(ValueError):
+                list(self.fbk.parse_chunks(io.StringIO(text)))
+
+    def test_decoder_hook(self, mopen):
+        hook = self.fbk.TaskJSONDecoder.task_hook
+        self.assertEqual({"content": "b"}, hook({"content": "b"}))
+        task = hook({"__engine.Task__": True, "content": "a",
+                     "date": [1, 1, 1]})
+        self.assertEqual(("a", 1), (task.content, task.ordinal))
+
     def test_read_FileNotFoundError(self, mopen):
         mopen.side_effect = FileNotFoundError()
         self.assertEqual(([], []), self.fbk.load("/tmp/blah"))
 
 
+class TestJournalBackend(unittest.TestCase):
+    fbk = journal_backend.JournalFileBackend
+    Task_testval = ([engine.Task('123', 123, 1, 1),
+                     engine.Task('abc', 2000, 1, 1)],
+                    [engine.Task('1234', 132, 11, 11)])
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.target = os.path.join(self.tmpdir.name, "blah")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_save_load(self):
+        self.fbk.save(self.target, self.Task_testval)
+        self.assertEqual(self.Task_testval, self.fbk.load(self.target))
+
+    def test_read_FileNotFoundError(self):
+        self.assertEqual(([], []), self.fbk.load(self.target))
+
+    def test_append_replay(self):
+        self.fbk.save(self.target, copy.deepcopy(self.Task_testval))
+        self.assertTrue(self.fbk.append(self.target, [
+            ("new_task", "x", 1000, 1, 1),
+            ("finish_task", 0),
+            ("edit_finished_task", 1, "", 1, 1, 1),
+        ]))
+        self.assertTrue(self.fbk.append(self.target, [
+            ("unfinish_task", 1),
+            ("remove_pending_task", 0),
+        ]))
+        correct = ([engine.Task('x', 1000, 1, 1),
+                    engine.Task('abc', 2000, 1, 1)],
+                   [engine.Task('1234', 1, 1, 1)])
+        self.assertEqual(correct, self.fbk.load(self.target))
+
+    def test_append_no_journal(self):
+        self.assertFalse(self.fbk.append(self.target,
+                                         [("clear_finished_tasks",)]))
+
+    def test_stale_journal_ignored(self):
+        self.fbk.save(self.target, ([], []))
+        with open(self.target + journal_backend.JOURNAL_SUFFIX, 'rb') as fil:
+            stale = fil.read()
+        self.fbk.save(self.target, self.Task_testval)
+        with open(self.target + journal_backend.JOURNAL_SUFFIX, 'wb') as fil:
+            fil.write(stale)
+        self.fbk.append(self.target, [("clear_finished_tasks",)])
+        self.assertEqual(self.Task_testval, self.fbk.load(self.target))
+
+    def test_compact(self):
+        self.fbk.save(self.target, ([], []))
+        self.fbk.append(self.target, [("new_task", "x", 1000, 1, 1)])
+        self.fbk.compact(self.target)
+        self.assertEqual(
+            os.path.getsize(self.target + journal_backend.JOURNAL_SUFFIX),
+            len(pickle.dumps("0" * 32, pickle.HIGHEST_PROTOCOL)))
+        self.assertEqual(([engine.Task('x', 1000, 1, 1)], []),
+                         self.fbk.load(self.target))
+
+    @mock.patch('journal_backend.threading.Thread')
+    def test_append_starts_compaction(self, mthread):
+        self.fbk.save(self.target, ([], []))
+        with mock.patch('journal_backend.COMPACT_MIN_SIZE', 0):
+            self.fbk.append(self.target, [("clear_finished_tasks",)])
+        size = os.path.getsize(self.target + journal_backend.JOURNAL_SUFFIX)
+        target, (token, logsize) = mthread.call_args[1]['args']
+        self.assertEqual((self.target, size), (target, logsize))
+        mthread().start.assert_called_once_with()
+        self.assertFalse(self.fbk.compact(self.target, (token, size - 1)))
+        self.assertEqual(size, os.path.getsize(
+            self.target + journal_backend.JOURNAL_SUFFIX))
+        self.assertTrue(self.fbk.compact(self.target, (token, size)))
+        self.assertLess(os.path.getsize(
+            self.target + journal_backend.JOURNAL_SUFFIX), size)
+
+    def test_compact_locks(self):
+        self.fbk.save(self.target, ([], []))
+        self.fbk.append(self.target, [("new_task", "x", 1000, 1, 1)])
+        lock = storagelock.StorageLock(self.target).acquire(True)
+        thread = threading.Thread(target=self.fbk.compact,
+                                  args=(self.target,))
+        thread.start()
+        thread.join(0.05)
+        self.assertTrue(thread.is_alive())
+        self.fbk.append(self.target, [("new_task", "y", 1000, 1, 1)])
+        lock.release()
+        thread.join()
+        self.assertEqual(["x", "y"], [x.content for x in
+                                      self.fbk.load(self.target)[0]])
+
+
+class TestBinaryBackend(unittest.TestCase):
+    fbk = binary_backend.BinaryFileBackend
+    Task_testval = ([engine.Task('123', 123, 1, 1),
+                     engine.Task('Задача', 2000, 1, 1)],
+                    [engine.Task('', 132, 11, 11)])
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.target = os.path.join(self.tmpdir.name, "blah")
+        self.fbk.save(self.target, self.Task_testval)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_save_load(self):
+        self.assertEqual(self.Task_testval, self.fbk.load(self.target))
+        self.assertEqual([os.path.basename(self.target)],
+                         os.listdir(self.tmpdir.name))
+
+    def test_ids(self):
+        pending, finished = self.fbk.load(self.target)
+        self.assertEqual([x.id for x in self.Task_testval[0]],
+                         [x.id for x in pending])
+        self.assertEqual(self.Task_testval[1][0].id, finished[0].id)
+
+    def test_read_FileNotFoundError(self):
+        self.assertEqual(([], []), self.fbk.load(self.target + "x"))
+
+    def test_read_empty(self):
+        open(self.target, 'wb').close()
+        self.assertEqual(([], []), self.fbk.load(self.target))
+
+    def test_read_wrong(self):
+        with open(self.target, 'wb') as fil:
+            fil.write(b"x" * 100)
+        self.assertRaises(ValueError, self.fbk.load, self.target)
+
+    @mock.patch('binary_backend.MappedTaskList._decode',
+                autospec=True, side_effect=lambda self, num: num)
+    def test_lazy_decoding(self, mdecode):
+        pending, finished = self.fbk.load(self.target)
+        self.assertEqual(2, len(pending))
+        self.assertFalse(mdecode.called)
+        self.assertEqual([1], pending[1:])
+        mdecode.assert_called_once_with(pending, 1)
+        pending[1]
+        mdecode.assert_called_once_with(pending, 1)
+
+    def test_mutations(self):
+        pending, finished = self.fbk.load(self.target)
+        correct = list(self.Task_testval[0])
+        self.assertEqual(correct[0], pending[0])
+        bisect.insort(pending, engine.Task('x', 1000, 1, 1))
+        bisect.insort(correct, engine.Task('x', 1000, 1, 1))
+        self.assertEqual(correct, pending)
+        self.assertEqual(correct.pop(-1), pending.pop(-1))
+        self.assertEqual(correct, pending)
+        pending[0] = correct[0] = engine.Task('y', 1, 1, 1)
+        self.assertEqual(correct, list(pending))
+        self.assertRaises(IndexError, pending.__getitem__, 2)
+
+    def test_copy(self):
+        pending, finished = self.fbk.load(self.target)
+        first = pending[0]
+        copy = pending.copy()
+        self.assertIsNone(copy._items)
+        self.assertIs(first, copy[0])
+        pending.pop(0)
+        self.assertEqual(self.Task_testval[0], copy)
+        changed = pending.copy()
+        changed.append(first)
+        self.assertEqual(self.Task_testval[0][1:], pending)
+        self.assertEqual(self.Task_testval[0][1:] + [first], changed)
+
+
 class TestTerminalInterface(unittest.TestCase):
     testopts = [["A", "abc"]]
     testtitle = "Blah"
@@ -202,7 +561,9 @@ class TestTerminalInterface(unittest.TestCase):
 
     @mock.patch('sys.stdout', new_callable=io.StringIO)
     def test_print_tasks_finished_false(self, mock_stdout):
-        TerminalInterface.print_tasks(self.testtasks, False)
+        TerminalInterface.print_tasks(self.testtasks, False,
+                                      [taskcolumns.OVERDUE, taskcolumns.TODAY,
+                                       taskcolumns.UPCOMING])
         correct_result = ("================================================================================\n" +
                           "[0]\t " + self.testtasks[0][1].strftime("%d %b %Y, %A:") + ' \x1b[1;31m<< !!OVERDUE!!\x1b[0m\n' +
                           "  " + self.testtasks[0][0] + '\n\n'
@@ -212,6 +573,28 @@ class TestTerminalInterface(unittest.TestCase):
                           "  " + self.testtasks[2][0] + '\n')
         self.assertEqual(mock_stdout.getvalue(), correct_result)
 
+    @mock.patch('sys.stdout', new_callable=io.StringIO)
+    def test_print_found_tasks(self, mock_stdout):
+        TerminalInterface.print_found_tasks([])
+        self.assertIn(">> No tasks found <<", mock_stdout.getvalue())
+        mock_stdout.seek(0)
+        mock_stdout.truncate()
+        TerminalInterface.print_found_tasks(
+            [(7, "abc", self.testdate, False),
+             (8, "XyZ", self.testdate, True)])
+        date = self.testdate.strftime("%d %b %Y, %A:")
+        self.assertEqual(mock_stdout.getvalue(),
+                         "=" * 80 + "\n"
+                         "[@7]\t " + date + "\n"
+                         "  abc\n\n"
+                         "[@8]\t " + date + " \x1b[1m<< Finished\x1b[0m\n"
+                         "  XyZ\n")
+
+    @mock.patch('interface.input')
+    def test_search_dialog(self, mock_input):
+        mock_input.return_value = "milk"
+        self.assertEqual("milk", TerminalInterface.search_dialog())
+
     @mock.patch('interface.TerminalInterface.print_tasks')
     def test_print_finished_tasks(self, mock_print_tasks):
         TerminalInterface.print_finished_tasks(self.testtasks)
@@ -234,8 +617,9 @@ class TestTerminalInterface(unittest.TestCase):
 
     @mock.patch('interface.TerminalInterface.print_tasks')
     def test_print_pending_tasks(self, mock_print_tasks):
-        TerminalInterface.print_pending_tasks(self.testtasks)
-        mock_print_tasks.assert_called_once_with(self.testtasks, False)
+        TerminalInterface.print_pending_tasks(self.testtasks, [1, 2, 3])
+        mock_print_tasks.assert_called_once_with(self.testtasks, False,
+                                                 [1, 2, 3])
 
     @mock.patch('interface.input')
     @mock.patch('interface.TerminalInterface.menu')
@@ -305,6 +689,11 @@ class TestTerminalInterface(unittest.TestCase):
         mock_input.return_value = "N"
         self.assertEqual(False, TerminalInterface.save_dialog())
 
+    @mock.patch('sys.stdout', new_callable=io.StringIO)
+    def test_tasks_changed(self, mock_stdout):
+        TerminalInterface.tasks_changed()
+        self.assertIn("changed by another program", mock_stdout.getvalue())
+
     @mock.patch('interface.input')
     def test_save_dialog_others(self, mock_input):
         cases = string.printable.replace("n", "").replace("N", "")
@@ -340,6 +729,193 @@ class TestTerminalInterface(unittest.TestCase):
             self.assertEqual(quack, TerminalInterface.config_menu(quack, stls))
 
 
+class TestAutosaver(unittest.TestCase):
+    def setUp(self):
+        self.engine = mock.MagicMock()
+        self.engine.lock = threading.RLock()
+        self.saved = threading.Semaphore(0)
+        self.engine.flush.side_effect = lambda: self.saved.release()
+
+    def make(self, mutations=0, interval=0):
+        saver = autosave.Autosaver(self.engine, mutations, interval)
+        self.addCleanup(saver.stop)
+        return saver
+
+    def test_mutations(self):
+        saver = self.make(mutations=3)
+        with self.engine.lock:
+            for x in range(5):
+                saver.notify()
+            self.engine.save_tasks.assert_not_called()
+        self.assertTrue(self.saved.acquire(timeout=5))
+        self.engine.save_tasks.assert_called_once_with()
+        self.assertEqual(0, saver.pending)
+
+    def test_below_mutations(self):
+        saver = self.make(mutations=3)
+        with self.engine.lock:
+            saver.notify()
+        self.assertFalse(self.saved.acquire(timeout=0.1))
+        self.engine.save_tasks.assert_not_called()
+
+    def test_interval(self):
+        saver = self.make(interval=0.01)
+        self.assertFalse(self.saved.acquire(timeout=0.1))
+        with self.engine.lock:
+            saver.notify()
+        self.assertTrue(self.saved.acquire(timeout=5))
+        self.engine.save_tasks.assert_called_once_with()
+
+    def test_failure(self):
+        self.engine.flush.side_effect = OSError("disk full")
+        saver = autosave.Autosaver.__new__(autosave.Autosaver)
+        saver.engine = self.engine
+        saver.pending = 4
+        with mock.patch('sys.stderr', new_callable=io.StringIO) as err:
+            saver.checkpoint()
+        self.assertIn("disk full", err.getvalue())
+        self.assertEqual(4, saver.pending)
+
+    def test_stop(self):
+        saver = autosave.Autosaver(self.engine)
+        saver.stop()
+        self.assertFalse(saver.thread.is_alive())
+        self.engine.save_tasks.assert_not_called()
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.engine = mock.MagicMock()
+        self.engine.savefile = os.path.join(tmpdir.name, "ts")
+        self.lockfile = self.engine.savefile + storagelock.LOCK_SUFFIX
+        self.reloaded = threading.Semaphore(0)
+        self.engine.reload.side_effect = lambda: self.reloaded.release()
+
+    def make(self, interval=3600):
+        watch = watcher.Watcher(self.engine, interval)
+        self.addCleanup(watch.stop)
+        return watch
+
+    def test_file_stat(self):
+        watch = self.make()
+        self.assertIsNone(watch.file_stat())
+        with open(self.lockfile, 'w') as fil:
+            fil.write("1")
+        stat = os.stat(self.lockfile)
+        self.assertEqual((stat.st_mtime_ns, 1, stat.st_ino), watch.file_stat())
+
+    def test_poll(self):
+        watch = self.make()
+        with mock.patch.object(watch, 'file_stat') as mstat:
+            mstat.return_value = None
+            watch.poll()
+            mstat.assert_called_once_with()
+        self.engine.reload.assert_not_called()
+        with storagelock.StorageLock(self.engine.savefile).acquire(True) as l:
+            l.bump()
+        watch.poll()
+        watch.poll()
+        self.engine.reload.assert_called_once_with()
+
+    def test_interval(self):
+        self.make(0.01)
+        with storagelock.StorageLock(self.engine.savefile).acquire(True) as l:
+            l.bump()
+        self.assertTrue(self.reloaded.acquire(timeout=5))
+
+    def test_failure(self):
+        self.engine.reload.side_effect = OSError("bad file")
+        watch = self.make()
+        with open(self.lockfile, 'w') as fil:
+            fil.write("1")
+        with mock.patch('sys.stderr', new_callable=io.StringIO) as err:
+            watch.poll()
+        self.assertIn("bad file", err.getvalue())
+        self.assertEqual(watch.file_stat(), watch.stat)
+
+    def test_stop(self):
+        watch = watcher.Watcher(self.engine, 0.01)
+        watch.stop()
+        self.assertFalse(watch.thread.is_alive())
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        for name, value in (('registry.PLUGINS', self.dir),
+                            ('registry._plugins', None)):
+            patcher = mock.patch(name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def plugin(self, name, body):
+        with open(os.path.join(self.dir, name), 'w') as fil:
+            fil.write(body)
+
+    def test_builtin(self):
+        with mock.patch('registry._discover') as mdiscover:
+            savemethod = registry.find('json')
+            self.assertEqual(('.json', json_backend.JsonFileBackend),
+                             (savemethod.extension, savemethod.load()))
+            self.assertFalse(mdiscover.called)
+        self.assertRaises(KeyError, registry.find, 'xml')
+        self.assertEqual(['pickle', 'json', 'yaml', 'journal', 'binary'],
+                         [x.name for x in registry.savemethods()])
+
+    def test_plugin_dir(self):
+        self.plugin('xml_backend.py', "import json_backend\n"
+                    "BACKEND = json_backend.JsonFileBackend\n")
+        self.plugin('json_backend.py', "raise ImportError\n")
+        self.plugin('notes.txt', "")
+        self.assertEqual(['pickle', 'json', 'yaml', 'journal', 'binary',
+                          'xml'], [x.name for x in registry.savemethods()])
+        savemethod = registry.find('xml')
+        self.assertEqual('.xml', savemethod.extension)
+        self.assertNotIn('arch_lab_plugin_xml', sys.modules)
+        self.addCleanup(sys.modules.pop, 'arch_lab_plugin_xml', None)
+        self.assertIs(json_backend.JsonFileBackend, savemethod.load())
+        self.assertIs(sys.modules['arch_lab_plugin_xml'].BACKEND,
+                      savemethod.load())
+
+    def test_plugin_broken(self):
+        self.plugin('bad_backend.py', "raise ImportError('nope')\n")
+        self.assertRaises(ImportError, registry.find('bad').load)
+        self.assertNotIn('arch_lab_plugin_bad', sys.modules)
+
+    @mock.patch('importlib.metadata.entry_points')
+    def test_entry_points(self, mentry_points):
+        mentry_points.return_value = [importlib.metadata.EntryPoint(
+            'csv', 'pickle_backend:PickleFileBackend', registry.ENTRY_POINTS)]
+        savemethod = registry.find('csv')
+        mentry_points.assert_called_once_with(group=registry.ENTRY_POINTS)
+        self.assertIs(pickle_backend.PickleFileBackend, savemethod.load())
+        self.assertEqual('.csv', savemethod.extension)
+        registry.savemethods()
+        self.assertEqual(1, mentry_points.call_count)
+
+    def test_capabilities(self):
+        self.assertEqual({'streaming', 'partial load'}, registry.capabilities(
+            pickle_backend.PickleFileBackend))
+        self.assertEqual({'append'}, registry.capabilities(
+            journal_backend.JournalFileBackend))
+        self.assertEqual({'partial load'}, registry.capabilities(
+            binary_backend.BinaryFileBackend))
+
+    def test_lazy_import(self):
+        code = ("import sys, lab, engine\n"
+                "engine.savemethod_backend('pickle')\n"
+                "print(sorted(x for x in sys.modules\n"
+                "             if x.endswith('_backend') or x == 'yaml'))\n")
+        out = subprocess.run([sys.executable, '-c', code], check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)),
+                             stdout=subprocess.PIPE, universal_newlines=True)
+        self.assertEqual("['pickle_backend']\n", out.stdout)
+
+
 class TestFileBackend(unittest.TestCase):
     def test_init_TypeError(self):
         self.assertRaises(TypeError, engine.FileBackend)
@@ -350,6 +926,938 @@ class TestFileBackend(unittest.TestCase):
     def test_load_NotImplementedError(self):
         self.assertRaises(NotImplementedError, engine.FileBackend.load, 1)
 
+    def test_ids_stored(self):
+        item = ([engine.Task('a', 2016, 1, 2), engine.Task('b', 2016, 1, 3)],
+                [engine.Task('c', 2016, 1, 1)])
+        ids = [[x.id for x in tasks] for tasks in item]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for savemethod in registry.BUILTIN:
+                backend = savemethod.load()
+                target = os.path.join(tmpdir, savemethod.name)
+                backend.save(target, item)
+                self.assertEqual(ids, [[x.id for x in tasks] for tasks in
+                                       backend.load(target)], savemethod.name)
+                if backend.streams:
+                    fil = io.StringIO() if backend.text else io.BytesIO()
+                    backend.dump_chunks(engine.chunked(item), fil)
+                    fil.seek(0)
+                    self.assertEqual(ids, [[x.id for x in tasks] for _, tasks
+                                           in backend.parse_chunks(fil)],
+                                     savemethod.name)
+
+
+class TestGcPaused(unittest.TestCase):
+    def test_paused(self):
+        self.assertTrue(engine.gc.isenabled())
+        with self.assertRaises(TestSuccess):
+            with engine.gc_paused():
+                self.assertFalse(engine.gc.isenabled())
+                with engine.gc_paused():
+                    pass
+                self.assertFalse(engine.gc.isenabled())
+                raise TestSuccess
+        self.assertTrue(engine.gc.isenabled())
+
+
+class TestAtomicOpen(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.target = os.path.join(tmpdir.name, "quack")
+        with open(self.target, 'w') as fil:
+            fil.write("old")
+
+    @mock.patch('engine.os.fsync')
+    def test_replace(self, mfsync):
+        with engine.atomic_open(self.target, 'w') as fil:
+            fil.write("new")
+            with open(self.target) as old:
+                self.assertEqual("old", old.read())
+        with open(self.target) as fil:
+            self.assertEqual("new", fil.read())
+        self.assertEqual(2, mfsync.call_count)
+        self.assertEqual([os.path.basename(self.target)],
+                         os.listdir(os.path.dirname(self.target)))
+
+    def test_error(self):
+        with self.assertRaises(TestSuccess):
+            with engine.atomic_open(self.target, 'w') as fil:
+                fil.write("new")
+                raise TestSuccess
+        with open(self.target) as fil:
+            self.assertEqual("old", fil.read())
+        self.assertEqual([os.path.basename(self.target)],
+                         os.listdir(os.path.dirname(self.target)))
+
+
+class TestCompression(unittest.TestCase):
+    testval = ([engine.Task('123', 123, 1, 1)],
+               [engine.Task('ünïcode', 2016, 11, 11)])
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.target = os.path.join(tmpdir.name, "quack")
+
+    def test_roundtrip(self):
+        for backend in (pickle_backend.PickleFileBackend,
+                        json_backend.JsonFileBackend):
+            for codec in (None,) + tuple(compression.CODECS):
+                fbk = compression.wrap(backend, codec)
+                fbk.save(self.target, self.testval)
+                with open(self.target, 'rb') as fil:
+                    self.assertEqual(codec, compression.detect(fil))
+                self.assertEqual(self.testval, fbk.load(self.target))
+
+    def test_load_any_codec(self):
+        compression.wrap(pickle_backend.PickleFileBackend,
+                         'lzma').save(self.target, self.testval)
+        for codec in (None, 'zlib', 'bz2'):
+            fbk = compression.wrap(pickle_backend.PickleFileBackend, codec)
+            self.assertEqual(self.testval, fbk.load(self.target))
+
+    def test_load_plain(self):
+        json_backend.JsonFileBackend.save(self.target, self.testval)
+        fbk = compression.wrap(json_backend.JsonFileBackend, 'bz2')
+        self.assertEqual(self.testval, fbk.load(self.target))
+
+    def test_load_missing_or_truncated(self):
+        fbk = compression.wrap(pickle_backend.PickleFileBackend, 'zlib')
+        self.assertEqual(([], []), fbk.load(self.target))
+        fbk.save(self.target, self.testval)
+        with open(self.target, 'r+b') as fil:
+            fil.truncate(12)
+        self.assertEqual(([], []), fbk.load(self.target))
+
+    def test_save_error(self):
+        fbk = compression.wrap(pickle_backend.PickleFileBackend, 'lzma')
+        fbk.save(self.target, self.testval)
+        with self.assertRaises(TypeError):
+            fbk.save(self.target, threading.Lock())
+        self.assertEqual(self.testval, fbk.load(self.target))
+
+    def test_wrap_not_streaming(self):
+        for backend in (journal_backend.JournalFileBackend,
+                        binary_backend.BinaryFileBackend):
+            self.assertIs(backend, compression.wrap(backend, 'zlib'))
+        fbk = compression.wrap(pickle_backend.PickleFileBackend, 'zlib')
+        self.assertIs(fbk, compression.wrap(fbk, 'bz2'))
+        self.assertIs(pickle_backend.PickleFileBackend, fbk.wrapped)
+        self.assertEqual('zlib', fbk.codec)
+
+    @mock.patch('engine.sys.exit')
+    def test_engine_compressed(self, mexit):
+        mexit.side_effect = TestSuccess
+        t = mock.MagicMock()
+        t.config = configparser.ConfigParser()
+        fbk = engine.EngineConfig.compressed(
+            t, pickle_backend.PickleFileBackend)
+        self.assertIsNone(fbk.codec)
+        t.config['DEFAULT']['compression'] = 'lzma'
+        fbk = engine.EngineConfig.compressed(
+            t, pickle_backend.PickleFileBackend)
+        self.assertEqual('lzma', fbk.codec)
+        t.config['DEFAULT']['compression'] = 'rar'
+        self.assertRaises(TestSuccess, engine.EngineConfig.compressed,
+                          t, pickle_backend.PickleFileBackend)
+        mexit.assert_called_once_with(1)
+
+
+class TestStorageLock(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.savefile = os.path.join(tmpdir.name, "ts.pkl")
+
+    def test_version(self):
+        with storagelock.StorageLock(self.savefile) as lock:
+            self.assertEqual(0, lock.version())
+        lock = storagelock.StorageLock(self.savefile).acquire(True)
+        self.assertEqual(1, lock.bump())
+        self.assertEqual(2, lock.bump())
+        lock.release()
+        lock.release()
+        self.assertEqual(None, lock.fd)
+        with storagelock.StorageLock(self.savefile) as lock:
+            self.assertEqual(2, lock.version())
+        with open(self.savefile + storagelock.LOCK_SUFFIX, 'w') as fil:
+            fil.write("garbage")
+        with storagelock.StorageLock(self.savefile) as lock:
+            self.assertEqual(-1, lock.version())
+
+    @unittest.skipIf(storagelock.fcntl is None, "no fcntl")
+    def test_lock(self):
+        def try_lock(kind):
+            with open(self.savefile + storagelock.LOCK_SUFFIX) as fil:
+                try:
+                    fcntl.flock(fil, kind | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+                return True
+
+        fcntl = storagelock.fcntl
+        with storagelock.StorageLock(self.savefile):
+            self.assertTrue(try_lock(fcntl.LOCK_SH))
+            self.assertFalse(try_lock(fcntl.LOCK_EX))
+        lock = storagelock.StorageLock(self.savefile).acquire(True)
+        self.assertFalse(try_lock(fcntl.LOCK_SH))
+        lock.release()
+        self.assertTrue(try_lock(fcntl.LOCK_EX))
+
+
+class TestRWLock(unittest.TestCase):
+    def setUp(self):
+        self.lock = rwlock.RWLock()
+
+    def test_readers_share(self):
+        entered = threading.Barrier(2, timeout=5)
+
+        def read():
+            with self.lock.reading():
+                entered.wait()
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        with self.lock.reading():
+            entered.wait()
+        thread.join(5)
+
+    def test_writer_excludes(self):
+        order = []
+
+        def read():
+            with self.lock.reading():
+                order.append("read")
+
+        with self.lock:
+            thread = threading.Thread(target=read)
+            thread.start()
+            thread.join(0.05)
+            self.assertTrue(thread.is_alive())
+            order.append("write")
+        thread.join(5)
+        self.assertEqual(["write", "read"], order)
+
+    def test_writer_waits_for_readers(self):
+        order = []
+        self.lock.acquire_read()
+        thread = threading.Thread(target=lambda: (self.lock.acquire(),
+                                                  order.append("write"),
+                                                  self.lock.release()))
+        thread.start()
+        while not self.lock._waiting:
+            thread.join(0.001)
+        order.append("read")
+        self.lock.release_read()
+        thread.join(5)
+        self.assertEqual(["read", "write"], order)
+
+    def test_reentrant(self):
+        with self.lock:
+            with self.lock:
+                with self.lock.reading():
+                    self.assertEqual(2, self.lock._depth)
+            self.assertEqual(1, self.lock._depth)
+        self.assertIsNone(self.lock._writer)
+        self.assertEqual({}, self.lock._readers)
+        with self.lock.reading():
+            with self.lock.reading():
+                pass
+            self.assertEqual(1, len(self.lock._readers))
+        self.assertEqual({}, self.lock._readers)
+
+    def test_upgrade(self):
+        with self.lock.reading():
+            with self.assertRaises(RuntimeError):
+                self.lock.acquire()
+        self.assertEqual(0, self.lock._waiting)
+
+    def test_release_unacquired(self):
+        self.assertRaises(RuntimeError, self.lock.release)
+        self.assertRaises(RuntimeError, self.lock.release_read)
+
+
+class TestMergeTasks(unittest.TestCase):
+    def tasks(self, *specs):
+        return [engine.Task(content, 2016, 1, day) for content, day in specs]
+
+    def test_merge(self):
+        base = self.tasks(('a', 1), ('b', 2), ('c', 2), ('d', 3))
+        ours = self.tasks(('a', 1), ('b', 2), ('x', 2), ('d', 3), ('y', 4))
+        theirs = self.tasks(('z', 1), ('a', 1), ('c', 2), ('b', 2),
+                            ('d', 3))
+        self.assertEqual(self.tasks(('z', 1), ('a', 1), ('b', 2), ('x', 2),
+                                    ('d', 3), ('y', 4)),
+                         engine.merge_tasks(base, ours, theirs))
+
+    def test_merge_removed(self):
+        base = self.tasks(('a', 1), ('a', 1), ('b', 2))
+        ours = self.tasks(('a', 1), ('b', 2))
+        theirs = self.tasks(('a', 1), ('a', 1))
+        self.assertEqual(self.tasks(('a', 1)),
+                         engine.merge_tasks(base, ours, theirs))
+        self.assertEqual(self.tasks(('a', 1)),
+                         engine.merge_tasks(base, ours, theirs[1:]))
+        self.assertEqual([], engine.merge_tasks(base, [], theirs))
+        self.assertEqual(ours, engine.merge_tasks(base, ours, base))
+        self.assertEqual(theirs, engine.merge_tasks(base, base, theirs))
+
+    def test_merge_same_change(self):
+        self.assertEqual(self.tasks(('b', 2)),
+                         engine.merge_tasks([], self.tasks(('b', 2)),
+                                            self.tasks(('b', 2))))
+        self.assertEqual(self.tasks(('b', 2), ('b', 2), ('b', 2)),
+                         engine.merge_tasks([], self.tasks(*[('b', 2)] * 3),
+                                            self.tasks(*[('b', 2)] * 2)))
+
+    def test_merge_same_task(self):
+        a, b = self.tasks(('a', 1), ('b', 1))
+        self.assertEqual([a, b], engine.merge_tasks([a, b], [a, a, b],
+                                                    [a, b]))
+        self.assertEqual([a], engine.merge_tasks([a, b], [a, a], [a, b]))
+        self.assertEqual([b, a], engine.merge_tasks([], [a], [b, a]))
+
+
+class TestSharedSavefile(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        self.config = os.path.join(self.dir, "config.ini")
+        for name, value in (('engine.SAVEFILE', os.path.join(self.dir, "ts")),
+                            ('engine.CONFIG', self.config)):
+            patcher = mock.patch(name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def engines(self, savemethod, kind=engine.ListEngine):
+        """Make two engines sharing a savefile with some tasks in it."""
+        for name in os.listdir(self.dir):
+            os.unlink(os.path.join(self.dir, name))
+        with open(self.config, 'w') as fil:
+            fil.write("[DEFAULT]\nsavemethod = {}\n".format(savemethod))
+        first = kind()
+        first.new_task("a", 2016, 1, 1)
+        first.new_task("b", 2016, 1, 2)
+        first.new_task("c", 2016, 1, 3)
+        first.finish_task(2)
+        first.save_tasks()
+        first.flush()
+        return first, kind()
+
+    def test_merge_on_save(self):
+        for savemethod in ('pickle', 'journal', 'json'):
+            for kind in (engine.ListEngine, engine.SortedListEngine):
+                ours, theirs = self.engines(savemethod, kind)
+                theirs.new_task("d", 2016, 1, 2)
+                theirs.remove_pending_task(0)
+                theirs.save_tasks()
+                theirs.flush()
+
+                ours.new_task("e", 2016, 1, 4)
+                ours.finish_task(1)
+                ours.edit_finished_task(1, "C", None, None, None)
+                ours.save_tasks()
+                ours.flush()
+                pending = [("d", datetime.date(2016, 1, 2)),
+                           ("e", datetime.date(2016, 1, 4))]
+                finished = [("b", datetime.date(2016, 1, 2)),
+                            ("C", datetime.date(2016, 1, 3))]
+                self.assertEqual(pending, ours.view_pending_tasks())
+                self.assertEqual(finished, ours.view_finished_tasks())
+                self.assertIsInstance(ours.pending_task_list,
+                                      type(theirs.pending_task_list))
+                self.assertFalse(ours.changes_detected())
+
+                again = kind()
+                self.assertEqual(pending, again.view_pending_tasks())
+                self.assertEqual(finished, again.view_finished_tasks())
+                self.assertEqual(3, again.saved_version)
+
+    def test_set_savemethod(self):
+        ours, theirs = self.engines('pickle')
+        theirs.new_task("from B", 2016, 1, 1)
+        theirs.save_tasks()
+        theirs.flush()
+        ours.set_savemethod('pickle')
+        ours.new_task("from A", 2016, 1, 1)
+        ours.save_tasks()
+        ours.flush()
+        self.assertEqual(["a", "from B", "from A", "b"],
+                         [x[0] for x in
+                          engine.ListEngine().view_pending_tasks()])
+
+        ours.set_savemethod('json')
+        theirs = engine.ListEngine()
+        theirs.new_task("from C", 2016, 1, 1)
+        theirs.save_tasks()
+        theirs.flush()
+        ours.save_tasks()
+        ours.flush()
+        self.assertEqual(["from C", "a", "from B", "from A", "b"],
+                         [x[0] for x in
+                          engine.ListEngine().view_pending_tasks()])
+        self.assertEqual(["c"], [x[0] for x in
+                                 engine.ListEngine().view_finished_tasks()])
+
+    def test_finish_twice(self):
+        for savemethod in ('pickle', 'journal', 'json'):
+            self.engines(savemethod)
+            ours, theirs = engine.ListEngine(), engine.ListEngine()
+            theirs.finish_task(0)
+            theirs.save_tasks()
+            theirs.flush()
+            ours.finish_task(0)
+            ours.save_tasks()
+            ours.flush()
+            for eng in (ours, engine.ListEngine()):
+                self.assertEqual(["b"],
+                                 [x[0] for x in eng.view_pending_tasks()])
+                self.assertEqual(["a", "c"],
+                                 [x[0] for x in eng.view_finished_tasks()])
+
+    def test_no_conflict(self):
+        ours, theirs = self.engines('pickle')
+        ours.new_task("d", 2016, 1, 2)
+        with mock.patch.object(ours, '_merge_saved') as mmerge:
+            ours.save_tasks()
+            ours.flush()
+            ours.new_task("e", 2016, 1, 2)
+            ours.save_tasks()
+            ours.flush()
+        self.assertFalse(mmerge.called)
+        self.assertIsNone(ours.base)
+
+    def test_concurrent_saves(self):
+        def work(eng, name):
+            for num in range(20):
+                eng.new_task(name + str(num), 2016, 1, 1 + num % 28)
+                eng.save_tasks()
+            eng.flush()
+
+        engines = self.engines('pickle')
+        threads = [threading.Thread(target=work, args=(eng, name))
+                   for eng, name in zip(engines, "xy")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(42, len(engine.ListEngine().view_pending_tasks()))
+
+    def test_reload(self):
+        for savemethod in ('pickle', 'journal', 'json'):
+            for kind in (engine.ListEngine, engine.SortedListEngine):
+                ours, theirs = self.engines(savemethod, kind)
+                ours.view_finished_tasks()
+                listener = mock.MagicMock()
+                ours.watch(listener)
+                self.assertFalse(ours.reload())
+                listener.assert_not_called()
+
+                theirs.new_task("d", 2016, 1, 2)
+                theirs.remove_pending_task(0)
+                theirs.unfinish_task(0)
+                theirs.save_tasks()
+                theirs.flush()
+                tasks = ours.pending_task_list
+                ours.new_task("e", 2016, 1, 4)
+                self.assertTrue(ours.reload())
+                listener.assert_called_once_with()
+                self.assertIs(tasks, ours.pending_task_list)
+                self.assertEqual([("b", datetime.date(2016, 1, 2)),
+                                  ("d", datetime.date(2016, 1, 2)),
+                                  ("c", datetime.date(2016, 1, 3)),
+                                  ("e", datetime.date(2016, 1, 4))],
+                                 ours.view_pending_tasks())
+                self.assertEqual([], ours.view_finished_tasks())
+                self.assertTrue(ours.changes_detected())
+                self.assertFalse(ours.reload())
+
+                ours.save_tasks()
+                ours.flush()
+                self.assertEqual(ours.view_pending_tasks(),
+                                 kind().view_pending_tasks())
+
+    def test_reload_unchanged(self):
+        theirs, ours = self.engines('json', engine.SortedListEngine)
+        theirs.finish_task(0)
+        theirs.save_tasks()
+        theirs.flush()
+        self.assertTrue(ours.reload())
+        self.assertIsNone(ours._finished)
+        self.assertEqual([("b", datetime.date(2016, 1, 2))],
+                         ours.view_pending_tasks())
+        self.assertEqual(["a", "c"],
+                         [x[0] for x in ours.view_finished_tasks()])
+        self.assertFalse(ours.changes_detected())
+
+    def test_reload_resets_journal(self):
+        for kind in (engine.ListEngine, engine.SortedListEngine):
+            ours, theirs = self.engines('journal', kind)
+            theirs.new_task("a2", 2016, 1, 1)
+            theirs.remove_pending_task(0)
+            theirs.new_task("a", 2016, 1, 1)
+            theirs.save_tasks()
+            theirs.flush()
+            self.assertTrue(ours.reload())
+            self.assertIsNone(ours.journal)
+            ours.remove_pending_task(0)
+            ours.save_tasks()
+            ours.flush()
+            self.assertEqual(ours.view_pending_tasks(),
+                             kind().view_pending_tasks())
+
+    def test_reload_waits_for_save(self):
+        ours, theirs = self.engines('pickle')
+        theirs.new_task("d", 2016, 1, 2)
+        theirs.save_tasks()
+        theirs.flush()
+        ours.new_task("e", 2016, 1, 4)
+        ours.saves.append(None)
+        self.assertFalse(ours.reload())
+        ours.saves.clear()
+        self.assertEqual(["a", "b", "e"],
+                         [x[0] for x in ours.view_pending_tasks()])
+
+    def test_watch_interval(self):
+        with open(self.config, 'w') as fil:
+            fil.write("[DEFAULT]\nwatch_interval = 0.01\n")
+        ours = engine.ListEngine()
+        self.addCleanup(ours.watcher.stop)
+        changed = threading.Event()
+        ours.watch(changed.set)
+        theirs = engine.ListEngine()
+        theirs.new_task("a", 2016, 1, 1)
+        theirs.save_tasks()
+        theirs.flush()
+        self.assertTrue(changed.wait(5))
+        self.assertEqual([("a", datetime.date(2016, 1, 1))],
+                         ours.view_pending_tasks())
+
+    def test_close_stops_threads(self):
+        with open(self.config, 'w') as fil:
+            fil.write("[DEFAULT]\nautosave_interval = 0.001\n"
+                      "watch_interval = 0.001\n")
+        ours = engine.ListEngine()
+        threads = (ours.autosaver.thread, ours.watcher.thread)
+        ours.new_task("a", 2016, 1, 1)
+        ours.close()
+        for thread in threads:
+            self.assertFalse(thread.is_alive())
+        self.assertIsNone(ours.autosaver)
+        self.assertIsNone(ours.watcher)
+        ours.new_task("b", 2016, 1, 1)
+        threading.Event().wait(0.05)
+        self.assertTrue(ours.changes_detected())
+
+    def test_stop_autosave(self):
+        with open(self.config, 'w') as fil:
+            fil.write("[DEFAULT]\nautosave_mutations = 1\n")
+        ours = engine.ListEngine()
+        ours.stop_autosave()
+        self.assertIsNone(ours.autosaver)
+        ours.new_task("a", 2016, 1, 1)
+        ours.close()
+        self.assertTrue(ours.changes_detected())
+        self.assertEqual([], engine.ListEngine().view_pending_tasks())
+
+    def assertIndexed(self, eng):
+        """Check that ID index of eng matches it's task lists."""
+        for finished, tasks in ((False, eng.pending_task_list),
+                                (True, eng.finished_task_list)):
+            self.assertEqual({x.id: x for x in tasks},
+                             eng._id_index(finished))
+
+    def test_task_ids(self):
+        for savemethod in ('pickle', 'journal'):
+            for kind in (engine.ListEngine, engine.SortedListEngine,
+                         engine.ThreadSafeEngine):
+                ours, theirs = self.engines(savemethod, kind)
+                a, b = [x[0] for x in ours.view_pending_tasks_with_ids()]
+                c, = [x[0] for x in ours.view_finished_tasks_with_ids()]
+                self.assertEqual(("c", datetime.date(2016, 1, 3), True),
+                                 theirs.view_task(c))
+                self.assertIndexed(ours)
+                index = ours.ids[1:]
+
+                d = ours.new_task("d", 2016, 1, 1)
+                ours.edit_pending_task_by_id(a, "A", 2016, 1, 5)
+                ours.edit_pending_task_by_id(b, "B", None, None, None)
+                ours.finish_task_by_id(d)
+                ours.unfinish_task_by_id(c)
+                ours.edit_finished_task_by_id(d, "", 2016, 1, 3)
+                ours.remove_finished_task_by_id(d)
+                ours.remove_pending_task_by_id(b)
+                self.assertIs(index[0], ours.ids[1])
+                self.assertIs(index[1], ours.ids[2])
+                self.assertIndexed(ours)
+                self.assertEqual([(c, "c", datetime.date(2016, 1, 3)),
+                                  (a, "A", datetime.date(2016, 1, 5))],
+                                 ours.view_pending_tasks_with_ids())
+                self.assertEqual([], ours.view_finished_tasks_with_ids())
+                for meth in (ours.view_task, ours.remove_pending_task_by_id,
+                             ours.finish_task_by_id,
+                             ours.remove_finished_task_by_id):
+                    self.assertRaises(KeyError, meth, b)
+                self.assertRaises(KeyError, ours.unfinish_task_by_id, a)
+
+                ours.save_tasks()
+                ours.flush()
+                reloaded = kind()
+                self.assertEqual(ours.view_pending_tasks_with_ids(),
+                                 reloaded.view_pending_tasks_with_ids())
+
+    def test_lazy_base(self):
+        ours, _ = self.engines('binary')
+        ours.import_tasks([(str(x), datetime.date(2016, 2, 1), False)
+                           for x in range(1000)])
+        ours.save_tasks()
+        ours.flush()
+        decode = binary_backend.MappedTaskList._decode
+        with mock.patch('binary_backend.MappedTaskList._decode',
+                        autospec=True, side_effect=decode) as mdecode:
+            ours = engine.ListEngine()
+            ours.new_task("d", 2016, 1, 2)
+            self.assertLess(mdecode.call_count, 50)
+            self.assertTrue(ours.changes_detected())
+            self.assertLess(mdecode.call_count, 50)
+        ours.save_tasks()
+        ours.flush()
+        self.assertEqual(1003, len(engine.ListEngine().view_pending_tasks()))
+
+    def test_lazy_snapshot(self):
+        ours, _ = self.engines('binary')
+        ours.import_tasks([(str(x), datetime.date(2016, 2, 1), False)
+                           for x in range(1000)])
+        ours.save_tasks()
+        ours.flush()
+        decode = binary_backend.MappedTaskList._decode
+        with mock.patch('binary_backend.MappedTaskList._decode',
+                        autospec=True, side_effect=decode) as mdecode:
+            ours = engine.ListEngine()
+            ours.new_task("d", 2016, 1, 2)
+            writing = threading.Event()
+            ours.writer.submit(writing.wait, 5)
+            ours.save_tasks()
+            self.assertLess(mdecode.call_count, 50)
+            writing.set()
+            ours.flush()
+        self.assertEqual(1003, len(engine.ListEngine().view_pending_tasks()))
+
+    def test_failed_change(self):
+        for kind in (engine.ListEngine, engine.SortedListEngine):
+            ours, _ = self.engines('journal', kind)
+            self.assertRaises(IndexError, ours.remove_pending_task, 5)
+            self.assertRaises(IndexError, ours.finish_task, -3)
+            self.assertRaises(ValueError, ours.edit_finished_task, 0, "x",
+                              2016, 13, 1)
+            self.assertRaises(TypeError, ours.import_tasks,
+                              [(1, datetime.date(2016, 1, 1), False)])
+            self.assertEqual(0, ours.import_tasks([]))
+            self.assertFalse(ours.changes_detected())
+            self.assertEqual([], ours.journal)
+            self.assertIsNone(ours.base)
+            ours.remove_pending_task(0)
+            self.assertTrue(ours.changes_detected())
+            self.assertEqual([("remove_pending_task", 0)], ours.journal)
+
+    def test_shift_pending_tasks(self):
+        for kind in (engine.ListEngine, engine.SortedListEngine,
+                     engine.ThreadSafeEngine):
+            ours, _ = self.engines('journal', kind)
+            ids = ours.view_pending_tasks_with_ids()
+            columns = ours.pending_columns()
+            self.assertRaises(ValueError, ours.shift_pending_tasks,
+                              -datetime.date(2016, 1, 1).toordinal())
+            self.assertRaises(TypeError, ours.shift_pending_tasks, 1.0)
+            self.assertFalse(ours.changes_detected())
+            self.assertIs(columns, ours.pending_columns())
+            ours.shift_pending_tasks(-1)
+            self.assertEqual([(x, content, date - datetime.timedelta(1))
+                              for x, content, date in ids],
+                             ours.view_pending_tasks_with_ids())
+            self.assertEqual([1], list(ours.pending_columns().due_today(
+                datetime.date(2016, 1, 1))))
+            self.assertEqual([("shift_pending_tasks", -1)], ours.journal)
+            ours.save_tasks()
+            ours.flush()
+            again = kind()
+            self.assertEqual(ours.view_pending_tasks(),
+                             again.view_pending_tasks())
+            again.shift_pending_tasks(1)
+            self.assertIsNone(again.columns)
+            self.assertEqual([ids[0]], again.view_pending_tasks_with_ids(
+                stop=1))
+
+    def test_index_rebuilt(self):
+        ours, theirs = self.engines('pickle')
+        a = ours.view_pending_tasks_with_ids()[0][0]
+        ours.remove_pending_task(0)
+        self.assertRaises(KeyError, ours.view_task, a)
+        ours.new_task("a", 2016, 1, 1)
+        self.assertIndexed(ours)
+
+    def test_search_tasks(self):
+        for savemethod in ('pickle', 'journal'):
+            for kind in (engine.ListEngine, engine.SortedListEngine,
+                         engine.ThreadSafeEngine):
+                ours, theirs = self.engines(savemethod, kind)
+                (a, _, _), (b, _, _) = ours.view_pending_tasks_with_ids()
+                (c, _, _), = ours.view_finished_tasks_with_ids()
+                self.assertEqual([(c, "c", datetime.date(2016, 1, 3), True)],
+                                 ours.search_tasks("C"))
+
+                d = ours.new_task("x a", 2016, 1, 4)
+                ours.edit_pending_task_by_id(a, "x A", 2016, 1, 5)
+                ours.edit_pending_task_by_id(b, "y", None, None, None)
+                ours.finish_task_by_id(d)
+                ours.unfinish_task_by_id(c)
+                ours.import_tasks([("x b", datetime.date(2016, 1, 1), False),
+                                   ("x a", datetime.date(2016, 1, 2), True)])
+                found = ours.search_tasks("x")
+                self.assertEqual(["x b", "x A", "x a", "x a"],
+                                 [x[1] for x in found])
+                self.assertEqual([False, False, True, True],
+                                 [x[3] for x in found])
+                self.assertEqual([a, d], [found[1][0], found[3][0]])
+                self.assertEqual(["x b"],
+                                 [x[1] for x in ours.search_tasks("b")])
+                ours.remove_pending_task_by_id(a)
+                ours.clear_finished_tasks()
+                self.assertEqual(["x b"],
+                                 [x[1] for x in ours.search_tasks("x")])
+                self.assertEqual([(c, "c", datetime.date(2016, 1, 3), False)],
+                                 ours.search_tasks("c"))
+
+                theirs.new_task("z", 2016, 1, 1)
+                theirs.save_tasks()
+                theirs.flush()
+                ours.save_tasks()
+                ours.flush()
+                self.assertEqual(["z"],
+                                 [x[1] for x in ours.search_tasks("z")])
+
+    def test_save_search_index(self):
+        ours, _ = self.engines('pickle')
+        with open(self.config, 'a') as fil:
+            fil.write("save_search_index = yes\n")
+        ours = engine.ListEngine()
+        indexfile = engine.SAVEFILE + '.pkl' + search.SEARCH_SUFFIX
+        ours.close()
+        self.assertFalse(os.path.exists(indexfile))
+        self.assertEqual(["a"], [x[1] for x in ours.search_tasks("a")])
+        ours.new_task("a b", 2016, 1, 4)
+        ours.close()
+        self.assertFalse(os.path.exists(indexfile))
+        ours.save_tasks()
+        ours.close()
+        self.assertTrue(os.path.exists(indexfile))
+
+        reloaded = engine.ListEngine()
+        self.assertIsNone(reloaded.search_index.tasks)
+        self.assertEqual(["a", "a b"],
+                         [x[1] for x in reloaded.search_tasks("A")])
+        reloaded.new_task("d", 2016, 1, 1)
+        reloaded.save_tasks()
+        reloaded.flush()
+        self.assertIsNone(engine.ListEngine().search_index)
+
+    def test_save_search_index_no_ids(self):
+        self.engines('json')
+        for name in os.listdir(self.dir):
+            if name.startswith("ts.json") and "." not in name[7:]:
+                path = os.path.join(self.dir, name)
+                with open(path) as fil:
+                    text = re.sub(r', "id": \d+', '', fil.read())
+                with open(path, 'w') as fil:
+                    fil.write(text)
+        with open(self.config, 'a') as fil:
+            fil.write("save_search_index = yes\n")
+        indexfile = engine.SAVEFILE + '.json' + search.SEARCH_SUFFIX
+        for x in range(2):
+            ours = engine.ListEngine()
+            self.assertEqual(os.path.exists(indexfile),
+                             ours.search_index is not None)
+            found = ours.search_tasks("a")
+            self.assertEqual(["a"], [x[1] for x in found])
+            self.assertEqual(ours.view_pending_tasks_with_ids()[0][0],
+                             found[0][0])
+            self.assertEqual(x == 0, ours.changes_detected())
+            ours.save_tasks()
+            ours.close()
+            self.assertTrue(os.path.exists(indexfile))
+
+    def test_new_ids_saved(self):
+        savefile = engine.savemethod_backend('pickle')[1]
+        with open(os.path.join(os.path.dirname(__file__),
+                               "taskstorage.pkl"), 'rb') as fil:
+            data = fil.read()
+        with open(savefile, 'wb') as fil:
+            fil.write(data)
+        with open(self.config, 'w') as fil:
+            fil.write("[DEFAULT]\nsavemethod = pickle\n")
+        ours = engine.ListEngine()
+        self.assertTrue(ours.changes_detected())
+        ids = ours.view_pending_tasks_with_ids()
+        finished = ours.view_finished_tasks_with_ids()
+        ours.save_tasks()
+        ours.flush()
+        ours = engine.ListEngine()
+        self.assertFalse(ours.changes_detected())
+        self.assertEqual(ids, ours.view_pending_tasks_with_ids())
+        self.assertEqual(finished, ours.view_finished_tasks_with_ids())
+        self.assertFalse(ours.changes_detected())
+
+    def test_new_finished_ids_saved(self):
+        savefile = engine.savemethod_backend('json')[1]
+        with open(savefile, 'w') as fil:
+            fil.write('[[], []]')
+        with open(savefile + engine.FINISHED_SUFFIX, 'w') as fil:
+            fil.write('[[], [{"__engine.Task__": true, "content": "b", '
+                      '"date": [2016, 1, 3]}]]')
+        with open(self.config, 'w') as fil:
+            fil.write("[DEFAULT]\nsavemethod = json\n")
+        ours = engine.ListEngine()
+        self.assertFalse(ours.changes_detected())
+        finished = ours.view_finished_tasks_with_ids()
+        self.assertTrue(ours.changes_detected())
+        ours.save_tasks()
+        ours.flush()
+        ours = engine.ListEngine()
+        self.assertEqual(finished, ours.view_finished_tasks_with_ids())
+        self.assertFalse(ours.changes_detected())
+
+
+class TestDiffTasks(unittest.TestCase):
+    def test_diff(self):
+        old = [engine.Task("a", 2016, 1, 1), engine.Task("a", 2016, 1, 1),
+               engine.Task("b", 2016, 1, 2)]
+        new = [engine.Task("a", 2016, 1, 1), engine.Task("c", 2016, 1, 2)]
+        self.assertEqual(([engine.Task("a", 2016, 1, 1),
+                           engine.Task("b", 2016, 1, 2)],
+                          [engine.Task("c", 2016, 1, 2)]),
+                         engine.ListEngine._diff_tasks(old, new))
+
+    def test_discard(self):
+        for kind in (list, sortedlist.SortedTaskList):
+            tasks = kind([engine.Task("a", 2016, 1, 1),
+                          engine.Task("b", 2016, 1, 2),
+                          engine.Task("c", 2016, 1, 2),
+                          engine.Task("d", 2016, 1, 3)])
+            for task in (engine.Task("c", 2016, 1, 2),
+                         engine.Task("e", 2016, 1, 2),
+                         engine.Task("f", 2017, 1, 1)):
+                engine.ListEngine._discard_task(tasks, task)
+            self.assertEqual(["a", "b", "d"], [x.content for x in tasks])
+
+
+class TestMigrate(unittest.TestCase):
+    pending = [engine.Task('a', 2016, 1, 2), engine.Task('b: c', 2016, 1, 3)]
+    finished = [engine.Task('d', 2015, 5, 5)]
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        for name, value in (('engine.SAVEFILE', os.path.join(self.dir, "ts")),
+                            ('migrate.CONFIG',
+                             os.path.join(self.dir, "config.ini"))):
+            patcher = mock.patch(name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.config = configparser.ConfigParser()
+
+    def store(self, method, legacy=False):
+        """Save test tasks as ListEngine would with method."""
+        backend, savefile = engine.savemethod_backend(method)
+        if legacy or not backend.sections:
+            backend.save(savefile, (self.pending, self.finished))
+        else:
+            backend.save(savefile, (self.pending, []))
+            backend.save(savefile + engine.FINISHED_SUFFIX,
+                         ([], self.finished))
+        self.config['DEFAULT']['savemethod'] = method
+
+    def stored(self, method):
+        """Load tasks stored with method."""
+        chunks = migrate.read_chunks(*engine.savemethod_backend(method))
+        item = ([], [])
+        for index, tasks in chunks:
+            item[index].extend(tasks)
+        return item
+
+    def test_migrate(self):
+        self.store('pickle')
+        self.config['DEFAULT']['compression'] = 'bz2'
+        for method in ('json', 'yaml', 'journal', 'binary', 'pickle'):
+            moved = migrate.migrate(self.config, method)
+            self.assertEqual([2, 1], moved.counts)
+            self.assertEqual((self.pending, self.finished),
+                             self.stored(method))
+            config = configparser.ConfigParser()
+            config.read(migrate.CONFIG)
+            self.assertEqual(method, config['DEFAULT']['savemethod'])
+        self.assertNotIn("ts.pkl.new", os.listdir(self.dir))
+
+    def test_migrate_legacy(self):
+        self.store('json', legacy=True)
+        migrate.migrate(self.config, 'pickle')
+        self.assertEqual((self.pending, []),
+                         pickle_backend.PickleFileBackend.load(
+                             engine.SAVEFILE + '.pkl'))
+        self.assertEqual(([], self.finished),
+                         pickle_backend.PickleFileBackend.load(
+                             engine.SAVEFILE + '.pkl.finished'))
+
+    def test_migrate_same_or_unknown(self):
+        self.store('json')
+        self.assertRaises(ValueError, migrate.migrate, self.config, 'json')
+        self.assertRaises(KeyError, migrate.migrate, self.config, 'xml')
+
+    @mock.patch('migrate.Checksum.__eq__', return_value=False)
+    def test_migrate_mismatch(self, meq):
+        self.store('pickle')
+        before = sorted(os.listdir(self.dir))
+        self.assertRaises(ValueError, migrate.migrate, self.config, 'json')
+        self.assertEqual(before, sorted(
+            name for name in os.listdir(self.dir)
+            if not name.endswith(storagelock.LOCK_SUFFIX)))
+        self.assertEqual('pickle', self.config['DEFAULT']['savemethod'])
+
+    def test_migrate_locks(self):
+        self.store('pickle')
+        eng = engine.ListEngine.__new__(engine.ListEngine)
+        eng.savefile = engine.SAVEFILE + '.json'
+        with eng.storage_lock() as lock:
+            self.assertEqual(0, lock.version())
+        with mock.patch('migrate.StorageLock.acquire', autospec=True,
+                        side_effect=storagelock.StorageLock.acquire) as macq:
+            migrate.migrate(self.config, 'json')
+        self.assertEqual([mock.call(mock.ANY, True)] * 2,
+                         macq.call_args_list)
+        self.assertEqual(sorted([engine.SAVEFILE + '.json',
+                                 engine.SAVEFILE + '.pkl']),
+                         [x[0][0].path[:-len(storagelock.LOCK_SUFFIX)]
+                          for x in macq.call_args_list])
+        with eng.storage_lock() as lock:
+            self.assertEqual(1, lock.version())
+
+    def test_checksum(self):
+        x, y = migrate.Checksum(), migrate.Checksum()
+        list(x.feed([(0, self.pending), (1, self.finished)]))
+        list(y.feed([(0, self.pending[:1]), (0, self.pending[1:]),
+                     (1, self.finished)]))
+        self.assertEqual(x, y)
+        self.assertEqual("2 pending and 1 finished tasks", str(x))
+        list(y.feed([(1, self.finished)]))
+        self.assertNotEqual(x, y)
+        with self.assertRaises(ValueError):
+            list(y.feed([(0, self.pending)]))
+        z = migrate.Checksum()
+        list(z.feed([(0, [engine.Task.from_ordinal(x.content, x.ordinal)
+                          for x in self.pending]), (1, self.finished)]))
+        self.assertNotEqual(x, z)
+
 
 class TestEngineConfig(unittest.TestCase):
     def setUp(self):
@@ -358,6 +1866,12 @@ class TestEngineConfig(unittest.TestCase):
     def test_init_TypeError(self):
         self.assertRaises(TypeError, engine.EngineConfig)
 
+    def test_savemethod_backend(self):
+        self.assertEqual((pickle_backend.PickleFileBackend,
+                          lab.SAVEFILE + '.pkl'),
+                         engine.savemethod_backend('pickle'))
+        self.assertRaises(KeyError, engine.savemethod_backend, 'xml')
+
     @mock.patch('engine.type', new=lambda x: False)
     @mock.patch('engine.sys.exit')
     @mock.patch('engine.configparser.ConfigParser')
@@ -373,6 +1887,7 @@ class TestEngineConfig(unittest.TestCase):
         mock_config = configparser.ConfigParser()
         mock_config.read = mock.MagicMock()
         mock_backend = mock.MagicMock()
+        mock_backend.PickleFileBackend.streams = False
         with mock.patch('engine.configparser.ConfigParser') as mock_CP:
             with mock.patch.dict('sys.modules', **{
                     'pickle_backend': mock_backend
@@ -391,6 +1906,7 @@ class TestEngineConfig(unittest.TestCase):
         mock_config.read = mock.MagicMock()
         mock_config['DEFAULT']['savemethod'] = 'json'
         mock_backend = mock.MagicMock()
+        mock_backend.JsonFileBackend.streams = False
         with mock.patch('engine.configparser.ConfigParser') as mock_CP:
             with mock.patch.dict('sys.modules', **{
                     'json_backend': mock_backend
@@ -409,6 +1925,7 @@ class TestEngineConfig(unittest.TestCase):
         mock_config.read = mock.MagicMock()
         mock_config['DEFAULT']['savemethod'] = 'yaml'
         mock_backend = mock.MagicMock()
+        mock_backend.YamlFileBackend.streams = False
         with mock.patch('engine.configparser.ConfigParser') as mock_CP:
             with mock.patch.dict('sys.modules', **{
                     'yaml_backend': mock_backend
@@ -421,6 +1938,22 @@ class TestEngineConfig(unittest.TestCase):
         self.assertEqual(tmp.file_backend, mock_backend.YamlFileBackend)
         self.assertEqual(tmp.savefile, lab.SAVEFILE + '.yaml')
 
+    @mock.patch('engine.type', new=lambda x: False)
+    def test_init_config_journal(self):
+        mock_config = configparser.ConfigParser()
+        mock_config.read = mock.MagicMock()
+        mock_config['DEFAULT']['savemethod'] = 'journal'
+        mock_backend = mock.MagicMock()
+        mock_backend.JournalFileBackend.streams = False
+        with mock.patch('engine.configparser.ConfigParser') as mock_CP:
+            with mock.patch.dict('sys.modules', **{
+                    'journal_backend': mock_backend
+            }):
+                mock_CP.return_value = mock_config
+                tmp = engine.EngineConfig()
+        self.assertEqual(tmp.file_backend, mock_backend.JournalFileBackend)
+        self.assertEqual(tmp.savefile, lab.SAVEFILE + '.jnl')
+
     def test_get_savemethod(self):
         self.t.config = mock.MagicMock()
         self.t.testmeth = engine.EngineConfig.get_savemethod
@@ -428,7 +1961,8 @@ class TestEngineConfig(unittest.TestCase):
                          self.t.testmeth(self.t))
 
     def test_get_available_savemethods(self):
-        self.assertEqual(engine.AVAILABLE_SAVEMETHODS,
+        self.assertEqual(tuple((x.name, x.description)
+                               for x in engine.registry.savemethods()),
                          engine.EngineConfig.get_available_savemethods(self.t))
 
     @mock.patch('engine.sys.exit', side_effect=TestSuccess)
@@ -437,6 +1971,7 @@ class TestEngineConfig(unittest.TestCase):
         self.t.config = configparser.ConfigParser()
         self.t.config.write = mock.MagicMock()
         self.t.testmeth = engine.EngineConfig.set_savemethod
+        self.t.compressed.side_effect = lambda backend: backend
         mock_backend = mock.MagicMock()
 
         self.assertRaises(TestSuccess, self.t.testmeth, self.t, 'puckle')
@@ -477,9 +2012,11 @@ class TestEngineConfig(unittest.TestCase):
 
 class TestListEngine(unittest.TestCase):
     class Quack():
-        def __init__(self, c, y, m, d):
+        def __init__(self, c, y, m, d, task_id=None):
             self.content = c
             self.date = datetime.date(y, m, d)
+            self.ordinal = self.date.toordinal()
+            self.id = task_id
 
         def __lt__(self, other):
             return self.date < other.date
@@ -495,6 +2032,9 @@ class TestListEngine(unittest.TestCase):
         self.t = mock.MagicMock()
         self.t.pending_task_list = copy.deepcopy(self.testpen)
         self.t.finished_task_list = copy.deepcopy(self.testfin)
+        self.t._finished = self.t.finished_task_list
+        self.t.base = None
+        self.t.config = configparser.ConfigParser()
 
     def test_init(self):
         self.t.testmeth = engine.ListEngine.__init__
@@ -512,15 +2052,25 @@ class TestListEngine(unittest.TestCase):
         correct = [("123", datetime.date(1, 1, 1)),
                    ("abc", datetime.date(2000, 10, 10))]
         self.assertEqual(correct, self.t.testmeth(self.t))
+        self.assertEqual(correct[1:], self.t.testmeth(self.t, 1))
+        self.assertEqual(correct[:1], self.t.testmeth(self.t, None, 1))
+
+    @mock.patch('engine.Task.new_id')
+    def test_new_task(self, mock_new_id):
+        mock_new_id.return_value = 5
+        self.assertEqual(5, engine.ListEngine.new_task(self.t, "xyz",
+                                                       9999, 12, 30))
+        self.t.add_task.assert_called_once_with(5, "xyz", 9999, 12, 30)
 
     @mock.patch('engine.Task', new=Quack)
-    def test_new_task(self):
-        self.t.testmeth = engine.ListEngine.new_task
+    def test_add_task(self):
+        self.t.testmeth = engine.ListEngine.add_task
         correct = [self.Quack("123", 1, 1, 1),
                    self.Quack("abc", 2000, 10, 10),
                    self.Quack("xyz", 9999, 12, 30)]
-        self.t.testmeth(self.t, "xyz", 9999, 12, 30)
+        self.t.testmeth(self.t, 5, "xyz", 9999, 12, 30)
         self.assertEqual(correct, self.t.pending_task_list)
+        self.assertEqual(5, self.t.pending_task_list[-1].id)
 
     def test_remove_pending_task(self):
         self.t.testmeth = engine.ListEngine.remove_pending_task
@@ -536,6 +2086,13 @@ class TestListEngine(unittest.TestCase):
         self.t.testmeth(self.t, 1, "xyz", 9999, 12, 30)
         self.assertEqual(correct, self.t.pending_task_list)
 
+    def test_edit_pending_task_moves(self):
+        self.t.testmeth = engine.ListEngine.edit_pending_task
+        correct = [self.Quack("abc", 2000, 10, 10),
+                   self.Quack("123", 3000, 1, 1)]
+        self.t.testmeth(self.t, 0, "", 3000, 1, 1)
+        self.assertEqual(correct, self.t.pending_task_list)
+
     def test_finish_task(self):
         self.t.testmeth = engine.ListEngine.finish_task
         correct = ([self.Quack("123", 1, 1, 1)],
@@ -551,6 +2108,7 @@ class TestListEngine(unittest.TestCase):
         correct = [("", datetime.date(537, 7, 27)),
                    ("xyz", datetime.date(9999, 12, 30))]
         self.assertEqual(correct, self.t.testmeth(self.t))
+        self.assertEqual(correct[1:2], self.t.testmeth(self.t, 1, 2))
 
     def test_clear_finished_tasks(self):
         self.t.testmeth = engine.ListEngine.clear_finished_tasks
@@ -582,17 +2140,346 @@ class TestListEngine(unittest.TestCase):
         self.assertEqual(correct, (self.t.pending_task_list,
                                    self.t.finished_task_list))
 
+    def test_import_tasks(self):
+        self.t.testmeth = engine.ListEngine.import_tasks
+        self.t.pending_task_list = [engine.Task("b", 2000, 1, 1)]
+        self.t.finished_task_list = []
+        records = [("c", datetime.date(2000, 1, 1), False),
+                   ("a", datetime.date(1999, 1, 1), False),
+                   ("f", datetime.date(2001, 1, 1), True),
+                   ("d", datetime.date(2000, 1, 1), False)]
+        with mock.patch('engine.IMPORT_BATCH', 3):
+            self.assertEqual(4, self.t.testmeth(self.t, iter(records)))
+        self.assertEqual(["a", "b", "c", "d"],
+                         [x.content for x in self.t.pending_task_list])
+        self.assertEqual([engine.Task("f", 2001, 1, 1)],
+                         self.t.finished_task_list)
+        self.t._mutated.assert_called_once_with()
+
+    def test_import_tasks_same_as_new_task(self):
+        random.seed(3)
+        records = [(str(x), datetime.date(2016, 1, random.randint(1, 9)),
+                    False) for x in range(300)]
+        self.t.pending_task_list = []
+        self.t.finished_task_list = []
+        with mock.patch('engine.IMPORT_BATCH', 64):
+            engine.ListEngine.import_tasks(self.t, records)
+        correct = []
+        for content, date, done in records:
+            bisect.insort(correct, engine.Task(content, date.year,
+                                               date.month, date.day))
+        self.assertEqual(correct, self.t.pending_task_list)
+
+    def test_import_tasks_error(self):
+        self.t.pending_task_list = []
+        self.t.finished_task_list = []
+
+        def records():
+            yield ("a", datetime.date(2000, 1, 1), False)
+            raise ValueError("line 2: quack")
+        with self.assertRaises(ValueError), \
+                mock.patch('engine.IMPORT_BATCH', 1):
+            engine.ListEngine.import_tasks(self.t, records())
+        self.assertEqual([engine.Task("a", 2000, 1, 1)],
+                         self.t.pending_task_list)
+        self.t._mutated.assert_called_once_with()
+        with self.assertRaises(TypeError):
+            engine.ListEngine.import_tasks(
+                self.t, [(1, datetime.date(2000, 1, 1), False)])
+
+    def test_pending_columns(self):
+        self.t.pending_task_list = [engine.Task("a", 1, 1, 1)]
+        self.t.columns = None
+        self.t.generation = 1
+        columns = engine.ListEngine.pending_columns(self.t)
+        self.assertEqual(("a",), columns.contents)
+        self.assertIs(columns, engine.ListEngine.pending_columns(self.t))
+        self.t.generation = 2
+        self.assertIsNot(columns, engine.ListEngine.pending_columns(self.t))
+
+    def sync_writer(self):
+        """Make self.t write saves right away instead of on writer thread."""
+        def submit(fn, *args):
+            future = concurrent.futures.Future()
+            future.set_result(fn(*args))
+            return future
+        self.t._write = functools.partial(engine.ListEngine._write, self.t)
+        self.t._snapshot = functools.partial(engine.ListEngine._snapshot,
+                                             self.t)
+        self.t.writer.submit.side_effect = submit
+        lock = self.t.storage_lock.return_value.__enter__.return_value
+        lock.version.return_value = self.t.saved_version
+        lock.bump.return_value = self.t.saved_version
+
     def test_save_tasks(self):
+        self.sync_writer()
         self.t.file_backend.save = mock.MagicMock()
+        self.t.file_backend.sections = False
+        self.t.file_backend.append.return_value = False
         self.t.savefile = mock.MagicMock()
+        self.t.journal = [("clear_finished_tasks",)]
+        self.t.generation = 3
         self.t.testmeth = engine.ListEngine.save_tasks
         self.t.testmeth(self.t)
+        self.t.file_backend.append.assert_called_with(
+            self.t.savefile, [("clear_finished_tasks",)])
         self.t.file_backend.save.assert_called_with(
             self.t.savefile,
-            (self.t.pending_task_list,
-             self.t.finished_task_list))
+            self.t._snapshot())
+        self.assertEqual([], self.t.journal)
+        self.assertEqual(3, self.t.saved_generation)
+        self.t.storage_lock.assert_called_once_with(exclusive=True)
+        self.t.storage_lock.return_value.__enter__.return_value \
+            .bump.assert_called_once_with()
+        self.assertFalse(self.t._merge_saved.called)
+        self.assertEqual(self.t.file_stat(), self.t.saved_stat)
+
+    def test_save_tasks_background(self):
+        self.t.journal = [("clear_finished_tasks",)]
+        self.t.file_backend.sections = True
+        self.t.finished_changed = False
+        self.t.writes = []
+        self.t._snapshot = functools.partial(engine.ListEngine._snapshot,
+                                             self.t)
+        self.t.saves = []
+        engine.ListEngine.save_tasks(self.t)
+        save = self.t.writer.submit.call_args[0][3]
+        self.t.writer.submit.assert_called_once_with(
+            self.t._write, self.t.file_backend, self.t.savefile, save)
+        self.assertEqual([save], self.t.saves)
+        self.assertEqual(([("clear_finished_tasks",)],
+                          (self.testpen, self.testfin),
+                          [self.testpen, self.testfin], False),
+                         (save.records, save.item, save.base,
+                          save.write_finished))
+        self.assertEqual([self.t.writer.submit.return_value], self.t.writes)
+        self.assertIsNot(self.t.pending_task_list, save.item[0])
+        self.assertFalse(self.t.file_backend.save.called)
+        self.assertFalse(self.t.storage_lock.called)
+        self.assertEqual(None, self.t.base)
+
+    def test_write_error(self):
+        self.t.file_backend.append.return_value = False
+        self.t.file_backend.save.side_effect = OSError("disk full")
+        self.t.journal = []
+        self.t.finished_changed = False
+        self.t.saved_generation = 3
+        base = [[], []]
+        save = engine.Save([], ([], []), base, False)
+        queued = engine.Save([], ([], None), [[], None], False)
+        self.t.saves = [save, queued]
+        with self.assertRaises(OSError):
+            engine.ListEngine._write(self.t, self.t.file_backend, "quack",
+                                     save)
+        self.t.storage_lock.return_value.__exit__.assert_called_once_with(
+            OSError, mock.ANY, mock.ANY)
+        self.assertEqual(None, self.t.journal)
+        self.assertEqual(None, self.t.saved_generation)
+        self.assertEqual(None, self.t.saved_version)
+        self.assertIs(base, self.t.base)
+        self.assertEqual([queued], self.t.saves)
+        self.assertEqual((None, base, False),
+                         (queued.records, queued.base, queued.write_finished))
+        self.assertTrue(self.t.finished_changed)
+
+    def test_rebase(self):
+        a, b, c, d = (engine.Task(x, 2016, 1, 1) for x in "abcd")
+        self.t.pending_task_list = [a, b, c]
+        self.t._finished = [d]
+        self.t.base = [[a, b], [d]]
+        self.t.generation, self.t.saved_generation = 6, 5
+        queued = engine.Save([("new_task", "c", 2016, 1, 1)],
+                             ([a, b, c], [d]), [[a, b], None], False)
+        self.t.saves = [queued]
+        engine.ListEngine._rebase(self.t, ([a, b], [d]), ([b, d], None))
+        self.t._adopt.assert_called_once_with([b, d, c], None)
+        self.assertEqual([[b, d], [d]], self.t.base)
+        self.assertEqual((None, ([b, d, c], [d]), [[b, d], None]),
+                         (queued.records, queued.item, queued.base))
+        self.assertEqual((7, 5), (self.t.generation,
+                                  self.t.saved_generation))
+        self.assertEqual(None, self.t.journal)
+
+    def test_flush(self):
+        ok, bad = concurrent.futures.Future(), concurrent.futures.Future()
+        ok.set_result(None)
+        bad.set_exception(OSError("disk full"))
+        self.t.writes = [ok]
+        engine.ListEngine.flush(self.t)
+        self.assertEqual([], self.t.writes)
+        self.t.writes = [ok, bad]
+        with self.assertRaises(OSError):
+            engine.ListEngine.flush(self.t)
+        self.assertEqual([], self.t.writes)
+
+    def test_edit_task_copy_on_write(self):
+        tasks = [engine.Task("a", 2000, 1, 1), engine.Task("b", 2000, 1, 2)]
+        snapshot = list(tasks)
+        engine.ListEngine._edit_task(tasks, 0, "c", None, None, None)
+        engine.ListEngine._edit_task(tasks, 1, "", 1999, 1, 1)
+        self.assertEqual([engine.Task("b", 1999, 1, 1),
+                          engine.Task("c", 2000, 1, 1)], tasks)
+        self.assertEqual([engine.Task("a", 2000, 1, 1),
+                          engine.Task("b", 2000, 1, 2)], snapshot)
+
+    def test_save_tasks_append(self):
+        self.sync_writer()
+        self.t.file_backend.append.return_value = True
+        self.t.journal = [("clear_finished_tasks",)]
+        engine.ListEngine.save_tasks(self.t)
+        self.assertFalse(self.t.file_backend.save.called)
+        self.assertEqual([], self.t.journal)
+
+    def test_save_tasks_no_journal(self):
+        self.sync_writer()
+        self.t.journal = None
+        engine.ListEngine.save_tasks(self.t)
+        self.assertFalse(self.t.file_backend.append.called)
+        self.assertTrue(self.t.file_backend.save.called)
+
+    def test_save_tasks_sections(self):
+        self.sync_writer()
+        self.t.savefile = "quack"
+        self.t.journal = None
+        self.t.finished_changed = False
+        engine.ListEngine.save_tasks(self.t)
+        self.t.file_backend.save.assert_called_once_with(
+            self.t.savefile, (self.testpen, []))
+
+        self.t.file_backend.save.reset_mock()
+        self.t.journal = None
+        self.t.finished_changed = True
+        engine.ListEngine.save_tasks(self.t)
+        self.assertEqual([mock.call("quack" + engine.FINISHED_SUFFIX,
+                                    ([], self.testfin)),
+                          mock.call(self.t.savefile, (self.testpen, []))],
+                         self.t.file_backend.save.mock_calls)
+        self.assertFalse(self.t.finished_changed)
+
+    def test_init_sections(self):
+        self.t.file_backend.load = mock.MagicMock()
+        self.t.file_backend.load.return_value = (self.testpen, [])
+        self.t.file_backend.sections = True
+        with mock.patch('engine.super'):
+            engine.ListEngine.__init__(self.t)
+        self.assertEqual(None, self.t._finished)
+        self.assertFalse(self.t.finished_changed)
+        self.t.file_backend.load.assert_called_once_with(self.t.savefile)
+
+        self.t.file_backend.load.return_value = (self.testpen, self.testfin)
+        with mock.patch('engine.super'):
+            engine.ListEngine.__init__(self.t)
+        self.assertEqual(self.testfin, self.t.finished_task_list)
+        self.assertTrue(self.t.finished_changed)
+
+    @mock.patch('engine.Autosaver')
+    def test_init_autosave(self, mautosaver):
+        self.t.file_backend.load.return_value = ([], [])
+        with mock.patch('engine.super'):
+            engine.ListEngine.__init__(self.t)
+        self.assertEqual(None, self.t.autosaver)
+        self.assertFalse(mautosaver.called)
+
+        self.t.config['DEFAULT']['autosave_mutations'] = '10'
+        self.t.config['DEFAULT']['autosave_interval'] = '2.5'
+        with mock.patch('engine.super'):
+            engine.ListEngine.__init__(self.t)
+        mautosaver.assert_called_once_with(self.t, 10, 2.5)
+        self.assertEqual(mautosaver.return_value, self.t.autosaver)
+
+        self.t.config['DEFAULT']['autosave_interval'] = 'soon'
+        with mock.patch('engine.super'), \
+                mock.patch('engine.sys.exit', side_effect=TestSuccess), \
+                mock.patch('builtins.print'):
+            self.assertRaises(TestSuccess, engine.ListEngine.__init__, self.t)
+
+    def test_mutated_autosave(self):
+        self.t.generation = 0
+        engine.ListEngine._mutated(self.t, "new_task", "a", 1, 1, 1)
+        self.t.autosaver.notify.assert_called_once_with()
+
+    def test_finished_task_list_lazy(self):
+        t = engine.ListEngine.__new__(engine.ListEngine)
+        t._finished = None
+        t.base = None
+        t.savefile = "quack"
+        t.file_backend = mock.MagicMock()
+        t.file_backend.load.return_value = ([], self.testfin)
+        self.assertEqual(self.testfin, t.finished_task_list)
+        self.assertEqual(self.testfin, t.finished_task_list)
+        t.file_backend.load.assert_called_once_with(
+            "quack" + engine.FINISHED_SUFFIX)
+        t.finished_task_list = []
+        self.assertEqual([], t.finished_task_list)
+
+    def test_mutated_finished_changed(self):
+        self.t.journal = None
+        self.t.finished_changed = False
+        engine.ListEngine._mutated(self.t, "new_task", "a", 1, 1, 1)
+        self.assertFalse(self.t.finished_changed)
+        engine.ListEngine._mutated(self.t, "finish_task", 0)
+        self.assertTrue(self.t.finished_changed)
+
+        self.t._finished = None
+        self.t.finished_changed = False
+        engine.ListEngine._mutated(self.t)
+        self.assertFalse(self.t.finished_changed)
+
+    def test_changes_detected_sections(self):
+        self.t.saved_stat = (1, 2)
+        self.t.file_stat.return_value = (3, 4)
+        self.t.file_backend.sections = True
+        self.t.file_backend.load = mock.MagicMock()
+        self.t.file_backend.load.return_value = (self.testpen, [])
+        self.t.finished_changed = False
+        self.assertFalse(engine.ListEngine.changes_detected(self.t))
+        self.t.finished_changed = True
+        self.assertTrue(engine.ListEngine.changes_detected(self.t))
+
+    def test_snapshot(self):
+        self.assertEqual((self.t.pending_task_list,
+                          self.t.finished_task_list),
+                         engine.ListEngine._snapshot(self.t))
+        self.t._finished = None
+        self.assertEqual((self.t.pending_task_list, None),
+                         engine.ListEngine._snapshot(self.t))
+
+    def test_mutated(self):
+        self.t.generation = 0
+        self.t.journal = []
+        engine.ListEngine._mutated(self.t, "finish_task", 1)
+        self.assertEqual(1, self.t.generation)
+        self.assertEqual([("finish_task", 1)], self.t.journal)
+        engine.ListEngine._mutated(self.t)
+        self.assertEqual(2, self.t.generation)
+        self.assertEqual(None, self.t.journal)
+        engine.ListEngine._mutated(self.t, "finish_task", 1)
+        self.assertEqual(None, self.t.journal)
+
+    @mock.patch('engine.super')
+    def test_set_savemethod(self, msuper):
+        self.t.journal = []
+        self.t.finished_changed = False
+        self.t.file_backend.load.return_value = (["a"], ["b"])
+        engine.ListEngine.set_savemethod(self.t, "quack")
+        msuper().set_savemethod.assert_called_once_with("quack")
+        self.assertEqual(None, self.t.journal)
+        self.assertEqual(self.t.finished_task_list, self.t._finished)
+        self.assertTrue(self.t.finished_changed)
+        self.assertEqual([["a"], ["b"]], self.t.base)
+
+    @mock.patch('engine.super')
+    def test_set_savemethod_same(self, msuper):
+        self.t.get_savemethod.return_value = "quack"
+        self.t.journal = []
+        engine.ListEngine.set_savemethod(self.t, "quack")
+        self.assertFalse(msuper().set_savemethod.called)
+        self.assertEqual([], self.t.journal)
+        self.assertFalse(self.t.flush.called)
 
     def test_changes_detected_T(self):
+        self.t.saved_stat = (1, 2)
+        self.t.file_stat.return_value = (3, 4)
         self.t.file_backend.load = mock.MagicMock()
         self.t.file_backend.load.return_value = ([], [])
         self.t.testmeth = engine.ListEngine.changes_detected
@@ -600,12 +2487,749 @@ class TestListEngine(unittest.TestCase):
         self.t.file_backend.load.assert_called_with(self.t.savefile)
 
     def test_changes_detected_F(self):
+        self.t.saved_stat = (1, 2)
+        self.t.file_stat.return_value = (3, 4)
         self.t.file_backend.load = mock.MagicMock()
         self.t.file_backend.load.return_value = (self.testpen, self.testfin)
         self.t.testmeth = engine.ListEngine.changes_detected
         self.assertFalse(self.t.testmeth(self.t))
         self.t.file_backend.load.assert_called_with(self.t.savefile)
 
+    def test_changes_detected_generation(self):
+        self.t.saved_stat = (1, 2)
+        self.t.file_stat.return_value = (1, 2)
+        self.t.generation, self.t.saved_generation = 5, 3
+        self.t.testmeth = engine.ListEngine.changes_detected
+        self.assertTrue(self.t.testmeth(self.t))
+        self.t.saved_generation = 5
+        self.assertFalse(self.t.testmeth(self.t))
+        self.assertFalse(self.t.file_backend.load.called)
+
+    def test_changes_detected_touched(self):
+        self.t.saved_stat = (1, 2)
+        self.t.file_stat.return_value = (3, 2)
+        self.t.generation, self.t.saved_generation = 5, 5
+        self.t.file_backend.sections = False
+        self.t.file_backend.load = mock.MagicMock()
+        self.t.file_backend.load.return_value = (self.testpen, self.testfin)
+        self.t.testmeth = engine.ListEngine.changes_detected
+        self.assertFalse(self.t.testmeth(self.t))
+        self.t.file_backend.load.assert_called_once_with(self.t.savefile)
+
+    def test_mark_saved(self):
+        self.t.generation = 7
+        self.t.file_stat.return_value = (1, 2)
+        engine.ListEngine.mark_saved(self.t)
+        self.assertEqual(7, self.t.saved_generation)
+        self.assertEqual((1, 2), self.t.saved_stat)
+
+    @mock.patch('engine.os.stat')
+    def test_file_stat(self, mstat):
+        mstat.return_value.st_mtime_ns = 123
+        mstat.return_value.st_size = 456
+        self.assertEqual((123, 456), engine.ListEngine.file_stat(self.t))
+        mstat.assert_called_once_with(self.t.savefile)
+        mstat.side_effect = FileNotFoundError()
+        self.assertEqual(None, engine.ListEngine.file_stat(self.t))
+
+    def test_mutator(self):
+        self.t.testmeth = engine.ListEngine.remove_pending_task
+        self.t.testmeth(self.t, 0)
+        self.t._mutated.assert_called_once_with("remove_pending_task", 0)
+        self.t._mutated.reset_mock()
+        self.t._keep_base.side_effect = lambda: setattr(self.t, 'base', [])
+        self.assertRaises(IndexError, self.t.testmeth, self.t, 10)
+        self.assertFalse(self.t._mutated.called)
+        self.assertIsNone(self.t.base)
+
+
+class TestSortedTaskList(unittest.TestCase):
+    def setUp(self):
+        self.vals = [random.randrange(0, 50) for x in range(3000)]
+        self.t = sortedlist.SortedTaskList()
+        self.t.LOAD = 8
+
+    def test_add(self):
+        for x in self.vals:
+            self.t.add(x)
+        self.assertEqual(sorted(self.vals), list(self.t))
+        self.assertEqual(len(self.vals), len(self.t))
+
+    def test_setitem(self):
+        self.t.update(self.vals)
+        for idx in (0, 7, 8, -1):
+            self.t[idx] = self.t[idx]
+        self.assertEqual(sorted(self.vals), list(self.t))
+        item = TestListEngine.Quack("a", 2000, 1, 1)
+        self.t = sortedlist.SortedTaskList([item])
+        self.t[0] = TestListEngine.Quack("b", 2000, 1, 1)
+        self.assertEqual("b", self.t[0].content)
+        with self.assertRaises(ValueError):
+            self.t[0] = TestListEngine.Quack("c", 2000, 1, 2)
+
+    def test_bisect_left(self):
+        self.t.update(self.vals)
+        correct = sorted(self.vals)
+        for x in range(-1, 52):
+            self.assertEqual(bisect.bisect_left(correct, x),
+                             self.t.bisect_left(x))
+
+    def test_add_keeps_insertion_order(self):
+        correct = []
+        for x in range(100):
+            item = TestListEngine.Quack(str(x), 2000, 1, x % 3 + 1)
+            bisect.insort(correct, item)
+            self.t.add(item)
+        self.assertEqual([x.content for x in correct],
+                         [x.content for x in self.t])
+
+    def test_update(self):
+        self.t.update(self.vals)
+        self.assertEqual(sorted(self.vals), list(self.t))
+
+    def test_getitem(self):
+        for x in self.vals:
+            self.t.add(x)
+        correct = sorted(self.vals)
+        for idx in range(-len(correct), len(correct)):
+            self.assertEqual(correct[idx], self.t[idx])
+        self.assertEqual(correct[10:20], self.t[10:20])
+        with self.assertRaises(IndexError):
+            self.t[len(correct)]
+
+    def test_pop(self):
+        self.t.update(self.vals)
+        correct = sorted(self.vals)
+        while correct:
+            idx = random.randrange(-len(correct), len(correct))
+            self.assertEqual(correct.pop(idx), self.t.pop(idx))
+            self.assertEqual(correct, list(self.t))
+        self.assertRaises(IndexError, self.t.pop)
+
+    def test_eq(self):
+        self.t.update(self.vals)
+        self.assertEqual(self.t, sorted(self.vals))
+        self.assertNotEqual(self.t, [])
+        self.assertNotEqual(self.t, 1)
+
+
+class TestSortedListEngine(unittest.TestCase):
+    Quack = TestListEngine.Quack
+
+    def setUp(self):
+        self.t = mock.MagicMock()
+        self.t.pending_task_list = sortedlist.SortedTaskList(
+            copy.deepcopy(TestListEngine.testpen))
+        self.t.finished_task_list = sortedlist.SortedTaskList(
+            copy.deepcopy(TestListEngine.testfin))
+        self.t._finished = self.t.finished_task_list
+
+    def test_init(self):
+        self.t.testmeth = engine.SortedListEngine.__init__
+        self.t.pending_task_list = [self.Quack("a", 1, 1, 2),
+                                    self.Quack("b", 1, 1, 1)]
+        self.t.finished_task_list = []
+        with mock.patch('engine.super'):
+            self.t.testmeth(self.t)
+        self.assertIsInstance(self.t.pending_task_list,
+                              sortedlist.SortedTaskList)
+        self.assertEqual(["b", "a"],
+                         [x.content for x in self.t.pending_task_list])
+
+    @mock.patch('engine.Task', new=TestListEngine.Quack)
+    def test_add_task(self):
+        engine.SortedListEngine.add_task(self.t, 5, "x", 1000, 1, 1)
+        self.assertEqual([self.Quack("123", 1, 1, 1),
+                          self.Quack("x", 1000, 1, 1),
+                          self.Quack("abc", 2000, 10, 10)],
+                         self.t.pending_task_list)
+
+    def test_edit_pending_task_moves(self):
+        engine.SortedListEngine.edit_pending_task(self.t, 0, "", 3000, 1, 1)
+        self.assertEqual([self.Quack("abc", 2000, 10, 10),
+                          self.Quack("123", 3000, 1, 1)],
+                         self.t.pending_task_list)
+
+    def test_edit_finished_task_bad_date(self):
+        with self.assertRaises(ValueError):
+            engine.SortedListEngine.edit_finished_task(self.t, 0, "", 1, 13, 1)
+        self.assertEqual(TestListEngine.testfin, self.t.finished_task_list)
+
+    def test_finish_unfinish_task(self):
+        engine.SortedListEngine.finish_task(self.t, 1)
+        engine.SortedListEngine.unfinish_task(self.t, 0)
+        self.assertEqual([self.Quack("123", 1, 1, 1),
+                          self.Quack("", 537, 7, 27)],
+                         self.t.pending_task_list)
+        self.assertEqual([self.Quack("abc", 2000, 10, 10),
+                          self.Quack("xyz", 9999, 12, 30)],
+                         self.t.finished_task_list)
+
+    def test_clear_finished_tasks(self):
+        engine.SortedListEngine.clear_finished_tasks(self.t)
+        self.assertEqual([], self.t.finished_task_list)
+
+    def test_snapshot(self):
+        snapshot = engine.SortedListEngine._snapshot(self.t)
+        self.assertEqual((TestListEngine.testpen, TestListEngine.testfin),
+                         snapshot)
+        for x in snapshot:
+            self.assertIs(type(x), list)
+
+
+    def test_load_finished(self):
+        self.t.file_backend.load.return_value = (
+            [], [self.Quack("a", 1, 1, 2), self.Quack("b", 1, 1, 1)])
+        with mock.patch('engine.super') as msuper:
+            msuper.return_value._load_finished.return_value = \
+                self.t.file_backend.load.return_value[1]
+            tasks = engine.SortedListEngine._load_finished(self.t)
+        self.assertIsInstance(tasks, sortedlist.SortedTaskList)
+        self.assertEqual(["b", "a"], [x.content for x in tasks])
+
+    def test_import_tasks(self):
+        self.t.import_tasks = engine.ListEngine.import_tasks
+        with mock.patch('engine.super') as msuper:
+            msuper.return_value.import_tasks.return_value = 1
+            self.assertEqual(1, engine.SortedListEngine.import_tasks(
+                self.t, [("a", datetime.date(2000, 1, 1), False)]))
+        self.assertIsInstance(self.t.pending_task_list,
+                              sortedlist.SortedTaskList)
+        self.assertIsInstance(self.t.finished_task_list,
+                              sortedlist.SortedTaskList)
+
+
+class TestThreadSafeEngine(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        config = os.path.join(tmpdir.name, "config.ini")
+        with open(config, 'w') as fil:
+            fil.write("[DEFAULT]\nsavemethod = json\n")
+        for name, value in (('engine.SAVEFILE',
+                             os.path.join(tmpdir.name, "ts")),
+                            ('engine.CONFIG', config)):
+            patcher = mock.patch(name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.t = engine.ThreadSafeEngine()
+        self.t.new_task("a", 2016, 1, 1)
+        self.t.new_task("b", 2016, 1, 2)
+        self.t.finish_task(1)
+        self.t.save_tasks()
+        self.t.flush()
+
+    def test_lock(self):
+        self.assertIsInstance(self.t.lock, rwlock.RWLock)
+        self.assertIsInstance(self.t.pending_task_list,
+                              sortedlist.SortedTaskList)
+
+    def test_views_read(self):
+        with mock.patch.object(self.t.lock, 'reading',
+                               wraps=self.t.lock.reading) as mreading:
+            self.assertEqual([("a", datetime.date(2016, 1, 1))],
+                             self.t.view_pending_tasks())
+            self.assertEqual([("b", datetime.date(2016, 1, 2))],
+                             self.t.view_finished_tasks(0, 1))
+            self.assertEqual(("a",), self.t.pending_columns().contents)
+        self.assertEqual(3, mreading.call_count)
+
+    def test_view_loads_finished(self):
+        t = engine.ThreadSafeEngine()
+        self.assertIsNone(t._finished)
+        with t.lock.reading():
+            with self.assertRaises(RuntimeError):
+                t.view_finished_tasks()
+        self.assertEqual([("b", datetime.date(2016, 1, 2))],
+                         t.view_finished_tasks())
+
+    def test_concurrent(self):
+        def change(num):
+            for i in range(50):
+                self.t.new_task(str(num), 2016, 1, 1 + i % 28)
+                self.t.view_pending_tasks(0, 10)
+                self.t.view_finished_tasks()
+                if i % 2:
+                    self.t.finish_task(0)
+
+        with concurrent.futures.ThreadPoolExecutor(4) as pool:
+            list(pool.map(change, range(4)))
+        self.assertEqual(101, len(self.t.view_pending_tasks()))
+        self.assertEqual(101, len(self.t.view_finished_tasks()))
+        self.assertEqual(sorted(self.t.pending_task_list),
+                         list(self.t.pending_task_list))
+
+    def test_make_engine(self):
+        config = configparser.ConfigParser()
+        config['DEFAULT']['engine'] = 'threadsafe'
+        with mock.patch('engine.ThreadSafeEngine') as meng:
+            self.assertIs(meng.return_value, lab.make_engine(config))
+
+
+class TestSqliteEngine(unittest.TestCase):
+    def setUp(self):
+        db = sqlite3.connect(':memory:')
+        with mock.patch('sqlite_engine.sqlite3.connect') as mconnect:
+            mconnect.return_value = db
+            self.t = sqlite_engine.SqliteEngine()
+            mconnect.assert_called_once_with(lab.SAVEFILE + '.sqlite3')
+        self.t.new_task("abc", 2000, 10, 10)
+        self.t.new_task("123", 1, 1, 1)
+        self.t.new_task("xyz", 2000, 10, 10)
+        self.t.finish_task(2)
+        self.t.save_tasks()
+
+    def test_view_pending_tasks(self):
+        self.assertEqual([("123", datetime.date(1, 1, 1)),
+                          ("abc", datetime.date(2000, 10, 10))],
+                         self.t.view_pending_tasks())
+
+    def test_view_finished_tasks(self):
+        self.assertEqual([("xyz", datetime.date(2000, 10, 10))],
+                         self.t.view_finished_tasks())
+
+    def test_view_slice(self):
+        tasks = self.t.view_pending_tasks()
+        for start, stop in ((None, None), (1, None), (None, 1), (0, 5),
+                            (-1, None), (None, -1), (1, 0), (5, 9)):
+            self.assertEqual(tasks[start:stop],
+                             self.t.view_pending_tasks(start, stop))
+            self.assertEqual(tasks[start:stop], [
+                x[1:] for x in self.t.view_pending_tasks_with_ids(start,
+                                                                  stop)])
+        self.assertEqual([], self.t.view_finished_tasks(1, 2))
+
+    def test_new_task_wrong(self):
+        self.assertRaises(TypeError, self.t.new_task, 1, 1, 1, 1)
+        self.assertRaises(ValueError, self.t.new_task, "", 1, 13, 1)
+
+    def test_remove_task(self):
+        self.t.remove_pending_task(-1)
+        self.t.remove_finished_task(0)
+        self.assertEqual([("123", datetime.date(1, 1, 1))],
+                         self.t.view_pending_tasks())
+        self.assertEqual([], self.t.view_finished_tasks())
+
+    def test_remove_task_wrong(self):
+        self.assertRaises(IndexError, self.t.remove_pending_task, 2)
+        self.assertRaises(IndexError, self.t.remove_pending_task, -3)
+        self.assertRaises(TypeError, self.t.remove_pending_task, None)
+
+    def test_edit_pending_task(self):
+        self.t.edit_pending_task(1, "quack", None, None, None)
+        self.t.edit_pending_task(0, "", 3000, 1, 1)
+        self.assertEqual([("quack", datetime.date(2000, 10, 10)),
+                          ("123", datetime.date(3000, 1, 1))],
+                         self.t.view_pending_tasks())
+
+    def test_edit_finished_task(self):
+        self.t.unfinish_task(0)
+        self.t.finish_task(0)
+        self.t.edit_finished_task(0, "foo", 1, 1, 1)
+        self.assertEqual([("foo", datetime.date(1, 1, 1))],
+                         self.t.view_finished_tasks())
+
+    def test_equal_dates_keep_insertion_order(self):
+        self.t.unfinish_task(0)
+        self.t.new_task("last", 2000, 10, 10)
+        self.assertEqual(["123", "abc", "xyz", "last"],
+                         [x[0] for x in self.t.view_pending_tasks()])
+
+    def test_clear_finished_tasks(self):
+        self.t.clear_finished_tasks()
+        self.assertEqual([], self.t.view_finished_tasks())
+
+    def test_shift_pending_tasks(self):
+        self.t.shift_pending_tasks(1)
+        self.assertEqual([("123", datetime.date(1, 1, 2)),
+                          ("abc", datetime.date(2000, 10, 11))],
+                         self.t.view_pending_tasks())
+        self.assertRaises(ValueError, self.t.shift_pending_tasks, -2)
+        self.assertRaises(TypeError, self.t.shift_pending_tasks, "1")
+        self.t.clear_finished_tasks()
+        self.assertEqual(2, len(self.t.view_pending_tasks()))
+
+    def test_task_ids(self):
+        (a, _, _), (b, _, _) = self.t.view_pending_tasks_with_ids()
+        (c, _, _), = self.t.view_finished_tasks_with_ids()
+        self.assertEqual(("xyz", datetime.date(2000, 10, 10), True),
+                         self.t.view_task(c))
+        d = self.t.new_task("d", 2000, 10, 10)
+        self.t.finish_task_by_id(a)
+        self.t.edit_finished_task_by_id(a, "A", 3000, 1, 1)
+        self.t.unfinish_task_by_id(c)
+        self.t.edit_pending_task_by_id(b, "B", None, None, None)
+        self.t.remove_pending_task_by_id(d)
+        self.t.edit_pending_task(1, "", 1, 1, 2)
+        self.assertEqual([(a, "A", datetime.date(3000, 1, 1))],
+                         self.t.view_finished_tasks_with_ids())
+        self.assertEqual([(c, "xyz", datetime.date(1, 1, 2)),
+                          (b, "B", datetime.date(2000, 10, 10))],
+                         self.t.view_pending_tasks_with_ids())
+        self.t.remove_finished_task_by_id(a)
+        for meth in (self.t.view_task, self.t.remove_pending_task_by_id,
+                     self.t.finish_task_by_id,
+                     self.t.remove_finished_task_by_id):
+            self.assertRaises(KeyError, meth, d)
+        self.assertRaises(KeyError, self.t.unfinish_task_by_id, b)
+
+    def test_search_tasks(self):
+        a = self.t.new_task("Abc def", 1, 1, 2)
+        (b, _, _), _, (c, _, _) = self.t.view_pending_tasks_with_ids()
+        (d, _, _), = self.t.view_finished_tasks_with_ids()
+        self.t.edit_finished_task(0, "abc", None, None, None)
+        self.assertEqual([(b, "123", datetime.date(1, 1, 1), False)],
+                         self.t.search_tasks("123"))
+        self.assertEqual([(a, "Abc def", datetime.date(1, 1, 2), False),
+                          (c, "abc", datetime.date(2000, 10, 10), False),
+                          (d, "abc", datetime.date(2000, 10, 10), True)],
+                         self.t.search_tasks("ABC"))
+        self.t.edit_pending_task_by_id(a, "def", None, None, None)
+        self.t.edit_pending_task_by_id(c, "abc def", 1, 1, 1)
+        self.t.finish_task_by_id(a)
+        self.assertEqual([c, a], [x[0] for x in self.t.search_tasks("def")])
+        self.assertEqual([c], [x[0] for x in self.t.search_tasks("def abc")])
+        self.t.clear_finished_tasks()
+        self.t.import_tasks([("def", datetime.date(1, 1, 1), True)])
+        self.assertEqual([(c, False), (None, True)],
+                         [(x[0] if x[0] == c else None, x[3])
+                          for x in self.t.search_tasks("def")])
+        self.t.remove_pending_task_by_id(c)
+        self.assertEqual([], self.t.search_tasks("abc"))
+        self.assertEqual([], self.t.search_tasks(" "))
+
+    def test_add_ids(self):
+        db = sqlite3.connect(':memory:')
+        db.execute('CREATE TABLE pending (id INTEGER PRIMARY KEY '
+                   'AUTOINCREMENT, content TEXT NOT NULL, '
+                   'date INTEGER NOT NULL)')
+        db.executemany('INSERT INTO pending (content, date) VALUES (?, 1)',
+                       [("a",), ("b",)])
+        with mock.patch('sqlite_engine.sqlite3.connect') as mconnect:
+            mconnect.return_value = db
+            t = sqlite_engine.SqliteEngine()
+        self.assertFalse(t.changes_detected())
+        ids = [x[0] for x in t.view_pending_tasks_with_ids()]
+        self.assertEqual(2, len(set(ids)))
+        self.assertEqual(("b", datetime.date(1, 1, 1), False),
+                         t.view_task(ids[1]))
+        self.assertEqual(ids[1:], [x[0] for x in t.search_tasks("b")])
+
+    def test_import_tasks(self):
+        records = [("b", datetime.date(2000, 10, 10), False),
+                   ("c", datetime.date(1, 1, 1), True),
+                   ("a", datetime.date(1, 1, 1), False)]
+        with mock.patch('engine.IMPORT_BATCH', 2):
+            self.assertEqual(3, self.t.import_tasks(iter(records)))
+        self.assertEqual(["123", "a", "abc", "b"],
+                         [x[0] for x in self.t.view_pending_tasks()])
+        self.assertEqual(["c", "xyz"],
+                         [x[0] for x in self.t.view_finished_tasks()])
+        self.assertTrue(self.t.changes_detected())
+
+    def test_changes_detected(self):
+        self.assertFalse(self.t.changes_detected())
+        self.t.finish_task(0)
+        self.assertTrue(self.t.changes_detected())
+        self.t.save_tasks()
+        self.assertFalse(self.t.changes_detected())
+
+    def test_savemethods(self):
+        self.assertEqual('sqlite', self.t.get_savemethod())
+        self.assertEqual([self.t.get_savemethod()],
+                         [x[0] for x in self.t.get_available_savemethods()])
+        self.t.set_savemethod('pickle')
+        self.assertEqual('sqlite', self.t.get_savemethod())
+
+
+class TestTaskColumns(unittest.TestCase):
+    today = datetime.date(2016, 3, 2)
+    tasks = [engine.Task("a", 2016, 3, 1),
+             engine.Task("b", 2016, 3, 2),
+             engine.Task("c", 2016, 3, 3),
+             engine.Task("d", 2017, 1, 1)]
+
+    def run(self, result=None):
+        """Run every test both with NumPy, if installed, and without it."""
+        super().run(result)
+        if taskcolumns.numpy is not None:
+            with mock.patch('taskcolumns.numpy', None):
+                super().run(result)
+
+    def setUp(self):
+        self.t = taskcolumns.TaskColumns(self.tasks)
+
+    def test_init(self):
+        self.assertEqual(("a", "b", "c", "d"), self.t.contents)
+        self.assertEqual([x.ordinal for x in self.tasks], list(self.t.dates))
+        self.assertEqual(4, len(self.t))
+
+    def test_marks(self):
+        self.assertEqual([taskcolumns.OVERDUE, taskcolumns.TODAY,
+                          taskcolumns.UPCOMING, taskcolumns.UPCOMING],
+                         list(self.t.marks(self.today)))
+
+    def test_read_only(self):
+        with self.assertRaises((TypeError, ValueError)):
+            self.t.dates[0] = 1
+
+    def test_view(self):
+        view = [(x.content, x.date) for x in self.tasks]
+        self.assertEqual(view, self.t.view())
+        columns = taskcolumns.TaskColumns.from_view(view)
+        self.assertEqual(self.t.contents, columns.contents)
+        self.assertEqual(list(self.t.dates), list(columns.dates))
+        self.assertEqual([], taskcolumns.TaskColumns.from_view([]).view())
+
+    def test_queries(self):
+        self.assertEqual([0], list(self.t.overdue(self.today)))
+        self.assertEqual([1], list(self.t.due_today(self.today)))
+        self.assertEqual([1, 2], list(self.t.due_between(
+            self.today, datetime.date(2016, 12, 31))))
+
+    def test_shifted(self):
+        shifted = self.t.shifted(-1)
+        self.assertEqual([0, 1], list(shifted.overdue(self.today)))
+        self.assertEqual([0], list(self.t.overdue(self.today)))
+        self.assertEqual(self.t.contents, shifted.contents)
+        with self.assertRaises(ValueError):
+            self.t.shifted(-self.tasks[0].ordinal)
+        with self.assertRaises(ValueError):
+            self.t.shifted(taskcolumns.MAX_ORDINAL)
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        self.tasks = [engine.Task("Buy milk", 2016, 1, 2, 1),
+                      engine.Task("buy bread, milk", 2016, 1, 1, 2),
+                      engine.Task("call mom", 2016, 1, 3, 3)]
+        self.index = search.TaskIndex.build(self.tasks[:2], self.tasks[2:])
+
+    def test_words(self):
+        self.assertEqual({"buy", "bread", "milk", "2"},
+                         search.words("Buy bread, MILK 2 milk"))
+        self.assertEqual(set(), search.words(" ,. "))
+
+    def test_search(self):
+        self.assertEqual([(self.tasks[1], False), (self.tasks[0], False)],
+                         self.index.search("MILK"))
+        self.assertEqual([(self.tasks[1], False)],
+                         self.index.search("milk bread"))
+        self.assertEqual([(self.tasks[2], True)], self.index.search("mom"))
+        self.assertEqual([], self.index.search("milk mom"))
+        self.assertEqual([], self.index.search("tea"))
+        self.assertEqual([], self.index.search(""))
+
+    def test_add_discard(self):
+        self.index.discard(self.tasks[0])
+        self.index.discard(self.tasks[0])
+        self.index.add(self.tasks[0], True)
+        self.assertEqual([(self.tasks[1], False), (self.tasks[0], True)],
+                         self.index.search("milk"))
+        self.index.discard(self.tasks[2])
+        self.assertNotIn("mom", self.index.postings)
+
+    def test_pickle(self):
+        index = pickle.loads(pickle.dumps(self.index))
+        self.assertFalse(index.changed)
+        self.assertIsNone(index.tasks)
+        self.assertEqual({"buy", "milk", "bread", "call", "mom"},
+                         set(index.postings))
+        self.assertTrue(index.attach(self.tasks[:2], self.tasks[2:]))
+        index.discard(self.tasks[1])
+        self.assertTrue(index.changed)
+        self.assertEqual([(self.tasks[0], False)], index.search("buy milk"))
+        self.assertEqual({1}, index.postings["milk"])
+
+    def test_attach_checks_ids(self):
+        index = pickle.loads(pickle.dumps(self.index))
+        moved = [engine.Task.from_ordinal(x.content, x.ordinal, x.id + 10)
+                 for x in self.tasks]
+        self.assertFalse(index.attach(moved[:2], moved[2:]))
+        self.assertIsNone(index.tasks)
+        self.assertFalse(index.attach(self.tasks[:1], self.tasks[2:]))
+        index.discard(self.tasks[1])
+        index.add(moved[1])
+        self.assertTrue(index.attach([self.tasks[0], moved[1]],
+                                     self.tasks[2:]))
+        self.assertEqual([(moved[1], False), (self.tasks[0], False)],
+                         index.search("milk"))
+        index.__setstate__((self.index.__getstate__()[0], None))
+        self.assertFalse(index.attach(self.tasks[:2], self.tasks[2:]))
+
+    def test_search_unknown(self):
+        del self.index.tasks[self.tasks[1].id]
+        self.assertEqual([(self.tasks[0], False)], self.index.search("milk"))
+
+
+class TestTransfer(unittest.TestCase):
+    records = [("buy milk", datetime.date(2016, 1, 2), False),
+               ('say "hi",\nnewline', datetime.date(1, 1, 1), True),
+               ("ünïcödé", datetime.date(9999, 12, 31), False)]
+
+    def test_ndjson_roundtrip(self):
+        fil = io.StringIO()
+        self.assertEqual(3, transfer.write_ndjson(fil, iter(self.records)))
+        self.assertEqual(3, fil.getvalue().count('\n'))
+        fil.seek(0)
+        self.assertEqual(self.records, list(transfer.read_ndjson(fil)))
+
+    def test_csv_roundtrip(self):
+        fil = io.StringIO(newline='')
+        self.assertEqual(3, transfer.write_csv(fil, iter(self.records)))
+        fil.seek(0)
+        self.assertEqual(self.records, list(transfer.read_csv(fil)))
+
+    def test_read_defaults(self):
+        fil = io.StringIO('{"content": "a", "date": "2016-01-02"}\n\n')
+        self.assertEqual([("a", datetime.date(2016, 1, 2), False)],
+                         list(transfer.read_ndjson(fil)))
+        fil = io.StringIO("date,content\n2016-01-02,a\n")
+        self.assertEqual([("a", datetime.date(2016, 1, 2), False)],
+                         list(transfer.read_csv(fil)))
+        self.assertEqual([], list(transfer.read_csv(io.StringIO())))
+
+    def test_read_ndjson_errors(self):
+        for line in ('{"content": "a"', '{"content": "a"}', '[1, 2]',
+                     '{"content": 1, "date": "2016-01-02"}',
+                     '{"content": "a", "date": "2016-13-02"}',
+                     '{"content": "a", "date": "2016-01-02", '
+                     '"finished": 2}'):
+            fil = io.StringIO('{"content": "a", "date": "2016-01-02"}\n' +
+                              line)
+            with self.assertRaisesRegex(ValueError, "^line 2: "):
+                list(transfer.read_ndjson(fil))
+
+    def test_read_csv_errors(self):
+        with self.assertRaisesRegex(ValueError, "^line 1: "):
+            list(transfer.read_csv(io.StringIO("content,when\n")))
+        fil = io.StringIO("content,date,finished\na,2016-01-02,maybe\n")
+        with self.assertRaisesRegex(ValueError, "^line 2: "):
+            list(transfer.read_csv(fil))
+
+    def test_guess_format(self):
+        self.assertEqual('csv', transfer.guess_format("tasks.CSV"))
+        self.assertEqual('ndjson', transfer.guess_format("tasks.ndjson"))
+        self.assertEqual('ndjson', transfer.guess_format("-"))
+
+    def test_engine_records(self):
+        eng = mock.MagicMock()
+        eng.view_pending_tasks.return_value = [self.records[0][:2]]
+        eng.view_finished_tasks.return_value = [self.records[1][:2]]
+        self.assertEqual(self.records[:2],
+                         list(transfer.engine_records(eng)))
+
+    @mock.patch('transfer.EXPORT_CHUNK', 2)
+    def test_engine_records_chunks(self):
+        eng = engine.ListEngine.__new__(engine.ListEngine)
+        eng.pending_task_list = [engine.Task(str(x), 2016, 1, 1)
+                                 for x in range(4)]
+        eng.finished_task_list = [engine.Task("f", 2016, 1, 2)]
+        with mock.patch.object(eng, 'view_pending_tasks',
+                               wraps=eng.view_pending_tasks) as mview:
+            records = list(transfer.engine_records(eng))
+        self.assertEqual([(str(x), datetime.date(2016, 1, 1), False)
+                          for x in range(4)] +
+                         [("f", datetime.date(2016, 1, 2), True)], records)
+        self.assertEqual([mock.call(0, 2), mock.call(2, 4), mock.call(4, 6)],
+                         mview.call_args_list)
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.engine = mock.MagicMock()
+        self.server = daemon.EngineServer(self.engine)
+
+    def test_dispatch(self):
+        self.engine.finish_task.return_value = None
+        self.assertEqual({"result": None},
+                         self.server.dispatch({"op": "finish_task",
+                                               "args": [1]}))
+        self.engine.finish_task.assert_called_once_with(1)
+
+    def test_dispatch_view(self):
+        self.engine.view_pending_tasks.return_value = [
+            ("a", datetime.date(1, 1, 2))]
+        self.assertEqual({"result": [("a", 2)]},
+                         self.server.dispatch({"op": "view_pending_tasks",
+                                               "args": []}))
+
+    def test_dispatch_ids(self):
+        self.engine.view_finished_tasks_with_ids.return_value = [
+            (7, "a", datetime.date(1, 1, 2))]
+        self.assertEqual({"result": [(7, "a", 2)]}, self.server.dispatch(
+            {"op": "view_finished_tasks_with_ids", "args": []}))
+        self.engine.view_task.return_value = ("a", datetime.date(1, 1, 2),
+                                              True)
+        self.assertEqual({"result": ("a", 2, True)}, self.server.dispatch(
+            {"op": "view_task", "args": [7]}))
+        self.engine.view_task.assert_called_once_with(7)
+
+    def test_dispatch_search(self):
+        self.engine.search_tasks.return_value = [
+            (7, "a", datetime.date(1, 1, 2), True)]
+        self.assertEqual({"result": [(7, "a", 2, True)]}, self.server.dispatch(
+            {"op": "search_tasks", "args": ["a"]}))
+
+    def test_dispatch_import(self):
+        self.engine.import_tasks.return_value = 1
+        self.assertEqual({"result": 1},
+                         self.server.dispatch({"op": "import_tasks",
+                                               "args": [[["a", 2, True]]]}))
+        self.engine.import_tasks.assert_called_once_with(
+            [("a", datetime.date(1, 1, 2), True)])
+
+    def test_dispatch_error(self):
+        self.engine.remove_pending_task.side_effect = IndexError("quack")
+        self.assertEqual({"error": "IndexError", "message": "quack"},
+                         self.server.dispatch({"op": "remove_pending_task",
+                                               "args": [5]}))
+        self.assertEqual("ValueError",
+                         self.server.dispatch({"op": "__init__",
+                                               "args": []})["error"])
+
+    def test_connect_not_running(self):
+        self.assertEqual(None, daemon.RemoteEngine.connect("/nonexistent"))
+
+    def test_roundtrip(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.server.path = os.path.join(tmpdir.name, "sock")
+        self.engine.view_finished_tasks.return_value = [
+            ("a", datetime.date(2016, 1, 1))]
+        self.engine.edit_pending_task.side_effect = ValueError("bad date")
+        self.engine.get_available_savemethods.return_value = (("a", "b"),)
+        self.engine.new_task.return_value = 7
+        self.engine.view_task.return_value = ("x", datetime.date(2016, 1, 1),
+                                              False)
+        self.engine.finish_task_by_id.side_effect = KeyError(8)
+        thread = threading.Thread(target=asyncio.run,
+                                  args=(self.server.serve(),))
+        thread.start()
+        try:
+            for x in range(100):
+                remote = daemon.RemoteEngine.connect(self.server.path)
+                if remote is not None:
+                    break
+                threading.Event().wait(0.01)
+            self.assertEqual(7, remote.new_task("x", 2016, 1, 1))
+            self.engine.new_task.assert_called_once_with("x", 2016, 1, 1)
+            self.assertEqual(("x", datetime.date(2016, 1, 1), False),
+                             remote.view_task(7))
+            with self.assertRaises(KeyError):
+                remote.finish_task_by_id(8)
+            self.assertEqual([("a", datetime.date(2016, 1, 1))],
+                             remote.view_finished_tasks())
+            self.assertEqual((("a", "b"),),
+                             remote.get_available_savemethods())
+            with self.assertRaises(ValueError):
+                remote.edit_pending_task(0, "", 1, 13, 1)
+            remote.close()
+        finally:
+            self.server.stop()
+            thread.join()
+        self.assertFalse(os.path.exists(self.server.path))
+
 
 class TestTask(unittest.TestCase):
     def test_init(self):
@@ -618,8 +3242,8 @@ class TestTask(unittest.TestCase):
 
     def test_hash(self):
         tmp = engine.Task("abc", 1, 1, 1)
-        self.assertEqual(tmp.__hash__(),
-                         hash(("abc", datetime.date(1, 1, 1))))
+        self.assertEqual(tmp.__hash__(), hash(("abc", 1)))
+        self.assertEqual(hash(tmp), hash(engine.Task("abc", 1, 1, 1, 5)))
 
     def test_eq_other_quacks_like_task(self):
         x1 = engine.Task("abc", 1, 1, 1)
@@ -637,6 +3261,47 @@ class TestTask(unittest.TestCase):
         x1 = engine.Task("abc", 1, 1, 1)
         self.assertEqual("Task('abc', 1, 1, 1)", repr(x1))
 
+    def test_slots(self):
+        x1 = engine.Task("abc", 2016, 3, 1)
+        self.assertFalse(hasattr(x1, '__dict__'))
+        self.assertEqual(datetime.date(2016, 3, 1).toordinal(), x1.ordinal)
+        x1.date = datetime.date(2016, 3, 2)
+        self.assertEqual(datetime.date(2016, 3, 2), x1.date)
+
+    def test_from_ordinal(self):
+        x1 = engine.Task.from_ordinal("abc", 1)
+        self.assertEqual(engine.Task("abc", 1, 1, 1), x1)
+
+    def test_pickle(self):
+        x1 = engine.Task("abc", 2016, 3, 1)
+        self.assertEqual(x1, pickle.loads(pickle.dumps(x1)))
+
+    def test_reduce(self):
+        x1 = engine.Task("abc", 2016, 2, 29)
+        self.assertEqual((engine._restore_task, ("abc", x1.ordinal, x1.id)),
+                         x1.__reduce__())
+        x2 = pickle.loads(pickle.dumps(x1, 2))
+        self.assertEqual(x1, x2)
+        self.assertEqual(x1.id, x2.id)
+        self.assertIs(engine.Task, type(x2))
+
+    def test_id(self):
+        x1 = engine.Task("abc", 2016, 3, 1)
+        x2 = engine.Task("abc", 2016, 3, 1, 5)
+        self.assertEqual(x1, x2)
+        self.assertEqual(5, x2.id)
+        self.assertNotEqual(x1.id, engine.Task("abc", 2016, 3, 1).id)
+        self.assertEqual(5, engine.Task.from_ordinal("abc", 1, 5).id)
+        self.assertLess(engine.Task.new_id(), 1 << 63)
+
+    def test_setstate_legacy(self):
+        missing = engine.missing_ids()
+        x1 = engine.Task.__new__(engine.Task)
+        x1.__setstate__({'content': "abc", 'date': datetime.date(1, 1, 1)})
+        self.assertEqual(engine.Task("abc", 1, 1, 1), x1)
+        self.assertIs(int, type(x1.id))
+        self.assertEqual(missing + 1, engine.missing_ids())
+
 
 class TestEngine(unittest.TestCase):
     def test_init(self):
@@ -692,11 +3357,70 @@ class TestEngine(unittest.TestCase):
                           lab.Engine.unfinish_task,
                           None, None)
 
+    def test_shift_pending_tasks(self):
+        self.assertRaises(NotImplementedError,
+                          lab.Engine.shift_pending_tasks,
+                          None, None)
+
+    def test_pending_columns(self):
+        e = mock.MagicMock()
+        e.view_pending_tasks.return_value = [("a", datetime.date(1, 1, 2))]
+        columns = lab.Engine.pending_columns(e)
+        self.assertEqual(("a",), columns.contents)
+        self.assertEqual([2], list(columns.dates))
+
+    def test_id_operations(self):
+        for name in ('view_task', 'remove_pending_task_by_id',
+                     'finish_task_by_id', 'remove_finished_task_by_id',
+                     'unfinish_task_by_id'):
+            self.assertRaises(NotImplementedError,
+                              getattr(lab.Engine, name), None, None)
+        for name in ('view_pending_tasks_with_ids',
+                     'view_finished_tasks_with_ids'):
+            self.assertRaises(NotImplementedError,
+                              getattr(lab.Engine, name), None)
+        for name in ('edit_pending_task_by_id', 'edit_finished_task_by_id'):
+            self.assertRaises(NotImplementedError, getattr(lab.Engine, name),
+                              None, None, None, None, None, None)
+
+    def test_signatures(self):
+        for kind in (engine.ListEngine, engine.ThreadSafeEngine,
+                     sqlite_engine.SqliteEngine, daemon.RemoteEngine):
+            for name, method in vars(lab.Engine).items():
+                if callable(method) and not name.startswith('_'):
+                    self.assertEqual(inspect.signature(method),
+                                     inspect.signature(getattr(kind, name)),
+                                     "{}.{}".format(kind.__name__, name))
+
+    def test_import_tasks(self):
+        self.assertRaises(NotImplementedError,
+                          lab.Engine.import_tasks,
+                          None, None)
+
     def test_save_tasks(self):
         self.assertRaises(NotImplementedError,
                           lab.Engine.save_tasks,
                           None)
 
+    def test_flush(self):
+        self.assertEqual(None, lab.Engine.flush(None))
+
+    def test_close(self):
+        eng = mock.MagicMock()
+        lab.Engine.close(eng)
+        eng.flush.assert_called_once_with()
+
+    def test_search_tasks(self):
+        self.assertRaises(NotImplementedError,
+                          lab.Engine.search_tasks,
+                          None, None)
+
+    def test_watch(self):
+        self.assertEqual(None, lab.Engine.watch(None, None))
+
+    def test_stop_autosave(self):
+        self.assertEqual(None, lab.Engine.stop_autosave(None))
+
     def test_get_savemethod(self):
         self.assertRaises(NotImplementedError,
                           lab.Engine.get_savemethod,
@@ -805,6 +3529,247 @@ class TestController(unittest.TestCase):
                           lab.Controller.save_dialog,
                           None)
 
+    def test_tasks_changed(self):
+        self.assertRaises(NotImplementedError,
+                          lab.Controller.tasks_changed,
+                          None)
+
+    def test_search_tasks(self):
+        self.assertRaises(NotImplementedError,
+                          lab.Controller.search_tasks,
+                          None)
+
+
+class TestSimpleController(unittest.TestCase):
+    def setUp(self):
+        self.i = mock.MagicMock()
+        self.e = mock.MagicMock()
+        self.c = controller.SimpleController(self.i, self.e)
+
+    def test_run(self):
+        self.i.pending_tasks_menu.return_value = self.c.pending_opts[-1]
+        self.e.changes_detected.return_value = False
+        self.c.run()
+        self.i.welcome.assert_called_with()
+        self.i.pending_tasks_menu.assert_called_once_with(self.c.pending_opts)
+        self.e.watch.assert_called_once_with(self.c.tasks_changed)
+
+    def test_search_tasks(self):
+        self.i.search_dialog.return_value = "milk"
+        self.assertEqual(self.c.search_tasks, self.c.search_tasks())
+        self.e.search_tasks.assert_called_once_with("milk")
+        self.i.print_found_tasks.assert_called_once_with(
+            self.e.search_tasks.return_value)
+        self.i.search_dialog.return_value = " "
+        self.assertEqual(self.c.view_pending_tasks, self.c.search_tasks())
+        self.c.viewing_finished = True
+        self.assertEqual(self.c.view_finished_tasks, self.c.search_tasks())
+        self.assertEqual(1, self.e.search_tasks.call_count)
+
+    def test_tasks_changed(self):
+        self.c.tasks_changed()
+        self.i.tasks_changed.assert_called_once_with()
+        columns = self.e.pending_columns.return_value
+        self.i.print_pending_tasks.assert_called_once_with(
+            columns.view.return_value, columns.marks.return_value)
+        self.i.finished_tasks_menu.return_value = self.c.finished_opts[-1]
+        self.e.changes_detected.return_value = False
+        self.c.view_finished_tasks()
+        self.c.tasks_changed()
+        self.assertEqual(2, self.i.print_finished_tasks.call_count)
+        self.assertEqual(1, self.i.print_pending_tasks.call_count)
+
+    def test_loop(self):
+        states = [mock.MagicMock() for x in range(3)]
+        for state, nxt in zip(states, states[1:] + [None]):
+            state.return_value = nxt
+        self.c.loop(states[0])
+        for state in states:
+            state.assert_called_once_with()
+
+    def test_view_pending_tasks(self):
+        self.i.pending_tasks_menu.return_value = self.c.pending_opts[0]
+        self.assertEqual(self.c.view_pending_tasks(), self.c.add_new_task)
+        columns = self.e.pending_columns.return_value
+        self.i.print_pending_tasks.assert_called_with(
+            columns.view.return_value, columns.marks.return_value)
+
+        self.i.pending_tasks_menu.return_value = None
+        self.assertEqual(self.c.view_pending_tasks(),
+                         self.c.view_pending_tasks)
+        self.i.bad_input.assert_called_with()
+
+    def test_view_finished_tasks(self):
+        self.i.finished_tasks_menu.return_value = self.c.finished_opts[4]
+        self.assertEqual(self.c.view_finished_tasks(),
+                         self.c.view_pending_tasks)
+
+        self.i.finished_tasks_menu.return_value = None
+        self.assertEqual(self.c.view_finished_tasks(),
+                         self.c.view_finished_tasks)
+        self.i.bad_input.assert_called_with()
+
+    def test_actions(self):
+        self.i.new_task_dialog.return_value = ("abc", 2016, 1, 1)
+        self.i.edit_task_dialog.return_value = ("abc", None, None, None)
+        self.i.ask_task.return_value = 0
+        for action in (self.c.add_new_task, self.c.remove_pending_task,
+                       self.c.edit_pending_task, self.c.finish_task,
+                       self.c.view_config_pending):
+            self.assertEqual(action(), self.c.view_pending_tasks)
+        for action in (self.c.clear_finished_tasks,
+                       self.c.remove_finished_task,
+                       self.c.edit_finished_task, self.c.unfinish_task,
+                       self.c.view_config_finished):
+            self.assertEqual(action(), self.c.view_finished_tasks)
+
+    def test_action_errors(self):
+        self.i.ask_task.return_value = 5
+        self.e.remove_pending_task.side_effect = IndexError
+        self.assertEqual(self.c.remove_pending_task(),
+                         self.c.view_pending_tasks)
+        self.i.bad_task.assert_called_with()
+
+        self.i.new_task_dialog.return_value = ("abc", 2016, 13, 1)
+        self.e.new_task.side_effect = ValueError
+        self.assertEqual(self.c.add_new_task(), self.c.view_pending_tasks)
+        self.i.bad_input.assert_called_with()
+
+    def test_shutdown(self):
+        self.e.changes_detected.return_value = True
+        self.i.save_dialog.return_value = True
+        self.assertIsNone(self.c.shutdown())
+        self.e.stop_autosave.assert_called_once_with()
+        self.e.save_tasks.assert_called_with()
+
+    def test_long_session(self):
+        limit = sys.getrecursionlimit()
+        self.i.pending_tasks_menu.side_effect = (
+            [None, self.c.pending_opts[0]] * limit +
+            [self.c.pending_opts[-1]])
+        self.i.new_task_dialog.return_value = ("abc", 2016, 1, 1)
+        self.e.changes_detected.return_value = False
+        self.c.run()
+        self.assertEqual(self.e.new_task.call_count, limit)
+
+
+class TestArgumentController(unittest.TestCase):
+    def setUp(self):
+        self.i = mock.MagicMock()
+        self.e = mock.MagicMock()
+        self.c = controller.ArgumentController(self.i, self.e)
+
+    def test_parse_fields(self):
+        parse = controller.ArgumentController.parse_fields
+        self.assertEqual(parse('dc', "2016-01-02 buy  milk"),
+                         ["buy  milk", 2016, 1, 2])
+        self.assertEqual(parse('ido', "3 - "), [3, "", None, None, None])
+        self.assertEqual(parse('i', " 7"), [7])
+        self.assertEqual(parse('i', "@7"), [7])
+        self.assertEqual(parse('n', "-7"), [-7])
+        self.assertEqual(parse(''), [])
+        for spec, text in (('i', "x"), ('i', "1 2"), ('dc', "2016-1 a"),
+                           ('', "1"), ('ido', ""), ('dc', "2016-01-01"),
+                           ('n', "@5")):
+            with self.assertRaises(ValueError):
+                parse(spec, text)
+
+    def test_process_batch(self):
+        lines = ["# comment", "add 2016-01-02 buy milk", "",
+                 "edit 0 - call mom", "finish 0", "fedit 0 2017-1-1",
+                 "unfinish 0", "remove 1", "fremove 2", "clear",
+                 "finish @5", "fedit @5 - x", "shift -3"]
+        self.e.changes_detected.return_value = True
+        self.assertEqual(self.c.process_batch(lines), 0)
+        self.assertEqual(self.e.mock_calls, [
+            mock.call.new_task("buy milk", 2016, 1, 2),
+            mock.call.edit_pending_task(0, "call mom", None, None, None),
+            mock.call.finish_task(0),
+            mock.call.edit_finished_task(0, "", 2017, 1, 1),
+            mock.call.unfinish_task(0),
+            mock.call.remove_pending_task(1),
+            mock.call.remove_finished_task(2),
+            mock.call.clear_finished_tasks(),
+            mock.call.finish_task_by_id(5),
+            mock.call.edit_finished_task_by_id(5, "x", None, None, None),
+            mock.call.shift_pending_tasks(-3),
+            mock.call.changes_detected(),
+            mock.call.save_tasks()])
+
+    def test_process_batch_errors(self):
+        self.e.remove_pending_task.side_effect = IndexError
+        self.e.unfinish_task_by_id.side_effect = KeyError(5)
+        self.e.changes_detected.return_value = False
+        with mock.patch('sys.stderr', new_callable=io.StringIO) as err:
+            failed = self.c.process_batch(["frobnicate 1", "remove 9",
+                                           "finish x", "finish 1",
+                                           "unfinish @5", "add 2016-01-01",
+                                           "shift @5"])
+        self.assertEqual(failed, 6)
+        self.assertEqual(err.getvalue().count("line "), 6)
+        self.assertIn("line 5: no task with ID 5", err.getvalue())
+        self.assertIn("line 2", err.getvalue())
+        self.assertIn("line 6: ValueError", err.getvalue())
+        self.assertIn("line 7: ValueError", err.getvalue())
+        self.e.new_task.assert_not_called()
+        self.e.shift_pending_tasks.assert_not_called()
+        self.e.finish_task.assert_called_once_with(1)
+        self.e.save_tasks.assert_not_called()
+
+    @mock.patch('sys.argv', ['lab.py', '-s', 'buy milk'])
+    def test_process_args_search(self):
+        self.c.run()
+        self.e.search_tasks.assert_called_once_with("buy milk")
+        self.i.print_found_tasks.assert_called_once_with(
+            self.e.search_tasks.return_value)
+
+    def test_process_args_batch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            name = os.path.join(tmp, 'ops')
+            with open(name, 'w') as fil:
+                fil.write("add 2016-01-02 abc\n")
+            with mock.patch('sys.argv', ['lab.py', '-b', name]):
+                self.c.run()
+        self.e.new_task.assert_called_once_with("abc", 2016, 1, 2)
+
+        with mock.patch('sys.argv', ['lab.py', '--batch', '-']), \
+                mock.patch('sys.stdin', io.StringIO("bogus\n")), \
+                mock.patch('sys.stderr', new_callable=io.StringIO):
+            with self.assertRaises(SystemExit):
+                self.c.run()
+
+
+    def test_import_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            name = os.path.join(tmp, 'tasks.csv')
+            with open(name, 'w') as fil:
+                fil.write("content,date\nabc,2016-01-02\n")
+            self.e.import_tasks.side_effect = list
+            with mock.patch('sys.argv', ['lab.py', '--import', name]):
+                self.c.run()
+        self.e.import_tasks.assert_called_once_with(mock.ANY)
+        self.e.save_tasks.assert_called_once_with()
+
+    def test_import_file_error(self):
+        self.e.import_tasks.side_effect = list
+        with mock.patch('sys.stdin', io.StringIO("{}\n")), \
+                mock.patch('sys.stderr', new_callable=io.StringIO) as err:
+            with self.assertRaises(SystemExit):
+                self.c.import_file('-')
+        self.assertIn("line 1", err.getvalue())
+        self.e.save_tasks.assert_not_called()
+
+    def test_export_file(self):
+        self.e.view_pending_tasks.return_value = [
+            ("abc", datetime.date(2016, 1, 2))]
+        self.e.view_finished_tasks.return_value = []
+        with mock.patch('sys.argv', ['lab.py', '--export', '-',
+                                     '--format', 'csv']), \
+                mock.patch('sys.stdout', new_callable=io.StringIO) as out:
+            self.c.run()
+        self.assertEqual("content,date,finished\r\nabc,2016-01-02,0\r\n",
+                         out.getvalue())
+
 
 class TestInterface(unittest.TestCase):
     def test_init(self):
@@ -823,6 +3788,13 @@ class TestInterface(unittest.TestCase):
     def test_print_pending_tasks(self):
         self.assertRaises(NotImplementedError,
                           lab.Interface.print_pending_tasks,
+                          None, None)
+
+    def test_search(self):
+        self.assertRaises(NotImplementedError,
+                          lab.Interface.search_dialog)
+        self.assertRaises(NotImplementedError,
+                          lab.Interface.print_found_tasks,
                           None)
 
     def test_finished_tasks_menu(self):
@@ -860,6 +3832,10 @@ class TestInterface(unittest.TestCase):
         self.assertRaises(NotImplementedError,
                           lab.Interface.save_dialog)
 
+    def test_tasks_changed(self):
+        self.assertRaises(NotImplementedError,
+                          lab.Interface.tasks_changed)
+
     def test_config_menu(self):
         self.assertRaises(NotImplementedError,
                           lab.Interface.config_menu,
@@ -874,12 +3850,15 @@ class TestLabMain(unittest.TestCase):
         mock_config.read = mock.MagicMock()
         m_interface = mock.MagicMock()
         m_controller = mock.MagicMock()
+        m_daemon = mock.MagicMock()
+        m_daemon.RemoteEngine.connect.return_value = None
         m_engine = mock.MagicMock()
         with mock.patch('engine.configparser.ConfigParser') as mock_CP:
             with mock.patch.dict('sys.modules', **{
                     'interface': m_interface,
                     'engine': m_engine,
                     'controller': m_controller,
+                    'daemon': m_daemon,
             }):
                 mock_CP.return_value = mock_config
                 self.assertRaises(TestSuccess, lab.main)
@@ -899,12 +3878,15 @@ class TestLabMain(unittest.TestCase):
         mock_config.read = mock.MagicMock()
         m_interface = mock.MagicMock()
         m_controller = mock.MagicMock()
+        m_daemon = mock.MagicMock()
+        m_daemon.RemoteEngine.connect.return_value = None
         m_engine = mock.MagicMock()
         with mock.patch('engine.configparser.ConfigParser') as mock_CP:
             with mock.patch.dict('sys.modules', **{
                     'interface': m_interface,
                     'engine': m_engine,
                     'controller': m_controller,
+                    'daemon': m_daemon,
             }):
                 mock_CP.return_value = mock_config
                 self.assertRaises(TestSuccess, lab.main)
@@ -915,7 +3897,84 @@ class TestLabMain(unittest.TestCase):
             m_engine.ListEngine()
         )
         m_controller.SimpleController.return_value.run.assert_called_with()
+        m_engine.ListEngine().close.assert_called_once_with()
+
+    @mock.patch('lab.open')
+    @mock.patch('lab.sys.exit', side_effect=TestSuccess)
+    def test_main_sorted(self, mexit, mopen):
+        mock_config = configparser.ConfigParser()
+        mock_config['DEFAULT']['engine'] = 'sorted'
+        mock_config.read = mock.MagicMock()
+        m_interface = mock.MagicMock()
+        m_controller = mock.MagicMock()
+        m_daemon = mock.MagicMock()
+        m_daemon.RemoteEngine.connect.return_value = None
+        m_engine = mock.MagicMock()
+        with mock.patch('engine.configparser.ConfigParser') as mock_CP:
+            with mock.patch.dict('sys.modules', **{
+                    'interface': m_interface,
+                    'engine': m_engine,
+                    'controller': m_controller,
+                    'daemon': m_daemon,
+            }):
+                mock_CP.return_value = mock_config
+                self.assertRaises(TestSuccess, lab.main)
+        m_controller.ArgumentController.assert_called_with(
+            m_interface.TerminalInterface,
+            m_engine.SortedListEngine()
+        )
+
 
+    @mock.patch('lab.open')
+    @mock.patch('lab.sys.exit', side_effect=TestSuccess)
+    def test_main_sqlite(self, mexit, mopen):
+        mock_config = configparser.ConfigParser()
+        mock_config['DEFAULT']['engine'] = 'sqlite'
+        mock_config.read = mock.MagicMock()
+        m_interface = mock.MagicMock()
+        m_controller = mock.MagicMock()
+        m_daemon = mock.MagicMock()
+        m_daemon.RemoteEngine.connect.return_value = None
+        m_sqlite = mock.MagicMock()
+        with mock.patch('engine.configparser.ConfigParser') as mock_CP:
+            with mock.patch.dict('sys.modules', **{
+                    'interface': m_interface,
+                    'engine': mock.MagicMock(),
+                    'controller': m_controller,
+                    'sqlite_engine': m_sqlite,
+                    'daemon': m_daemon,
+            }):
+                mock_CP.return_value = mock_config
+                self.assertRaises(TestSuccess, lab.main)
+        m_controller.ArgumentController.assert_called_with(
+            m_interface.TerminalInterface,
+            m_sqlite.SqliteEngine()
+        )
+
+    @mock.patch('lab.open')
+    @mock.patch('lab.sys.exit', side_effect=TestSuccess)
+    def test_main_daemon(self, mexit, mopen):
+        mock_config = configparser.ConfigParser()
+        mock_config.read = mock.MagicMock()
+        m_interface = mock.MagicMock()
+        m_controller = mock.MagicMock()
+        m_engine = mock.MagicMock()
+        m_daemon = mock.MagicMock()
+        with mock.patch('engine.configparser.ConfigParser') as mock_CP:
+            with mock.patch.dict('sys.modules', **{
+                    'interface': m_interface,
+                    'engine': m_engine,
+                    'controller': m_controller,
+                    'daemon': m_daemon,
+            }):
+                mock_CP.return_value = mock_config
+                self.assertRaises(TestSuccess, lab.main)
+        m_daemon.RemoteEngine.connect.assert_called_once_with()
+        self.assertFalse(m_engine.ListEngine.called)
+        m_controller.ArgumentController.assert_called_with(
+            m_interface.TerminalInterface,
+            m_daemon.RemoteEngine.connect()
+        )
 
 if __name__ == '__main__':
     unittest.main(buffer=True)
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+"""Arch_Lab task import and export.
+
+This module provides streaming readers and writers of task records in NDJSON
+and CSV formats. You probably should not be importing it directly.
+
+A task record is a tuple (content, date, finished), where content is a string,
+date is datetime.date and finished is a boolean. Readers yield records one at
+a time and writers write them one at a time, so memory use does not depend on
+number of tasks.
+
+NDJSON format has one JSON object per line:
+  {"content": "buy milk", "date": "2016-01-02", "finished": false}
+CSV format has a header line and columns content, date and finished. In both
+formats "finished" may be omitted and defaults to false.
+"""
+
+import csv
+import json
+import datetime
+
+FIELDS = ('content', 'date', 'finished')
+TRUE = ('1', 'true', 'yes')
+FALSE = ('', '0', 'false', 'no')
+# Number of tasks engine_records fetches from engine at once.
+EXPORT_CHUNK = 1 << 12
+_decode = json.JSONDecoder().decode
+
+
+def _record(num, content, date, finished):
+    """Check and convert one record.
+
+    Raises ValueError mentioning line number num if record is malformed.
+
+    return: (string, datetime.date, boolean)
+    """
+    if type(content) is not str:
+        raise ValueError("line {}: content should be a string".format(num))
+    try:
+        date = datetime.date.fromisoformat(date)
+    except (TypeError, ValueError):
+        raise ValueError("line {}: bad date {!r}".format(num, date))
+    if type(finished) is str:
+        if finished.lower() in TRUE:
+            finished = True
+        elif finished.lower() in FALSE:
+            finished = False
+    if type(finished) is not bool:
+        raise ValueError("line {}: bad finished flag {!r}"
+                         .format(num, finished))
+    return content, date, finished
+
+
+def read_ndjson(stream):
+    """Read task records from NDJSON stream.
+
+    Empty lines are skipped. Raises ValueError on malformed line.
+
+    stream: text file-like object.
+    return: iterator of (string, datetime.date, boolean)
+    """
+    for num, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            obj = _decode(line)
+            yield _record(num, obj['content'], obj['date'],
+                          obj.get('finished', False))
+        except (KeyError, TypeError, AttributeError):
+            raise ValueError("line {}: expected object with content and date"
+                             .format(num))
+        except json.JSONDecodeError as e:
+            raise ValueError("line {}: {}".format(num, e.msg))
+
+
+def write_ndjson(stream, records):
+    """Write task records to stream as NDJSON.
+
+    stream: text file-like object.
+    records: iterable of (string, datetime.date, boolean)
+    return: int - number of records written.
+    """
+    count = 0
+    for content, date, finished in records:
+        stream.write(json.dumps({"content": content,
+                                 "date": date.isoformat(),
+                                 "finished": finished}))
+        stream.write('\n')
+        count += 1
+    return count
+
+
+def read_csv(stream):
+    """Read task records from CSV stream with header line.
+
+    Raises ValueError on malformed line.
+
+    stream: text file-like object, opened with newline=''.
+    return: iterator of (string, datetime.date, boolean)
+    """
+    reader = csv.DictReader(stream)
+    if reader.fieldnames is None:
+        return
+    if 'content' not in reader.fieldnames or 'date' not in reader.fieldnames:
+        raise ValueError("line 1: header should name content and date")
+    for row in reader:
+        yield _record(reader.line_num, row['content'], row['date'],
+                      row.get('finished') or '')
+
+
+def write_csv(stream, records):
+    """Write task records to stream as CSV with header line.
+
+    stream: text file-like object, opened with newline=''.
+    records: iterable of (string, datetime.date, boolean)
+    return: int - number of records written.
+    """
+    writer = csv.writer(stream)
+    writer.writerow(FIELDS)
+    count = 0
+    for content, date, finished in records:
+        writer.writerow((content, date.isoformat(), int(finished)))
+        count += 1
+    return count
+
+
+# Available formats, name: (reader, writer)
+FORMATS = {
+    'ndjson': (read_ndjson, write_ndjson),
+    'csv': (read_csv, write_csv),
+}
+
+
+def guess_format(name):
+    """Guess format by file name, NDJSON unless it ends with .csv."""
+    if name.lower().endswith('.csv'):
+        return 'csv'
+    return 'ndjson'
+
+
+def engine_records(eng):
+    """Get all tasks of an engine as task records.
+
+    Pending tasks come first, then finished ones. Tasks are fetched
+    EXPORT_CHUNK at a time, so that memory use does not depend on number of
+    tasks.
+
+    eng: lab.Engine descendant instance.
+    return: iterator of (string, datetime.date, boolean)
+    """
+    for view, finished in ((eng.view_pending_tasks, False),
+                           (eng.view_finished_tasks, True)):
+        start = 0
+        while True:
+            tasks = view(start, start + EXPORT_CHUNK)
+            for content, date in tasks:
+                yield content, date, finished
+            if len(tasks) < EXPORT_CHUNK:
+                break
+            start += EXPORT_CHUNK
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# Copyright 2016 Alexander Melnyk / Олександр Мельник
+#
+# This file is part of Arch_Lab package.
+#
+# Arch_Lab is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# Arch_Lab is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# Arch_Lab. If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+"""Arch_Lab savefile watcher.
+
+This module provides background polling of savefile for changes done by
+other processes for the Arch_Lab program. You probably should not be importing
+it directly.
+"""
+
+import os
+import sys
+import threading
+from storagelock import LOCK_SUFFIX
+
+
+class Watcher():
+    """Reloads engine on a background thread when it's savefile changes.
+
+    Savefile is polled with a single stat call every given number of seconds,
+    and engine is only reloaded if modification time, size or inode changed.
+    It is the lock file of savefile that is polled, as it's version stamp is
+    bumped on every save whatever the file backend, refer to
+    storagelock.StorageLock, while savefile itself is not rewritten by
+    backends that append to a journal.
+
+    Attributes:
+      engine - engine.ListEngine descendant instance to reload.
+      interval - seconds between polls.
+      stat - lock file stat as it was last polled, refer to file_stat.
+      thread - background thread doing the polling.
+    """
+    def __init__(self, engine, interval):
+        """Initialize self and start background thread.
+
+        engine: engine.ListEngine descendant instance - engine to reload.
+        interval: float - seconds between polls.
+        """
+        self.engine = engine
+        self.interval = interval
+        self.stat = self.file_stat()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="watcher",
+                                       daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Poll savefile every interval, until stopped."""
+        while not self.stopped.wait(self.interval):
+            self.poll()
+
+    def poll(self):
+        """Reload engine if savefile changed since last poll.
+
+        Failed reload is reported to stderr and retried on next change.
+        """
+        stat = self.file_stat()
+        if stat == self.stat:
+            return
+        self.stat = stat
+        try:
+            self.engine.reload()
+        except Exception as e:
+            print("WARNING: reload failed: {}".format(e), file=sys.stderr)
+
+    def file_stat(self):
+        """Stat lock file of engine savefile.
+
+        return: (int, int, int) - modification time in nanoseconds, size and
+                inode, or None if lock file does not exist.
+        """
+        try:
+            stat = os.stat(self.engine.savefile + LOCK_SUFFIX)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def stop(self):
+        """Stop background thread and wait for it to finish."""
+        self.stopped.set()
+        self.thread.join()
@@ -28,20 +28,200 @@ probably should not be importing it directly.
 import yaml
 import engine
 
+TASK_TAG = '!task'
+
+
+def _construct_task(loader, node):
+    """Build engine.Task from '!task [content, ordinal, id]' node.
+
+    Values are trusted, so task is created without validation.
+    """
+    content, ordinal, task_id = loader.construct_sequence(node)
+    return engine.Task.from_ordinal(content, ordinal, task_id)
+
+
+def _construct_legacy_task(loader, node):
+    """Build engine.Task from python object node written by yaml.dump.
+
+    Files saved before TASK_TAG was introduced keep tasks as
+    !!python/object:engine.Task with content and date.
+    """
+    task = engine.Task.__new__(engine.Task)
+    task.__setstate__(loader.construct_mapping(node, deep=True))
+    return task
+
+
+def _construct_tuple(loader, node):
+    """Build tuple from !!python/tuple node written by yaml.dump."""
+    return tuple(loader.construct_sequence(node))
+
+
+def _represent_task(dumper, task):
+    """Represent engine.Task as '!task [content, ordinal, id]'."""
+    return dumper.represent_sequence(TASK_TAG,
+                                     (task.content, task.ordinal, task.id),
+                                     flow_style=True)
+
+
+def _represent_tuple(dumper, item):
+    """Represent tuple as plain list."""
+    return dumper.represent_list(item)
+
+
+def _task_schema(loader, dumper):
+    """Teach loader and dumper classes tasks and legacy python tags."""
+    loader.add_constructor(TASK_TAG, _construct_task)
+    loader.add_constructor('tag:yaml.org,2002:python/object:engine.Task',
+                           _construct_legacy_task)
+    loader.add_constructor('tag:yaml.org,2002:python/tuple', _construct_tuple)
+    dumper.add_representer(engine.Task, _represent_task)
+    dumper.add_representer(tuple, _represent_tuple)
+
+
+class PyTaskLoader(yaml.SafeLoader):
+    """Pure-Python safe loader that knows engine.Task."""
+
+
+class PyTaskDumper(yaml.SafeDumper):
+    """Pure-Python safe dumper that knows engine.Task."""
+
+
+_task_schema(PyTaskLoader, PyTaskDumper)
+TaskLoader, TaskDumper = PyTaskLoader, PyTaskDumper
+
+if getattr(yaml, '__with_libyaml__', False):
+    class CTaskLoader(yaml.CSafeLoader):
+        """libyaml-based safe loader that knows engine.Task."""
+
+    class CTaskDumper(yaml.CSafeDumper):
+        """libyaml-based safe dumper that knows engine.Task."""
+
+    _task_schema(CTaskLoader, CTaskDumper)
+    TaskLoader, TaskDumper = CTaskLoader, CTaskDumper
+
 
 class YamlFileBackend(engine.FileBackend):
     """FileBackend implementation for YAML format.
 
     Provides unified serialization interface to pyyaml for EngineConfig.
+
+    Only safe loading is done. Tasks are written as '!task [content,
+    ordinal, id]'. libyaml loader and dumper are used if pyyaml was built with
+    it, pure-Python ones otherwise (refer to TaskLoader and TaskDumper).
+    Files written with python object tags by older versions are still
+    loaded.
     """
+    streams = True
+    text = True
+
     def save(target, item):
-        with open(target, 'w') as fil:
-            yaml.dump(item, fil)
+        with engine.atomic_open(target, 'w') as fil:
+            YamlFileBackend.dump(item, fil)
 
     def load(target):
         try:
             with open(target, 'r') as fil:
-                test = yaml.load(fil)
-        except (FileNotFoundError, EOFError):
-            test = None
+                return YamlFileBackend.parse(fil)
+        except FileNotFoundError:
+            return ([], [])
+
+    def dump(item, fil):
+        yaml.dump(item, fil, Dumper=TaskDumper)
+
+    def parse(fil):
+        with engine.gc_paused():
+            test = yaml.load(fil, Loader=TaskLoader)
         return test if test is not None else ([], [])
+
+    def dump_chunks(chunks, fil):
+        """Serialize chunks of two lists of Tasks into open file fil.
+
+        Every chunk is dumped on it's own and indented into place, with line
+        width cut by indentation, so that file is same as dump of the whole
+        lists would write.
+
+        chunks: iterable of (int, [engine.Task, -||-])
+        fil: text file-like object.
+        """
+        index, first = 0, True
+        for num, tasks in chunks:
+            if not tasks:
+                continue
+            while index < num:
+                if first:
+                    fil.write('- []\n')
+                index, first = index + 1, True
+            lines = yaml.dump(tasks, Dumper=TaskDumper,
+                              width=78).split('\n')[:-1]
+            fil.write(''.join(
+                ('- ' if first and not pos else '  ' if line else '') +
+                line + '\n' for pos, line in enumerate(lines)))
+            first = False
+        while index < 2:
+            if first:
+                fil.write('- []\n')
+            index, first = index + 1, True
+
+    def parse_chunks(fil):
+        """Deserialize two lists of Tasks from open file fil in chunks.
+
+        Tasks are built from parser events as they come. Files with python
+        object tags written by older versions are loaded whole and split.
+        Raises ValueError if file does not hold two lists of tasks.
+
+        fil: text file-like object, seekable for older files.
+        return: iterator of (int, [engine.Task, -||-])
+        """
+        events = yaml.parse(fil, Loader=TaskLoader)
+        next(events)
+        event = next(events)
+        if isinstance(event, yaml.StreamEndEvent):
+            return
+        _expect(events, yaml.SequenceStartEvent)
+        for index in (0, 1):
+            _expect(events, yaml.SequenceStartEvent)
+            chunk = []
+            event = next(events)
+            while not isinstance(event, yaml.SequenceEndEvent):
+                if not isinstance(event, yaml.SequenceStartEvent) or \
+                   event.tag != TASK_TAG:
+                    if index or chunk:
+                        raise ValueError("malformed task file")
+                    fil.seek(0)
+                    yield from engine.chunked(YamlFileBackend.parse(fil))
+                    return
+                content = _expect(events, yaml.ScalarEvent).value
+                ordinal = int(_expect(events, yaml.ScalarEvent).value)
+                event = next(events)
+                task_id = None
+                if isinstance(event, yaml.ScalarEvent):
+                    task_id = int(event.value)
+                    event = next(events)
+                if not isinstance(event, yaml.SequenceEndEvent):
+                    raise ValueError("malformed task file: unexpected {}"
+                                     .format(type(event).__name__))
+                chunk.append(engine.Task.from_ordinal(content, ordinal,
+                                                      task_id))
+                if len(chunk) == engine.CHUNK:
+                    yield index, chunk
+                    chunk = []
+                event = next(events)
+            if chunk:
+                yield index, chunk
+        _expect(events, yaml.SequenceEndEvent)
+
+
+def _expect(events, kind):
+    """Take next parser event, which should be of given kind.
+
+    Raises ValueError if it is not.
+
+    events: iterator of yaml.Event.
+    kind: yaml.Event descendant.
+    return: yaml.Event
+    """
+    event = next(events)
+    if not isinstance(event, kind):
+        raise ValueError("malformed task file: unexpected {}"
+                         .format(type(event).__name__))
+    return event